@@ -1,4 +1,6 @@
 from flask import Flask
+import threading
+import time
 import os
 import logging
 
@@ -13,10 +15,180 @@ logger = logging.getLogger(__name__)
 # Global API clients and mode
 live_api = None
 testnet_api = None
+paper_api = None
+scheduler = None
+dashboard = None
+indicators = None
+scanner = None
+risk = None
+history = None
+recorder = None
+accounts = None
+order_executor = None
+webhook_ingestor = None
+journal = None
+inbox = None
+leader = None
 active_mode = "testnet"  # Default to testnet
 
+def get_active_api():
+    return testnet_api if active_mode == "testnet" else live_api
+
+def get_active_mode():
+    return active_mode
+
+def set_active_mode(mode):
+    global active_mode
+    active_mode = mode
+    if journal:
+        journal.record("meta", mode=mode)
+
+def _reconcile_restored_bots(bots, attempts=5):
+    # Runs once after startup; restored trades keep being monitored while this retries
+    from .bots import reconcile_positions
+    for attempt in range(attempts):
+        if reconcile_positions(bots, get_active_api()):
+            logger.info("Restored bot state reconciled against the %s account", active_mode)
+            return
+        time.sleep(2 ** attempt)
+    logger.warning("Could not reconcile restored bot state; keeping it as journaled")
+
+def _become_leader():
+    # Called once in the process that wins the election: rebuild state, then start owning it
+    global active_mode
+    from .bots import bots
+    state = journal.load()
+    if state["meta"].get("mode") == "live" and live_api:
+        active_mode = "live"
+    bots.attach_journal(journal, state)
+    risk.sync()
+    accounts.start()
+    if os.getenv("RECORD_SESSION"):
+        _start_recording(os.getenv("RECORD_SESSION"), bots)
+    journal.start()
+    if bots.held_symbols():
+        threading.Thread(target=_reconcile_restored_bots, args=(bots,), name="state-reconcile", daemon=True).start()
+    webhook_ingestor.stats["received"] = state["meta"].get("webhook_count", 0)
+    webhook_ingestor.start()
+    scheduler.start()
+    inbox.start(_apply_inbox)
+    indicators.start()
+    if os.getenv("SCANNER_ENABLED", "1") == "1":
+        scanner.start()
+    history.start()
+    threading.Thread(target=_backfill_history, name="history-backfill", daemon=True).start()
+
+def _start_recording(path, bots):
+    # Captures this leader's exchange traffic, ticks and signals for offline replay (python -m app.replay)
+    global recorder
+    from .replay import SessionRecorder
+    recorder = SessionRecorder(path)
+    recorder.attach_bots(bots)
+    for mode, api in (("testnet", testnet_api), ("live", live_api)):
+        if api:
+            recorder.attach(api, mode)
+    recorder.attach_scheduler(scheduler)
+    recorder.attach_ingestor(webhook_ingestor)
+    logger.info("Recording session to %s", path)
+
+def _backfill_history():
+    # Executions from while no leader was listening to the stream
+    for mode, api in (("testnet", testnet_api), ("live", live_api)):
+        if api:
+            try:
+                history.backfill(mode, api)
+            except Exception as e:
+                logger.error("Exception backfilling %s trade history: %s", mode, str(e))
+
+def _apply_inbox(kind, payload, item_id):
+    if kind != "signal":
+        from .commands import apply_command
+        apply_command(kind, payload)
+        inbox.set_result(item_id, "done", None)
+        return
+    api = testnet_api if payload["mode"] == "testnet" else live_api
+    signal = dict(payload, key=tuple(payload["key"]), api=api, inbox=True)
+    status, _ = webhook_ingestor.submit(signal, signal_id=item_id)
+    if status != "queued":
+        inbox.set_result(item_id, status, None)
+
+def _queue_native_signal(signal):
+    # Indicator and scanner entries get the same queue, dedup and bot handling as a webhook alert;
+    # only the leader runs them
+    status, signal_id = webhook_ingestor.submit(dict(signal, api=get_active_api()))
+    if status != "queued":
+        logger.warning("%s signal for %s not queued: %s (%s)", signal["source"].capitalize(), signal["symbol"], status, signal_id)
+
+def _on_scheduler_tick():
+    state = scheduler.state
+    risk.refresh(state["api"], state["balances"], state["read_at"])
+    dashboard.wake()
+
+def _inbox_signal_done(signal, record):
+    if signal.get("inbox"):
+        inbox.set_result(record["signal_id"], record["status"], record["result"])
+
+def _refresh_from_journal():
+    global active_mode
+    from .bots import bots
+    state = journal.load()
+    mode = state["meta"].get("mode", active_mode)
+    active_mode = mode if mode == "testnet" or live_api else "testnet"
+    bots.restore(state)
+
+def _follow_leader():
+    # Followers serve pages from the leader's journal; they never write bot state themselves
+    interval = float(os.getenv("FOLLOWER_REFRESH_SECONDS", 1))
+    while not leader.is_leader:
+        try:
+            if journal.changed():
+                _refresh_from_journal()
+        except Exception as e:
+            logger.error("Exception refreshing follower state from the journal: %s", str(e))
+        time.sleep(interval)
+
+def shutdown():
+    """Drain queued webhook signals and flush the journal; the server's worker exit hook calls this."""
+    if leader is None or not leader.is_leader:
+        return
+    scheduler.stop()
+    indicators.stop()
+    scanner.stop()
+    inbox.stop()
+    webhook_ingestor.stop()
+    accounts.stop()
+    history.flush()
+    history.stop()
+    journal.flush()
+    journal.stop()
+    if recorder:
+        recorder.close()
+    leader.stop()
+
+def _collect_metrics():
+    apis = [(mode, api) for mode, api in (("testnet", testnet_api), ("live", live_api)) if api]
+    stats = webhook_ingestor.stats
+    return [
+        ("bybit_rate_limit_throttled_total", "counter", "Calls that waited on the local rate limiter", ("mode",),
+         [((mode,), api.limiter.stats["throttled"]) for mode, api in apis]),
+        ("bybit_rate_limit_wait_seconds_total", "counter", "Time spent waiting on the local rate limiter", ("mode",),
+         [((mode,), api.limiter.stats["throttled_ms"] / 1000) for mode, api in apis]),
+        ("bybit_rate_limit_exchange_hits_total", "counter", "Responses reporting an exhausted Bybit rate limit", ("mode",),
+         [((mode,), api.limiter.stats["exchange_limit_hits"]) for mode, api in apis]),
+        ("webhook_signals_total", "counter", "Webhook signals by outcome in this worker", ("status",),
+         [((key,), value) for key, value in stats.items()]),
+        ("webhook_queue_pending", "gauge", "Signals waiting in the ingest worker queues", (), [((), webhook_ingestor.pending())]),
+        ("risk_entries_total", "counter", "Bot entries by pre-trade risk outcome", ("outcome",),
+         [((key,), risk.stats[key]) for key in ("accepted", "resized", "rejected")]),
+        ("risk_exposure", "gauge", "Quote coin committed by open bot entries, and its worst-case loss", ("kind",),
+         [(("committed",), risk.total_exposure), (("worst_case_loss",), risk.total_loss)]),
+        ("account_orders_total", "counter", "Follower account fan-out orders by outcome", ("account", "outcome"),
+         [((name, outcome), account.stats[key]) for name, account in accounts.accounts.items()
+          for outcome, key in (("sent", "orders"), ("failed", "failed"))]),
+    ]
+
 def create_app():
-    global live_api, testnet_api
+    global live_api, testnet_api, paper_api, scheduler, dashboard, indicators, scanner, risk, history, accounts, order_executor, webhook_ingestor, journal, inbox, leader
     app = Flask(__name__)
     
     # Set the secret key for session management
@@ -34,19 +206,145 @@ def create_app():
     
     # Initialize API clients
     from .bybit_api import BybitAPI
-    testnet_api = BybitAPI(api_key=testnet_api_key, api_secret=testnet_api_secret, testnet=True)
-    live_api = BybitAPI(api_key=live_api_key, api_secret=live_api_secret, testnet=False) if live_api_key and live_api_secret else None
+    client_options = {
+        "instrument_ttl": int(os.getenv("INSTRUMENT_CACHE_TTL", 300)),
+        "pool_size": int(os.getenv("BYBIT_POOL_SIZE", 16)),
+        "connect_timeout": float(os.getenv("BYBIT_CONNECT_TIMEOUT", 3.05)),
+        "read_timeout": float(os.getenv("BYBIT_READ_TIMEOUT", 10)),
+        "connect_retries": int(os.getenv("BYBIT_CONNECT_RETRIES", 2)),
+        "candle_dir": os.getenv("CANDLE_DIR", "data/candles")
+    }
+    testnet_api = BybitAPI(api_key=testnet_api_key, api_secret=testnet_api_secret, testnet=True, **client_options)
+    live_api = BybitAPI(api_key=live_api_key, api_secret=live_api_secret, testnet=False, **client_options) if live_api_key and live_api_secret else None
     
     if not live_api:
         logger.warning("Live API credentials not provided; only testnet mode available.")
     
+    # Keep per-mode instrument registries warm in the background
+    testnet_api.instruments.start()
+    if live_api:
+        live_api.instruments.start()
+    
+    # Mirror orders/positions/balances from the private stream so pages read memory
+    if os.getenv("ACCOUNT_STREAM", "1") == "1":
+        testnet_api.account.start()
+        if live_api:
+            live_api.account.start()
+    
+    # Paper trading matches locally against testnet prices (or hand-pushed ones with PAPER_FEED=local)
+    from .paper import PaperExchange
+    from .market_data import MarketDataEngine, LocalPriceFeed
+    paper_feed = LocalPriceFeed() if os.getenv("PAPER_FEED", "testnet") == "local" else None
+    paper_api = PaperExchange(market_data=MarketDataEngine(testnet=True, feed=paper_feed), instruments=testnet_api.instruments,
+                              balances={"USDT": float(os.getenv("PAPER_BALANCE", 10000))},
+                              maker_fee=float(os.getenv("PAPER_MAKER_FEE", 0.001)), taker_fee=float(os.getenv("PAPER_TAKER_FEE", 0.001)),
+                              slippage_bps=float(os.getenv("PAPER_SLIPPAGE_BPS", 5)), price_fallback=testnet_api.get_ticker)
+    
+    # Bot state lives in the write-ahead journal; only the elected leader process writes it
+    from .bots import bots, handle_signal
+    from .journal import StateJournal
+    from .inbox import CommandInbox
+    from .leader import LeaderElection
+    state_db = os.getenv("STATE_DB", "data/state.db")
+    journal = StateJournal(state_db, flush_interval=float(os.getenv("STATE_FLUSH_SECONDS", 0.05)))
+    inbox = CommandInbox(os.getenv("INBOX_DB", os.path.join(os.path.dirname(state_db), "inbox.db")))
+    
+    # Bot monitoring runs on its own scheduler thread, plus on every ticker update
+    from .scheduler import BotScheduler
+    scheduler = BotScheduler(bots, get_active_api, interval=float(os.getenv("BOT_TICK_SECONDS", 5)),
+                             publish_path=os.path.join(os.path.dirname(state_db), "snapshot.json"))
+    for api in (testnet_api, live_api):
+        if api:
+            api.market_data.add_handler(lambda symbol, price, api=api: scheduler.on_price_tick(api, symbol, price))
+    
+    # Executions and bot round trips, written by the leader, for realized PnL and performance queries
+    from .history import TradeHistory
+    history = TradeHistory(os.getenv("HISTORY_DB", os.path.join(os.path.dirname(state_db), "history.db")), bots, get_active_mode)
+    for mode, api in (("testnet", testnet_api), ("live", live_api)):
+        if api:
+            api.account.add_execution_handler(lambda executions, mode=mode: history.record(mode, executions))
+    paper_api.add_execution_handler(lambda executions: history.record("paper", executions))
+    
+    # Dashboard pages subscribe to one shared in-memory snapshot instead of polling the exchange per tab
+    from .stream import DashboardStream, build_dashboard_state
+    dashboard = DashboardStream(lambda: build_dashboard_state(get_active_api(), active_mode, scheduler, bots, paper_api, scanner, history),
+                                interval=float(os.getenv("STREAM_INTERVAL_SECONDS", 1)),
+                                max_seconds=float(os.getenv("STREAM_MAX_SECONDS", 300)),
+                                # Streams hold a gthread each; by default half the worker's threads stay free for webhooks
+                                max_clients=int(os.getenv("STREAM_MAX_CLIENTS", max(1, int(os.getenv("GUNICORN_THREADS", 8)) // 2))))
+    
+    # Entries are checked against cached balance and exposure before any order goes out
+    from .risk import RiskEngine
+    max_exposure, max_loss = os.getenv("RISK_MAX_EXPOSURE"), os.getenv("RISK_MAX_LOSS")
+    risk = RiskEngine(bots, quote=os.getenv("RISK_QUOTE", "USDT"), max_exposure=float(max_exposure) if max_exposure else None,
+                      max_loss=float(max_loss) if max_loss else None, min_legs=int(os.getenv("RISK_MIN_LEGS", 0)))
+    scheduler.on_tick = _on_scheduler_tick
+    
+    # Follower accounts: each webhook action is copied to every account on the signal's network at once
+    from .accounts import AccountPool, load_accounts
+    follower_options = dict(client_options, pool_size=int(os.getenv("ACCOUNT_POOL_SIZE", 4)))
+
+    def follower_client(api_key, api_secret, testnet):
+        api = BybitAPI(api_key=api_key, api_secret=api_secret, testnet=testnet, **follower_options)
+        primary = testnet_api if testnet else live_api
+        if primary:
+            api.instruments = primary.instruments  # one instrument registry per network, not per account
+        return api
+    accounts = AccountPool(load_accounts(os.getenv("ACCOUNTS_FILE", os.path.join(os.path.dirname(state_db), "accounts.json"))),
+                           follower_client, bots, get_active_api, workers=int(os.getenv("ACCOUNT_WORKERS", 64)),
+                           timeout=float(os.getenv("ACCOUNT_TIMEOUT", 15)), quote=risk.quote)
+    
+    # Multi-leg order jobs (DCA ladders) run off the webhook thread
+    from .execution import OrderExecutor
+    order_executor = OrderExecutor(max_workers=int(os.getenv("ORDER_WORKERS", 8)))
+    
+    # Webhooks are acked after parse + dedup; per-symbol ordered workers place the orders
+    from .ingest import WebhookIngestor
+    webhook_ingestor = WebhookIngestor(lambda signal: handle_signal(signal, order_executor, risk, accounts),
+                                       workers=int(os.getenv("WEBHOOK_WORKERS", 4)),
+                                       dedup_window=float(os.getenv("WEBHOOK_DEDUP_SECONDS", 30)),
+                                       max_queue=int(os.getenv("WEBHOOK_QUEUE_SIZE", 10000)),
+                                       on_done=_inbox_signal_done)
+    
+    # Rate-limiter and ingest counters already exist; /metrics reads them at scrape time
+    from .metrics import metrics
+    metrics.add_collector(_collect_metrics)
+    
+    # Native entries: streaming indicators over the live ticker feed, fired through the ingestor
+    from .indicators import IndicatorEngine
+    indicators = IndicatorEngine(get_active_api, _queue_native_signal, history=int(os.getenv("INDICATOR_HISTORY", 300)))
+    indicators.load_rules(os.getenv("INDICATOR_RULES", os.path.join(os.path.dirname(state_db), "indicator_rules.json")))
+    for api in (testnet_api, live_api):
+        if api:
+            api.market_data.add_handler(lambda symbol, price, api=api: indicators.on_price(symbol, price) if api is get_active_api() else None)
+    
+    # Whole-universe scanner: one tickers call per pass, ranked for the dashboard and optional Bot2 starts
+    from .scanner import MarketScanner
+    scanner = MarketScanner(get_active_api, bots, _queue_native_signal, interval=float(os.getenv("SCANNER_INTERVAL_SECONDS", 5)),
+                            publish_path=os.path.join(os.path.dirname(state_db), "scanner_results.json"))
+    scanner.load_config(os.getenv("SCANNER_CONFIG", os.path.join(os.path.dirname(state_db), "scanner.json")))
+    
+    # With several server workers, one wins the lock and owns scheduler, journal and ingest workers
+    leader = LeaderElection(os.getenv("LEADER_LOCK", os.path.join(os.path.dirname(state_db), "leader.lock")), _become_leader,
+                            retry_interval=float(os.getenv("LEADER_RETRY_SECONDS", 2)))
+    if not leader.start():
+        _refresh_from_journal()
+        threading.Thread(target=_follow_leader, name="state-follower", daemon=True).start()
+    
     # Register blueprints
     from .routes import bp
     app.register_blueprint(bp)
     
     return app
 
-app = create_app()
+_app = None
 
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+def __getattr__(name):
+    # Build the Flask app on first use rather than at import, so tools like
+    # `python -m app.backtest` can import the package without API credentials
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,4 +1,7 @@
-from . import app
+import os
+from . import create_app
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    # Local development only; production runs under gunicorn (see gunicorn.conf.py).
+    # The reloader is off because it would build a second app, scheduler and streams in the parent process
+    create_app().run(host="0.0.0.0", port=int(os.getenv("PORT", 5000)), debug=os.getenv("FLASK_DEBUG") == "1", use_reloader=False, threaded=True)
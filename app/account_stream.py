@@ -0,0 +1,187 @@
+from collections import deque
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+OPEN_ORDER_STATUSES = ("New", "PartiallyFilled", "Untriggered")
+
+class BybitPrivateFeed:
+    """Bybit private order/position/wallet/execution topics over one authenticated WebSocket."""
+
+    def __init__(self, testnet, api_key, api_secret):
+        self.testnet = testnet
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.ws = None
+
+    def start(self, on_message):
+        from pybit.unified_trading import WebSocket
+        self.ws = WebSocket(testnet=self.testnet, channel_type="private", api_key=self.api_key, api_secret=self.api_secret)
+        self.ws.order_stream(callback=lambda message: on_message("order", message["data"]))
+        self.ws.position_stream(callback=lambda message: on_message("position", message["data"]))
+        self.ws.wallet_stream(callback=lambda message: on_message("wallet", message["data"]))
+        self.ws.execution_stream(callback=lambda message: on_message("execution", message["data"]))
+
+    def is_connected(self):
+        return self.ws is not None and self.ws.is_connected()
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.exit()
+            self.ws = None
+
+class LocalAccountFeed:
+    """Stand-in private stream for offline runs and tests: push raw Bybit topic payloads by hand."""
+
+    def __init__(self):
+        self.connected = False
+        self._on_message = None
+
+    def start(self, on_message):
+        self._on_message = on_message
+        self.connected = True
+
+    def push(self, topic, data):
+        if self._on_message:
+            self._on_message(topic, data)
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.connected = False
+
+class AccountMirror:
+    """Local copy of open orders, positions and balances kept current from the private stream.
+
+    Reads use the same method names and shapes as BybitAPI, with zero network calls.
+    """
+
+    def __init__(self, api, feed, resync_interval=300, max_executions=1000):
+        self.api = api
+        self.feed = feed
+        self.resync_interval = resync_interval
+        self.ready = False
+        self.orders = {}
+        self.positions = {}
+        self.balances = {}
+        self.executions = deque(maxlen=max_executions)
+        self._execution_handlers = []
+        self._resync_buffer = None  # stream updates received while a REST snapshot is in flight
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_execution_handler(self, handler):
+        self._execution_handlers.append(handler)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="account-mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.feed.close()
+        self.ready = False
+
+    def _run(self):
+        try:
+            self.feed.start(self._on_message)
+        except Exception as e:
+            logger.error("Exception starting private account stream: %s", str(e))
+            return
+        was_connected = False
+        since_resync = 0
+        while not self._stop.is_set():
+            connected = self.feed.is_connected()
+            if not connected:
+                # Updates missed while disconnected make the mirror untrustworthy until resynced
+                self.ready = False
+            elif not was_connected or not self.ready or since_resync >= self.resync_interval:
+                self.resync()
+                since_resync = 0
+            was_connected = connected
+            self._stop.wait(1)
+            since_resync += 1
+
+    def resync(self):
+        """Reload the full account state over REST, e.g. after (re)connecting.
+
+        Stream updates that arrive while the snapshot is being read are replayed on top of it,
+        so the snapshot never rolls back a newer fill or cancel.
+        """
+        with self._lock:
+            self._resync_buffer = []
+        orders = self.api.get_open_orders()
+        positions = self.api.get_positions()
+        balances = self.api.get_wallet_balance()
+        if orders is None or positions is None or balances is None:
+            logger.warning("Account mirror resync failed; serving REST reads until the next attempt")
+            with self._lock:
+                self._resync_buffer = None
+            self.ready = False
+            return False
+        with self._lock:
+            self.orders = {order["order_id"]: order for order in orders}
+            self.positions = {pos["symbol"]: pos for pos in positions}
+            self.balances = {coin["coin"]: coin for coin in balances}
+            buffered, self._resync_buffer = self._resync_buffer, None
+            for topic, data in buffered:
+                self._apply(topic, data)
+        self.ready = True
+        logger.info("Account mirror resynced: %d orders, %d positions, %d coins", len(orders), len(positions), len(balances))
+        return True
+
+    def _on_message(self, topic, data):
+        try:
+            with self._lock:
+                if topic == "execution":
+                    self.executions.extend(data)
+                else:
+                    if self._resync_buffer is not None:
+                        self._resync_buffer.append((topic, data))
+                    self._apply(topic, data)
+            if topic == "execution":
+                for handler in self._execution_handlers:
+                    handler(data)
+        except Exception as e:
+            logger.error("Exception applying %s update to account mirror: %s", topic, str(e))
+
+    def _apply(self, topic, data):
+        # Caller holds self._lock
+        if topic == "order":
+            for order in data:
+                if order.get("category") != "spot":
+                    continue
+                if order["orderStatus"] in OPEN_ORDER_STATUSES:
+                    self.orders[order["orderId"]] = self.api.order_from_raw(order)
+                else:
+                    self.orders.pop(order["orderId"], None)
+        elif topic == "position":
+            for pos in data:
+                if pos.get("category") != "linear":
+                    continue
+                if float(pos["size"]) > 0:
+                    self.positions[pos["symbol"]] = self.api.position_from_raw(pos)
+                else:
+                    self.positions.pop(pos["symbol"], None)
+        elif topic == "wallet":
+            for account in data:
+                for coin in account["coin"]:
+                    self.balances[coin["coin"]] = coin
+
+    def get_open_orders(self):
+        with self._lock:
+            return list(self.orders.values())
+
+    def get_positions(self):
+        with self._lock:
+            return list(self.positions.values())
+
+    def get_wallet_balance(self):
+        with self._lock:
+            return list(self.balances.values())
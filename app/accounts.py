@@ -0,0 +1,336 @@
+"""Follower accounts: every order action a bot takes on a webhook is copied to N other API keys.
+
+Each account keeps its own pooled keep-alive BybitAPI client (so its own rate limiter and
+connections). One action goes out to every follower on a bounded thread pool, while the primary
+order is in flight, so the whole fan-out takes about one order round trip rather than N. Followers
+size by their multiplier and track what they bought per (bot, symbol), so exits sell each
+account's own quantity (the same share of it a take-profit sells for the bot).
+
+Usage (benchmark against offline exchanges): python -m app.accounts --accounts 64 --latency-ms 50
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import OrderedDict, defaultdict
+import argparse
+import threading
+import json
+import time
+import uuid
+import os
+import logging
+from .bots import build_safety_ladder
+from .metrics import account_latency
+
+logger = logging.getLogger(__name__)
+
+EXIT_REASONS = ("TP", "SL")  # closes that sent an exit order; other closes only reset bot state
+
+def load_accounts(path):
+    """Account entries from a JSON list of {"name", "api_key", "api_secret", "testnet", "multiplier", "enabled"}.
+
+    Keys may name environment variables ("$ALICE_KEY") rather than hold the secret. A missing file means no followers.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        entries = json.load(f)
+    accounts = []
+    for entry in entries:
+        if not entry.get("enabled", True):
+            continue
+        if not entry.get("name") or not entry.get("api_key") or not entry.get("api_secret"):
+            raise ValueError(f"Account entry needs name, api_key and api_secret: {entry.get('name')!r}")
+        accounts.append(dict(entry, api_key=os.path.expandvars(entry["api_key"]), api_secret=os.path.expandvars(entry["api_secret"]),
+                             testnet=bool(entry.get("testnet", True)), multiplier=float(entry.get("multiplier", 1))))
+    return accounts
+
+def _ok(response):
+    return isinstance(response, str) and not response.startswith(("Error", "Exception"))
+
+class Account:
+    __slots__ = ("name", "api", "testnet", "multiplier", "holdings", "stats", "balance")
+
+    def __init__(self, name, api, testnet=True, multiplier=1.0):
+        self.name = name
+        self.api = api
+        self.testnet = testnet
+        self.multiplier = multiplier
+        self.holdings = defaultdict(float)  # (bot, symbol) -> qty bought for it
+        self.stats = {"orders": 0, "failed": 0, "last_error": None, "last_latency_ms": None}
+        self.balance = None
+
+class AccountPool:
+    """Copies bot order actions to follower accounts concurrently; acts only once started (in the leader).
+
+    Webhook actions go out through submit()/collect() from execute_signal. Exits the scheduler takes
+    (TP/SL) reach the followers when the bot closes the position, without holding up the tick; closes
+    that only reset state (mode switch, panic, flat reset, reconcile) leave follower holdings alone.
+    get_api returns the primary client the bots trade on, whose network the followers must share.
+    """
+
+    def __init__(self, accounts, client_factory, registry=None, get_api=None, workers=64, timeout=15, refresh_interval=60,
+                 quote="USDT", max_results=1000):
+        self.accounts = OrderedDict()
+        for entry in accounts:
+            if entry["name"] in self.accounts:
+                raise ValueError(f"Account {entry['name']} already exists")
+            api = client_factory(entry["api_key"], entry["api_secret"], entry["testnet"])
+            self.accounts[entry["name"]] = Account(entry["name"], api, entry["testnet"], entry["multiplier"])
+        self.registry = registry
+        self.get_api = get_api
+        self.timeout = timeout
+        self.refresh_interval = refresh_interval
+        self.quote = quote
+        self.max_results = max_results
+        self.results = OrderedDict()
+        self.stats = {"fanouts": 0, "orders": 0, "failed": 0, "timed_out": 0}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="account-fanout") if self.accounts else None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if registry is not None:
+            registry.listeners.append(self._on_record)
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def start(self):
+        """Seed holdings from the bots' restored positions, then keep every client's connections and balance warm."""
+        if self._thread or not self.accounts:
+            return
+        if self.registry is not None:
+            self.sync()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="account-refresh", daemon=True)
+        self._thread.start()
+        logger.info("Account pool started with %d follower accounts", len(self.accounts))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def sync(self):
+        # Follower holdings are not journaled: after a restart each account on the active network is assumed
+        # to hold its multiple of the bot's position; accounts on the other network never bought it
+        followers = self._followers(self.get_api())
+        with self._lock:
+            for account in self.accounts.values():
+                account.holdings.clear()
+                if account not in followers:
+                    continue
+                for bot in self.registry:
+                    for symbol, state in bot.positions.items():
+                        account.holdings[(bot.name, symbol)] = state.qty * account.multiplier
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.refresh_interval)
+
+    def refresh(self):
+        """Read every account's wallet concurrently; also re-opens idle pooled connections before the next signal."""
+        def read(account):
+            balances = account.api.get_wallet_balance()
+            if balances is None:
+                account.stats["last_error"] = "Wallet balance read failed"
+                return
+            coin = next((coin for coin in balances if coin["coin"] == self.quote), None)
+            account.balance = float(coin.get("walletBalance") or 0) if coin else 0.0
+        wait([self._pool.submit(read, account) for account in self.accounts.values()], timeout=self.timeout)
+
+    def _followers(self, api):
+        return [account for account in self.accounts.values() if account.testnet == api.testnet]
+
+    def _orders(self, account, bot, symbol, action, price, qty, legs, dca, fraction=1.0):
+        """The calls one account makes for an action, its ladder legs, and the holdings change to undo if the calls fail.
+
+        Holdings move as the primary bot's position does, before the order goes out, so a sell racing a buy sees it.
+        """
+        key = (bot.name, symbol)
+        if action == "buy":
+            if dca and key in account.holdings:
+                return [], [], 0
+            scaled = qty * account.multiplier
+            account.holdings[key] += scaled
+            if dca or bot.order_type == "market":
+                calls = [("place_market_order", (symbol, "Buy", scaled))]
+            else:
+                calls = [("place_limit_order", (symbol, "Buy", scaled, price))]
+            ladder = [("place_limit_order", (symbol, "Buy", leg["qty"] * account.multiplier, leg["price"]))
+                      for leg in build_safety_ladder(bot, price)[:legs]] if dca else []
+            return calls, ladder, -scaled
+        held = account.holdings.pop(key, None)
+        if not held:
+            return [], [], 0
+        if dca:
+            calls = [("cancel_all_orders", (symbol,)), (self._sell_held, (account, symbol, held))]
+        elif bot.order_type == "market" or price is None:
+            calls = [("place_market_order", (symbol, "Sell", held * fraction))]
+        else:
+            calls = [("place_limit_order", (symbol, "Sell", held * fraction, price))]
+        return calls, [], held
+
+    def submit(self, bot, api, symbol, action, price, qty, legs=0, dca=None, fraction=1.0):
+        """Send an action to every follower on api's network and return a handle for collect(); None if there are none.
+
+        Safety-ladder legs are placed after each account's entry and are not waited for, like the primary's order job.
+        A sell sells `fraction` of each account's holding and, like the bot's close, stops tracking the rest.
+        """
+        if self._thread is None:
+            return None
+        dca = bot.dca_enabled if dca is None else dca
+        fanout = {"fanout_id": uuid.uuid4().hex[:12], "bot": bot.name, "symbol": symbol, "action": action,
+                  "started": time.perf_counter(), "futures": []}
+        for account in self._followers(api):
+            with self._lock:
+                calls, ladder, undo = self._orders(account, bot, symbol, action, price, qty, legs, dca, fraction)
+            if calls:
+                fanout["futures"].append(self._pool.submit(self._place, account, calls, bot.name, symbol, ladder, undo))
+        return fanout if fanout["futures"] else None
+
+    def _place(self, account, calls, bot, symbol, ladder=(), undo=0):
+        started = time.perf_counter()
+        response, ok = None, True
+        for method, args in calls:
+            try:
+                response = method(*args) if callable(method) else getattr(account.api, method)(*args)
+            except Exception as e:
+                response = f"Exception: {e}"
+            ok = _ok(response)
+            if not ok:
+                break
+        elapsed = time.perf_counter() - started
+        account_latency.observe(elapsed, account.name)
+        with self._lock:
+            account.stats["orders"] += 1
+            account.stats["last_latency_ms"] = round(elapsed * 1000, 2)
+            self.stats["orders"] += 1
+            if not ok:
+                account.stats["failed"] += 1
+                account.stats["last_error"] = response
+                self.stats["failed"] += 1
+                if undo:
+                    held = account.holdings.get((bot, symbol), 0) + undo
+                    if held > 1e-12:
+                        account.holdings[(bot, symbol)] = held
+                    else:
+                        account.holdings.pop((bot, symbol), None)
+        if not ok:
+            logger.error("Account %s %s failed for %s: %s", account.name, getattr(method, "__name__", method), symbol, response)
+        elif ladder:
+            for method, args in ladder:
+                self._pool.submit(self._place_leg, account, method, args, bot, symbol)
+        return {"account": account.name, "ok": ok, "latency_ms": round(elapsed * 1000, 2), "response": response}
+
+    def _place_leg(self, account, method, args, bot, symbol):
+        result = self._place(account, [(method, args)], bot, symbol)
+        if result["ok"]:
+            with self._lock:
+                if (bot, symbol) in account.holdings:
+                    account.holdings[(bot, symbol)] += args[2]
+
+    def _sell_held(self, account, symbol, qty):
+        # Ladder legs count towards holdings when placed, not when filled: never sell more than the account holds
+        free = self._free_base(account, symbol)
+        if free is not None and free < qty:
+            logger.info("Account %s holds %s of the %s %s it bought orders for", account.name, free, qty, symbol)
+            qty = free
+        if qty <= 0:
+            return f"Nothing to sell for {symbol}"
+        return account.api.place_market_order(symbol, "Sell", qty)
+
+    def _free_base(self, account, symbol):
+        instrument = account.api.instruments.get(symbol)
+        base = instrument.base_coin if instrument else symbol[:-len(self.quote)] if symbol.endswith(self.quote) else symbol
+        balances = account.api.get_wallet_balance()
+        if balances is None:
+            return None
+        coin = next((coin for coin in balances if coin["coin"] == base), None)
+        return float(coin.get("free") or coin.get("walletBalance") or 0) if coin else 0.0
+
+    def collect(self, fanout):
+        """Wait for a submit()'s entry orders and return {"fanout_id", "accounts", "ok", "failed", "elapsed_ms", "results"}."""
+        if fanout is None:
+            return None
+        done, not_done = wait(fanout["futures"], timeout=self.timeout)
+        results = [future.result() for future in done]
+        results.sort(key=lambda result: result["account"])
+        record = {"fanout_id": fanout["fanout_id"], "bot": fanout["bot"], "symbol": fanout["symbol"], "action": fanout["action"],
+                  "accounts": len(fanout["futures"]), "ok": sum(1 for result in results if result["ok"]),
+                  "failed": sum(1 for result in results if not result["ok"]), "timed_out": len(not_done),
+                  "elapsed_ms": round((time.perf_counter() - fanout["started"]) * 1000, 2), "results": results}
+        with self._lock:
+            self.stats["fanouts"] += 1
+            self.stats["timed_out"] += len(not_done)
+            self.results[record["fanout_id"]] = record
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+        if record["failed"] or not_done:
+            logger.warning("Fan-out %s %s %s: %d of %d accounts failed, %d timed out", record["fanout_id"], fanout["action"],
+                           fanout["symbol"], record["failed"], record["accounts"], len(not_done))
+        return record
+
+    def _on_record(self, kind, bot, symbol, data):
+        # A TP/SL exit the scheduler sent for the primary account: followers sell their own holdings too
+        if kind != "close" or data.get("reason") not in EXIT_REASONS or self._thread is None or bot not in self.registry:
+            return
+        config = self.registry[bot]
+        fanout = self.submit(config, self.get_api(), symbol, "sell", None, None, dca=config.dca_enabled, fraction=data.get("fraction", 1.0))
+        if fanout is not None:
+            self._pool.submit(self.collect, fanout)
+
+    def status(self):
+        latency = account_latency.summary()
+        with self._lock:
+            accounts = [{"name": account.name, "testnet": account.testnet, "multiplier": account.multiplier, "balance": account.balance,
+                         "holdings": [{"bot": bot, "symbol": symbol, "qty": round(qty, 8)} for (bot, symbol), qty in account.holdings.items()],
+                         "latency": latency.get((account.name,)), **account.stats}
+                        for account in self.accounts.values()]
+            recent = [{k: v for k, v in record.items() if k != "results"} for record in list(self.results.values())[-20:]]
+        return {"running": self._thread is not None, "accounts": accounts, "recent": recent, **self.stats}
+
+def run(accounts=64, signals=50, latency_ms=50.0, workers=64):
+    """Time buy/sell fan-outs to offline exchanges against the primary's single order."""
+    from .bots import BotConfig, BotRegistry, execute_signal
+    from .loadtest import make_exchange
+    symbols = ["BTCUSDT"]
+    registry = BotRegistry()
+    bot = registry.add(BotConfig("FanBot"))
+    primary = make_exchange(symbols, latency_ms)
+    pool = AccountPool([{"name": f"acct{i}", "api_key": "", "api_secret": "", "testnet": True, "multiplier": 1 + i % 3}
+                        for i in range(accounts)], lambda key, secret, testnet: make_exchange(symbols, latency_ms), registry,
+                       lambda: primary, workers=workers, refresh_interval=3600)
+    pool.start()
+    elapsed, failed = [], 0
+    for i in range(signals):
+        started = time.perf_counter()
+        result = execute_signal(bot, primary, "BTCUSDT", "buy" if i % 2 == 0 else "sell", 100.0, 10.0, None, accounts=pool)
+        elapsed.append((time.perf_counter() - started) * 1000)
+        failed += result["fanout"]["failed"] + result["fanout"]["timed_out"]
+    pool.stop()
+    elapsed.sort()
+    return {
+        "accounts": accounts,
+        "signals": signals,
+        "orders": pool.stats["orders"],
+        "failed": failed,
+        "order_latency_ms": latency_ms,
+        "signal_p50_ms": round(elapsed[len(elapsed) // 2], 2),
+        "signal_max_ms": round(elapsed[-1], 2),
+        "serial_estimate_ms": round(latency_ms * (accounts + 1), 2)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.accounts", description="Time webhook fan-out to many follower accounts.")
+    parser.add_argument("--accounts", type=int, default=64)
+    parser.add_argument("--signals", type=int, default=50)
+    parser.add_argument("--latency-ms", dest="latency_ms", type=float, default=50.0, help="simulated exchange round trip per order")
+    parser.add_argument("--workers", type=int, default=64, help="fan-out threads (ACCOUNT_WORKERS)")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+    for key, value in run(args.accounts, args.signals, args.latency_ms, args.workers).items():
+        print(f"  {key}: {value}")
+
+if __name__ == "__main__":
+    main()
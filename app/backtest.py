@@ -0,0 +1,176 @@
+"""Vectorized backtests of Bot1 (TP/SL) and Bot2 (DCA ladder) settings over OHLCV candles.
+
+Usage: python -m app.backtest --symbol BTCUSDT --interval 1 --days 365 --bot Bot2 --tp 1 --sl 20
+"""
+import argparse
+import time
+import logging
+import numpy as np
+from .bots import BotConfig, build_safety_ladder
+
+logger = logging.getLogger(__name__)
+
+TP, SL, OPEN = 1, -1, 0
+FIRST_SCAN = 256
+BOT1_AMOUNT = 10  # quote per Bot1 entry when the config has no amount_per_trade (live, the webhook sets the quantity)
+
+def as_candle_array(data):
+    """Accept a CandleStore (n, 6) array or get_historical_data() dicts (newest first) and return (n, 6) in time order."""
+    if isinstance(data, np.ndarray):
+        return data
+    rows = np.array([[c["time"] * 1000, c["open"], c["high"], c["low"], c["close"], c["volume"]] for c in data], dtype=np.float64)
+    if not len(rows):
+        return np.empty((0, 6))
+    return rows[np.argsort(rows[:, 0])]
+
+def _first_exit(high, low, start, tp_price, sl_price):
+    """Index of the first bar >= start whose range crosses TP or SL, and which one; scans in growing chunks."""
+    n = len(high)
+    size = FIRST_SCAN
+    while start < n:
+        stop = min(n, start + size)
+        sl_hit = low[start:stop] <= sl_price
+        tp_hit = high[start:stop] >= tp_price
+        hit = sl_hit | tp_hit
+        if hit.any():
+            i = int(hit.argmax())
+            # A bar that spans both levels is counted as a stop: we cannot know which traded first
+            return start + i, SL if sl_hit[i] else TP
+        start = stop
+        size *= 4
+    return n - 1, OPEN
+
+def _next_entry(entry_idx, after):
+    if entry_idx is None:
+        return after
+    pos = np.searchsorted(entry_idx, after)
+    return int(entry_idx[pos]) if pos < len(entry_idx) else None
+
+def backtest(bot, candles, entries=None, entry_qty=None, fee_rate=0.001):
+    """Replay monitor_bot1 / monitor_bot2 + place_safety_orders for one BotConfig.
+
+    Entries happen at a bar's close: on every True in `entries`, or (entries=None) again on the bar
+    after each exit. Exits use the live thresholds, measured from the signal price: TP at
+    entry * (1 + tp%), SL at entry * (1 - sl%). Bot2 safety legs fill when a bar's low reaches them, if they sit above the stop.
+    Bot1 buys amount_per_trade worth and, as check_bot1_position does, sells only the hit target's sell_percent;
+    the rest is left unsold at cost.
+    """
+    candles = as_candle_array(candles)
+    high, low, close = candles[:, 2], candles[:, 3], candles[:, 4]
+    n = len(candles)
+    entry_idx = None if entries is None else np.flatnonzero(entries)
+    tp_percent = min(tp["percent"] for tp in bot.take_profit_targets)
+    # Rising prices reach the lowest target first; the first target at that level sells its share and closes the trade
+    sell_fraction = next(tp["sell_percent"] for tp in bot.take_profit_targets if tp["percent"] == tp_percent) / 100
+    amount = getattr(bot, "amount_per_trade", BOT1_AMOUNT)
+    trades = []
+    i = _next_entry(entry_idx, 0)
+    while i is not None and i < n - 1:
+        price = close[i]
+        tp_price = price * (1 + tp_percent / 100)
+        sl_price = price * (1 - bot.stop_loss_percent / 100)
+        exit_i, reason = _first_exit(high, low, i + 1, tp_price, sl_price)
+        exit_price = tp_price if reason == TP else sl_price if reason == SL else close[exit_i]
+        if bot.dca_enabled:
+            legs = build_safety_ladder(bot, price)
+            leg_prices = np.array([leg["price"] for leg in legs])
+            leg_qty = np.array([leg["qty"] for leg in legs])
+            qty0 = entry_qty if entry_qty is not None else (leg_qty[0] if len(legs) else 0)
+            filled = leg_prices >= low[i + 1:exit_i + 1].min() if len(legs) else np.zeros(0, bool)
+            if reason == SL:
+                # The stop closes the trade first: legs at or below it never fill, even when the bar gaps through
+                filled &= leg_prices > sl_price
+            qty = qty0 + leg_qty[filled].sum()
+            cost = qty0 * price + (leg_qty[filled] * leg_prices[filled]).sum()
+            legs_filled = int(filled.sum())
+        else:
+            qty = entry_qty if entry_qty is not None else amount / price
+            cost = qty * price
+            legs_filled = 0
+        sold = qty * sell_fraction if reason == TP and not bot.dca_enabled else qty
+        proceeds = sold * exit_price
+        pnl = proceeds - cost * (sold / qty if qty else 1) - (cost + proceeds) * fee_rate
+        trades.append((i, exit_i, price, exit_price, reason, qty, legs_filled, pnl, qty - sold))
+        if reason == OPEN:
+            break
+        i = _next_entry(entry_idx, exit_i + 1)
+    return _summarise(np.array(trades, dtype=np.float64).reshape(-1, 9), candles)
+
+def _summarise(trades, candles):
+    pnl = trades[:, 7]
+    closed = trades[:, 4] != OPEN
+    equity = np.cumsum(pnl)
+    drawdown = np.maximum.accumulate(np.concatenate([[0], equity]))[1:] - equity if len(equity) else np.zeros(0)
+    return {
+        "bars": len(candles),
+        "trades": int(closed.sum()),
+        "take_profits": int((trades[:, 4] == TP).sum()),
+        "stop_losses": int((trades[:, 4] == SL).sum()),
+        "win_rate": round(float((pnl[closed] > 0).mean()) * 100, 2) if closed.any() else None,
+        "total_pnl": round(float(pnl.sum()), 6),
+        "max_drawdown": round(float(drawdown.max()), 6) if len(drawdown) else 0.0,
+        "avg_legs_filled": round(float(trades[closed, 6].mean()), 2) if closed.any() else None,
+        "unsold_qty": round(float(trades[:, 8].sum()), 8),
+        "trade_log": trades
+    }
+
+def bot_from_args(args):
+    bot = BotConfig(args.bot, dca_enabled=args.bot == "Bot2")
+    if args.tp is not None or args.sell_percent is not None:
+        bot.take_profit_targets = [{"percent": args.tp if args.tp is not None else bot.take_profit_targets[0]["percent"],
+                                    "sell_percent": args.sell_percent if args.sell_percent is not None else 100}]
+    if args.sl is not None:
+        bot.stop_loss_percent = args.sl
+    if args.amount_per_trade is not None:
+        bot.amount_per_trade = args.amount_per_trade
+    if bot.dca_enabled:
+        for name in ("max_dca_orders", "price_deviation", "order_size_multiplier", "price_deviation_multiplier"):
+            if getattr(args, name) is not None:
+                setattr(bot, name, getattr(args, name))
+    return bot
+
+def load_candles(symbol, interval, days, testnet=False, candle_dir="data/candles", sync=True):
+    from .bybit_api import BybitAPI
+    api = BybitAPI(api_key=None, api_secret=None, testnet=testnet, candle_dir=candle_dir)
+    start_ms = int((time.time() - days * 86400) * 1000)
+    return api.candles.range(symbol, interval, start_ms=start_ms, sync=sync)
+
+def add_bot_arguments(parser):
+    parser.add_argument("--bot", choices=["Bot1", "Bot2"], default="Bot2")
+    parser.add_argument("--tp", type=float, help="take-profit percent")
+    parser.add_argument("--sell-percent", dest="sell_percent", type=float, help="percent of a Bot1 position sold at the take-profit")
+    parser.add_argument("--sl", type=float, help="stop-loss percent")
+    parser.add_argument("--amount-per-trade", dest="amount_per_trade", type=float)
+    parser.add_argument("--max-dca-orders", dest="max_dca_orders", type=int)
+    parser.add_argument("--price-deviation", dest="price_deviation", type=float)
+    parser.add_argument("--order-size-multiplier", dest="order_size_multiplier", type=float)
+    parser.add_argument("--price-deviation-multiplier", dest="price_deviation_multiplier", type=float)
+
+def add_data_arguments(parser):
+    parser.add_argument("--symbol", required=True)
+    parser.add_argument("--interval", default="1")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--testnet", action="store_true")
+    parser.add_argument("--candle-dir", dest="candle_dir", default="data/candles")
+    parser.add_argument("--offline", action="store_true", help="use stored candles only, no kline sync")
+    parser.add_argument("--fee-rate", dest="fee_rate", type=float, default=0.001)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.backtest", description="Backtest a Bot1/Bot2 configuration on stored candles.")
+    add_data_arguments(parser)
+    add_bot_arguments(parser)
+    args = parser.parse_args(argv)
+    candles = load_candles(args.symbol, args.interval, args.days, args.testnet, args.candle_dir, sync=not args.offline)
+    if not len(candles):
+        parser.error(f"No candles for {args.symbol} {args.interval}")
+    bot = bot_from_args(args)
+    started = time.perf_counter()
+    result = backtest(bot, candles, fee_rate=args.fee_rate)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    result.pop("trade_log")
+    print(f"{bot.name} {args.symbol} {args.interval}: {result['bars']} bars in {elapsed_ms:.1f} ms")
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+
+if __name__ == "__main__":
+    main()
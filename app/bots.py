@@ -1,15 +1,37 @@
 # bots.py
-from . import live_api, testnet_api, active_mode, logger
+from collections import defaultdict
+import threading
+import time
+from . import logger, get_active_api
+from .metrics import monitor_latency
+
+LADDER_CANCEL_TIMEOUT = 15  # longest a safety order leg can be in flight: connect + read timeout with retries
+
+class SymbolState:
+    """One open trade (Bot1) or DCA ladder (Bot2) held by a bot for a single symbol."""
+    __slots__ = ("symbol", "qty", "entry_price", "status", "dca_orders_placed", "opened_at", "ladder")
+
+    def __init__(self, symbol, qty, entry_price, status):
+        self.symbol = symbol
+        self.qty = qty
+        self.entry_price = entry_price
+        self.status = status  # "Running" (Bot1) / "Activated" (Bot2)
+        self.dca_orders_placed = 0
+        self.opened_at = time.time()
+        self.ladder = None  # (executor, job_id) of the safety orders still being placed
 
 class BotConfig:
     def __init__(self, name, dca_enabled=False):
         self.name = name
         self.dca_enabled = dca_enabled
+        self.positions = {}  # {symbol: SymbolState}
+        self.registry = None
+        self._locks = {}  # {symbol: Lock}
+        self._locks_guard = threading.Lock()
         if not dca_enabled:  # Bot 1
-            self.order_type = "market"
+            self.order_type = "market"  # "market" or "limit"
             self.stop_loss_percent = 10
             self.take_profit_targets = [{"percent": 5, "sell_percent": 100}]
-            self.trades = {}
         else:  # Bot 2
             self.order_type = "market"
             self.amount_per_trade = 10
@@ -19,88 +41,391 @@ class BotConfig:
             self.price_deviation = 1
             self.order_size_multiplier = 2
             self.price_deviation_multiplier = 2
-            self.total_qty = 0
-            self.dca_orders_placed = 0
-            self.symbol = None
-            self.entry_price = None
-            self.status = "Not Activated"
-
-def get_active_api():
-    return testnet_api if active_mode == "testnet" else live_api
-
-bots = {
-    "Bot1": BotConfig("Bot1", dca_enabled=False),
-    "Bot2": BotConfig("Bot2", dca_enabled=True)
-}
-
-def monitor_bot1(bot, api):
-    for symbol, trade in list(bot.trades.items()):
-        if trade["status"] == "Running":
-            try:
-                current_price = float(api.get_ticker(symbol)["last_price"])
-                entry_price = trade["entry_price"]
-                qty = trade["qty"]
-                for tp in bot.take_profit_targets:
-                    if current_price >= entry_price * (1 + tp["percent"] / 100):
-                        api.place_market_order(symbol, "Sell", qty * (tp["sell_percent"] / 100))
-                        logger.info("Bot1 TP hit for %s: sold %s at %s", symbol, qty, current_price)
-                        del bot.trades[symbol]
-                        break
-                if current_price <= entry_price * (1 - bot.stop_loss_percent / 100):
-                    api.place_market_order(symbol, "Sell", qty)
-                    logger.info("Bot1 SL hit for %s: sold %s at %s", symbol, qty, current_price)
-                    del bot.trades[symbol]
-            except Exception as e:
-                logger.error("Error monitoring Bot1 trade for %s: %s", symbol, str(e))
-
-def monitor_bot2(bot, api, open_orders, positions):
-    if bot.status == "Activated" and bot.symbol:
-        symbol_orders = [o for o in open_orders if o.get("symbol") == bot.symbol]
-        symbol_positions = [p for p in positions if p.get("symbol") == bot.symbol and float(p.get("size", 0)) > 0]
-        if not symbol_orders and not symbol_positions:
-            logger.info("No open orders or positions for %s, resetting Bot2", bot.symbol)
-            bot.status = "Not Activated"
-            bot.total_qty = 0
-            bot.dca_orders_placed = 0
-            bot.symbol = None
-            bot.entry_price = None
+
+    @property
+    def status(self):
+        if not self.positions:
+            return "Idle" if not self.dca_enabled else "Not Activated"
+        return "Running" if not self.dca_enabled else "Activated"
+
+    def config(self):
+        """Settings only, without runtime state (for logging and persistence)."""
+        return {k: v for k, v in vars(self).items() if k not in ("positions", "registry", "_locks", "_locks_guard")}
+
+    def symbol_lock(self, symbol):
+        """Serialises everything acting on one symbol's position: webhook signals and TP/SL exits."""
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _record(self, kind, symbol=None, **data):
+        if self.registry:
+            self.registry.record(kind, self.name, symbol, **data)
+
+    def open_position(self, symbol, qty, entry_price):
+        state = SymbolState(symbol, qty, entry_price, "Activated" if self.dca_enabled else "Running")
+        self.positions[symbol] = state
+        if self.registry:
+            self.registry.index(self, symbol)
+        self._record("open", symbol, qty=qty, entry_price=entry_price, status=state.status, dca_orders_placed=0)
+        return state
+
+    def add_fill(self, symbol, qty):
+        """Grow an open position by a filled safety order."""
+        state = self.positions.get(symbol)
+        if state:
+            state.qty += qty
+            state.dca_orders_placed += 1
+            self._record("fill", symbol, qty=state.qty, dca_orders_placed=state.dca_orders_placed)
+        return state
+
+    def close_position(self, symbol, reason=None, fraction=1.0):
+        """Drop a position; reason is "TP"/"SL" when an exit order was sent (selling `fraction` of it), None for state-only resets."""
+        state = self.positions.pop(symbol, None)
+        if state and state.ladder:
+            # Legs still queued must not reach the exchange once the position is gone
+            executor, job_id = state.ladder
+            executor.cancel(job_id)
+        if state and self.registry:
+            self.registry.unindex(self, symbol)
+            self._record("close", symbol, reason=reason, fraction=fraction)
+        return state
+
+    def clear_positions(self):
+        for symbol in list(self.positions):
+            self.close_position(symbol)
+
+class BotRegistry:
+    """All bot instances by id, plus a symbol -> bots index so a tick only touches bots holding that symbol."""
+
+    def __init__(self):
+        self._bots = {}
+        self._by_symbol = defaultdict(set)
+        self._lock = threading.Lock()
+        self.journal = None
+        self.listeners = []  # listener(kind, bot, symbol, data) for every change, e.g. the risk engine
+
+    def record(self, kind, bot=None, symbol=None, **data):
+        if self.journal:
+            self.journal.record(kind, bot, symbol, **data)
+        for listener in self.listeners:
+            listener(kind, bot, symbol, data)
+
+    def add(self, bot):
+        if bot.name in self._bots:
+            raise ValueError(f"Bot {bot.name} already exists")
+        bot.registry = self
+        self._bots[bot.name] = bot
+        for symbol in bot.positions:
+            self.index(bot, symbol)
+        self.record("bot_add", bot.name, dca_enabled=bot.dca_enabled, config=bot.config())
+        return bot
+
+    def remove(self, name):
+        bot = self._bots.pop(name)
+        with self._lock:
+            for symbol in bot.positions:
+                self._discard(name, symbol)
+        bot.registry = None
+        self.record("bot_remove", name)
+        return bot
+
+    def save_config(self, bot):
+        self.record("config", bot.name, **bot.config())
+
+    def attach_journal(self, journal, state):
+        """Restore bots and open positions from journal state, then journal every change from here on.
+
+        A journal that has never seen a bot is seeded with the current (default) bots instead.
+        """
+        if not state["bots"]:
+            self.journal = journal
+            for bot in self._bots.values():
+                self.record("bot_add", bot.name, dca_enabled=bot.dca_enabled, config=bot.config())
+            return
+        self.journal = None
+        self.restore(state)
+        self.journal = journal
+        logger.info("Restored %d bots with %d open positions from the state journal",
+                    len(self._bots), sum(len(bot.positions) for bot in self._bots.values()))
+
+    def restore(self, state):
+        """Make bots, configs and open positions match journal state; follower workers call this on every refresh."""
+        for name in list(self._bots):
+            if name not in state["bots"]:
+                self.remove(name)
+        for name, saved in state["bots"].items():
+            bot = self._bots.get(name) or self.add(BotConfig(name, dca_enabled=saved["dca_enabled"]))
+            for key, value in saved["config"].items():
+                if key not in ("name", "dca_enabled"):
+                    setattr(bot, key, value)
+            for symbol in list(bot.positions):
+                if symbol not in saved["positions"]:
+                    bot.close_position(symbol)
+            for symbol, pos in saved["positions"].items():
+                restored = bot.positions.get(symbol) or SymbolState(symbol, pos["qty"], pos["entry_price"], pos["status"])
+                restored.qty, restored.entry_price, restored.status = pos["qty"], pos["entry_price"], pos["status"]
+                restored.dca_orders_placed = pos.get("dca_orders_placed", 0)
+                bot.positions[symbol] = restored
+                self.index(bot, symbol)
+
+    def index(self, bot, symbol):
+        with self._lock:
+            self._by_symbol[symbol].add(bot.name)
+
+    def unindex(self, bot, symbol):
+        with self._lock:
+            self._discard(bot.name, symbol)
+
+    def _discard(self, name, symbol):
+        names = self._by_symbol.get(symbol)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._by_symbol[symbol]
+
+    def bots_for_symbol(self, symbol):
+        with self._lock:
+            names = list(self._by_symbol.get(symbol, ()))
+        return [self._bots[name] for name in names if name in self._bots]
+
+    def held_symbols(self):
+        with self._lock:
+            return set(self._by_symbol)
+
+    def get(self, name, default=None):
+        return self._bots.get(name, default)
+
+    def __getitem__(self, name):
+        return self._bots[name]
+
+    def __contains__(self, name):
+        return name in self._bots
+
+    def __len__(self):
+        return len(self._bots)
+
+    def __iter__(self):
+        return iter(list(self._bots.values()))
+
+    def items(self):
+        return list(self._bots.items())
+
+    def values(self):
+        return list(self._bots.values())
+
+bots = BotRegistry()
+bots.add(BotConfig("Bot1", dca_enabled=False))
+bots.add(BotConfig("Bot2", dca_enabled=True))
+
+def check_bot1_position(bot, api, state, current_price):
+    with bot.symbol_lock(state.symbol):
+        # A webhook sell may have closed it while this tick waited
+        if bot.positions.get(state.symbol) is state:
+            _check_bot1_position(bot, api, state, current_price)
+
+def _check_bot1_position(bot, api, state, current_price):
+    symbol, entry_price, qty = state.symbol, state.entry_price, state.qty
+    try:
+        for tp in bot.take_profit_targets:
+            if current_price >= entry_price * (1 + tp["percent"] / 100):
+                fraction = tp["sell_percent"] / 100
+                api.place_market_order(symbol, "Sell", qty * fraction)
+                logger.info("%s TP hit for %s: sold %s at %s", bot.name, symbol, qty * fraction, current_price)
+                bot.close_position(symbol, reason="TP", fraction=fraction)
+                return
+        if current_price <= entry_price * (1 - bot.stop_loss_percent / 100):
+            api.place_market_order(symbol, "Sell", qty)
+            logger.info("%s SL hit for %s: sold %s at %s", bot.name, symbol, qty, current_price)
+            bot.close_position(symbol, reason="SL")
+    except Exception as e:
+        logger.error("Error monitoring %s trade for %s: %s", bot.name, symbol, str(e))
+
+def check_bot2_position(bot, api, state, current_price):
+    with bot.symbol_lock(state.symbol):
+        if bot.positions.get(state.symbol) is state:
+            _check_bot2_position(bot, api, state, current_price)
+
+def _check_bot2_position(bot, api, state, current_price):
+    symbol = state.symbol
+    try:
+        if current_price >= state.entry_price * (1 + bot.take_profit_targets[0]["percent"] / 100):
+            reason = "TP"
+        elif current_price <= state.entry_price * (1 - bot.stop_loss_percent / 100):
+            reason = "SL"
         else:
-            try:
-                current_price = float(api.get_ticker(bot.symbol)["last_price"])
-                if current_price >= bot.entry_price * (1 + bot.take_profit_targets[0]["percent"] / 100):
-                    api.cancel_all_orders(symbol=bot.symbol)
-                    api.place_market_order(bot.symbol, "Sell", bot.total_qty)
-                    logger.info("Bot2 TP hit for %s: sold %s at %s", bot.symbol, bot.total_qty, current_price)
-                    bot.status = "Not Activated"
-                    bot.total_qty = 0
-                    bot.dca_orders_placed = 0
-                    bot.symbol = None
-                    bot.entry_price = None
-                elif current_price <= bot.entry_price * (1 - bot.stop_loss_percent / 100):
-                    api.cancel_all_orders(symbol=bot.symbol)
-                    api.place_market_order(bot.symbol, "Sell", bot.total_qty)
-                    logger.info("Bot2 SL hit for %s: sold %s at %s", bot.symbol, bot.total_qty, current_price)
-                    bot.status = "Not Activated"
-                    bot.total_qty = 0
-                    bot.dca_orders_placed = 0
-                    bot.symbol = None
-                    bot.entry_price = None
-            except Exception as e:
-                logger.error("Error monitoring Bot2 for %s: %s", bot.symbol, str(e))
-
-def place_safety_orders(bot, symbol, initial_price, initial_qty):
-    api = get_active_api()
+            return
+        if state.ladder:
+            # A leg placed after cancel_all_orders would be left behind as an orphaned limit buy
+            executor, job_id = state.ladder
+            if not executor.cancel(job_id, timeout=LADDER_CANCEL_TIMEOUT):
+                logger.warning("%s safety orders for %s still in flight after %ss", bot.name, symbol, LADDER_CANCEL_TIMEOUT)
+        api.cancel_all_orders(symbol=symbol)
+        api.place_market_order(symbol, "Sell", state.qty)
+        logger.info("%s %s hit for %s: sold %s at %s", bot.name, reason, symbol, state.qty, current_price)
+        bot.close_position(symbol, reason=reason)
+    except Exception as e:
+        logger.error("Error monitoring %s for %s: %s", bot.name, symbol, str(e))
+
+def check_position(bot, api, state, current_price):
+    if bot.dca_enabled:
+        check_bot2_position(bot, api, state, current_price)
+    else:
+        check_bot1_position(bot, api, state, current_price)
+
+def monitor_bot1(bot, api, prices):
+    with monitor_latency.time(bot.name, "tick"):
+        for symbol, state in list(bot.positions.items()):
+            if symbol in prices:
+                check_bot1_position(bot, api, state, prices[symbol])
+
+def reconcile_positions(registry, api):
+    """Drop restored positions the exchange no longer backs: no open order, linear position or spot balance.
+
+    Returns False (keeping everything) if any account read failed, so a flaky start never wipes state.
+    """
+    open_orders = api.get_open_orders()
+    positions = api.get_positions()
+    balances = api.get_wallet_balance()
+    if open_orders is None or positions is None or balances is None:
+        return False
+    order_symbols = {o.get("symbol") for o in open_orders}
+    position_symbols = {p.get("symbol") for p in positions if float(p.get("size", 0)) > 0}
+    held_coins = {coin["coin"] for coin in balances if float(coin.get("walletBalance") or 0) > 0}
+    for bot in registry:
+        for symbol in list(bot.positions):
+            instrument = api.instruments.get(symbol)
+            base_coin = instrument.base_coin if instrument else symbol[:-4] if symbol.endswith("USDT") else symbol
+            if symbol in order_symbols or symbol in position_symbols or base_coin in held_coins:
+                continue
+            logger.warning("%s position in %s not found on the exchange, dropping it", bot.name, symbol)
+            bot.close_position(symbol)
+    api.market_data.track(sorted(registry.held_symbols()))
+    return True
+
+def reset_bot2_if_flat(bot, open_orders, positions, read_at=None):
+    """Reset Bot2 for symbols with no open order or position; entries opened after the read (read_at) are left alone."""
+    order_symbols = {o.get("symbol") for o in open_orders}
+    position_symbols = {p.get("symbol") for p in positions if float(p.get("size", 0)) > 0}
+    for symbol, state in list(bot.positions.items()):
+        # Its ladder may still be queued in the order executor, so the read cannot have seen it
+        if read_at is not None and state.opened_at >= read_at:
+            continue
+        if symbol not in order_symbols and symbol not in position_symbols:
+            logger.info("No open orders or positions for %s, resetting %s", symbol, bot.name)
+            bot.close_position(symbol)
+
+def monitor_bot2(bot, api, prices):
+    with monitor_latency.time(bot.name, "tick"):
+        for symbol, state in list(bot.positions.items()):
+            if symbol in prices:
+                check_bot2_position(bot, api, state, prices[symbol])
+
+def build_safety_ladder(bot, initial_price):
+    """DCA safety-order legs for Bot2: geometric qty growth, compounding price deviation."""
     amount = bot.amount_per_trade if isinstance(bot.amount_per_trade, (int, float)) else float(bot.amount_per_trade.strip("%")) / 100 * initial_price
     current_deviation = bot.price_deviation
-    
+    legs = []
     for i in range(bot.max_dca_orders):
         qty = amount / initial_price * (bot.order_size_multiplier ** i)
         dca_price = initial_price * (1 - current_deviation / 100)
-        try:
-            response = api.place_limit_order(symbol, "Buy", qty, dca_price)
-            bot.total_qty += qty
-            bot.dca_orders_placed += 1
-            logger.info("Safety order #%d placed for %s: qty=%s at %s, response=%s", i+1, symbol, qty, dca_price, response)
-        except Exception as e:
-            logger.error("Failed to place safety order #%d for %s: %s", i+1, symbol, str(e))
-        current_deviation *= bot.price_deviation_multiplier
\ No newline at end of file
+        legs.append({"side": "Buy", "qty": qty, "price": dca_price})
+        current_deviation *= bot.price_deviation_multiplier
+    return legs
+
+def place_safety_orders(bot, symbol, initial_price, initial_qty, executor, api=None, legs=None):
+    """Hand the safety ladder (its first `legs` orders, if given) to the order executor as one job and return its id."""
+    api = api or get_active_api()
+
+    def on_placed(leg):
+        bot.add_fill(symbol, leg["qty"])
+
+    ladder = build_safety_ladder(bot, initial_price)[:legs]
+    job_id = executor.submit(api, symbol, ladder, on_placed=on_placed, label=f"{bot.name} safety orders")
+    state = bot.positions.get(symbol)
+    if state:
+        state.ladder = (executor, job_id)
+    return job_id
+
+def _admit(risk, bot, api, symbol, qty, price):
+    # Before any network call: an entry the wallet or exposure limits cannot carry is refused here
+    if risk is None:
+        return None
+    verdict = risk.admit(bot, api, symbol, qty, price)
+    if not verdict["ok"]:
+        logger.warning("Risk rejected %s buy for %s: %s", bot.name, symbol, verdict["reason"])
+    return verdict
+
+def _fan_out(accounts, result, fanout):
+    # Follower orders went out alongside the primary's; their outcome rides along in the signal result
+    if fanout is not None:
+        result["fanout"] = accounts.collect(fanout)
+    return result
+
+def execute_signal(bot, api, symbol, action, price, qty, executor, risk=None, accounts=None):
+    """Act on one validated webhook signal for a bot; returns a result dict with status success/accepted/rejected.
+
+    Runs under the bot's lock for the symbol, so a TP/SL exit racing a sell sees the position gone.
+    With an AccountPool, follower accounts get the same action while the primary order is in flight.
+    """
+    with bot.symbol_lock(symbol):
+        result, fanout = _execute_signal(bot, api, symbol, action, price, qty, executor, risk, accounts)
+    return _fan_out(accounts, result, fanout)
+
+def _execute_signal(bot, api, symbol, action, price, qty, executor, risk, accounts):
+    fanout = None
+    if not bot.dca_enabled:
+        if action == "buy":
+            verdict = _admit(risk, bot, api, symbol, qty, price)
+            if verdict and not verdict["ok"]:
+                return {"status": "rejected", "error": verdict["reason"]}, None
+            if accounts:
+                fanout = accounts.submit(bot, api, symbol, "buy", price, qty)
+            if bot.order_type == "market":
+                response = api.place_market_order(symbol, "Buy", qty)
+            else:
+                response = api.place_limit_order(symbol, "Buy", qty, price)
+            bot.open_position(symbol, qty, price)
+            api.market_data.track([symbol])
+            logger.info("%s %s buy for %s: qty=%s at %s", bot.name, bot.order_type, symbol, qty, price)
+        else:
+            trade = bot.positions.get(symbol)
+            if trade is None:
+                return {"status": "rejected", "error": f"No active trade for {symbol} to sell"}, None
+            if accounts:
+                fanout = accounts.submit(bot, api, symbol, "sell", price, trade.qty)
+            if bot.order_type == "market":
+                response = api.place_market_order(symbol, "Sell", trade.qty)
+            else:
+                response = api.place_limit_order(symbol, "Sell", trade.qty, price)
+            bot.close_position(symbol)
+            logger.info("%s %s sell for %s: qty=%s at %s", bot.name, bot.order_type, symbol, trade.qty, price)
+        return {"status": "success", "message": f"{action.capitalize()} order placed for {qty} {symbol} at {price}", "response": response}, fanout
+    # DCA bot: one ladder per symbol
+    if action == "sell":
+        logger.warning("Sell action not supported for %s DCA via webhook", bot.name)
+        return {"status": "rejected", "error": f"Sell action not supported for {bot.name} DCA"}, None
+    if symbol in bot.positions:
+        logger.warning("%s already activated for %s", bot.name, symbol)
+        return {"status": "rejected", "error": f"{bot.name} is already activated for {symbol}"}, None
+    verdict = _admit(risk, bot, api, symbol, qty, price)
+    if verdict and not verdict["ok"]:
+        return {"status": "rejected", "error": verdict["reason"]}, None
+    legs = verdict["legs"] if verdict else bot.max_dca_orders
+    if legs < bot.max_dca_orders:
+        logger.warning("%s ladder for %s cut to %d of %d safety orders by risk limits", bot.name, symbol, legs, bot.max_dca_orders)
+    if accounts:
+        fanout = accounts.submit(bot, api, symbol, "buy", price, qty, legs=legs)
+    response = api.place_market_order(symbol, "Buy", qty)
+    bot.open_position(symbol, qty, price)
+    api.market_data.track([symbol])
+    logger.info("%s initial buy for %s: qty=%s at %s", bot.name, symbol, qty, price)
+    job_id = place_safety_orders(bot, symbol, price, qty, executor, api=api, legs=legs)
+    return {"status": "accepted", "message": f"DCA started for {qty} {symbol} at {price} with {legs} safety orders",
+            "response": response, "job_id": job_id}, fanout
+
+def handle_signal(signal, executor, risk=None, accounts=None):
+    """Webhook worker entry point: route a queued signal to its bot on the API it was accepted for."""
+    bot = bots.get(signal["bot"])
+    if bot is None:
+        return {"status": "rejected", "error": f"Unknown bot: {signal['bot']}"}
+    return execute_signal(bot, signal["api"], signal["symbol"], signal["action"], signal["price"], signal["qty"], executor, risk, accounts)
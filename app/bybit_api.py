@@ -1,78 +1,302 @@
 from pybit.unified_trading import HTTP
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from .instruments import Instrument, InstrumentRegistry
+from .market_data import MarketDataEngine
+from .account_stream import AccountMirror, BybitPrivateFeed
+from .candles import CandleStore
+from .rate_limit import RateLimiter, RequestCoalescer, PRIORITY_ORDER, PRIORITY_READ
+from .metrics import api_latency, api_errors
+from functools import wraps
+from urllib.parse import urlparse
 import logging
+import socket
+import time
+import os
 
 logger = logging.getLogger(__name__)
 
+# TCP keep-alive so idle pooled connections survive between signal bursts
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+] + [
+    (socket.IPPROTO_TCP, getattr(socket, name), value)
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+    if hasattr(socket, name)
+]
+
+class KeepAliveAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+# Requests per second per endpoint group, kept under Bybit's published v5 limits
+DEFAULT_RATE_LIMITS = {"trade": 10, "order_read": 10, "position": 10, "account": 10, "market": 50}
+ENDPOINT_GROUPS = {
+    "/v5/order/create": "trade",
+    "/v5/order/cancel-all": "trade",
+    "/v5/order/realtime": "order_read",
+    "/v5/execution/list": "order_read",
+    "/v5/position/list": "position",
+    "/v5/account/wallet-balance": "account"
+}
+
+def _is_error(result):
+    # Methods log and return None, or an "Error: ..." / "Exception: ..." string, instead of raising
+    return result is None or isinstance(result, str) and result.startswith(("Error", "Exception"))
+
+def rate_limited(group, priority=PRIORITY_READ, coalesce=False):
+    """Queue the call behind the client's rate limiter; coalesced reads share one in-flight request.
+
+    Every call is timed into the api_latency histogram, per mode, method and symbol.
+    """
+    def decorator(method):
+        name = method.__name__
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            def call():
+                self.limiter.acquire(group, priority)
+                return method(self, *args, **kwargs)
+            mode = "testnet" if self.testnet else "live"
+            symbol = kwargs.get("symbol") or (args[0] if args and isinstance(args[0], str) else "")
+            started = time.perf_counter()
+            try:
+                result = self.coalescer.run((name, args, tuple(sorted(kwargs.items()))), call) if coalesce else call()
+            except Exception:
+                api_errors.inc(mode, name)
+                raise
+            finally:
+                api_latency.observe(time.perf_counter() - started, mode, name, symbol)
+            if _is_error(result):
+                api_errors.inc(mode, name)
+            return result
+        return wrapper
+    return decorator
+
 class BybitAPI:
-    def __init__(self, api_key, api_secret, testnet=False):
-        self.session = HTTP(testnet=testnet, api_key=api_key, api_secret=api_secret)
+    def __init__(self, api_key, api_secret, testnet=False, instrument_ttl=300,
+                 pool_size=16, connect_timeout=3.05, read_timeout=10, connect_retries=2,
+                 rate_limits=None, global_rate_limit=100, candle_dir="data/candles"):
+        self.testnet = testnet
+        self.session = HTTP(testnet=testnet, api_key=api_key, api_secret=api_secret, timeout=(connect_timeout, read_timeout))
+        # One pooled keep-alive transport per client, shared by every thread using it. pool_block
+        # caps connections to the host at pool_size; only connect failures are retried, never reads,
+        # so an order is not sent twice.
+        self.adapter = KeepAliveAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True,
+            max_retries=Retry(total=connect_retries, connect=connect_retries, read=0, status=0, redirect=0)
+        )
+        self.session.client.mount("https://", self.adapter)
+        self.limiter = RateLimiter(rate_limits or DEFAULT_RATE_LIMITS, global_rate=global_rate_limit)
+        self.coalescer = RequestCoalescer()
+        self.session.client.hooks["response"].append(self._on_response)
+        self.instruments = InstrumentRegistry(self, ttl=instrument_ttl)
+        self.market_data = MarketDataEngine(testnet=testnet)
+        self.account = AccountMirror(self, BybitPrivateFeed(testnet, api_key, api_secret))
+        self.candles = CandleStore(self, os.path.join(candle_dir, "testnet" if testnet else "live"))
     
-    def get_available_symbols(self):
+    def _on_response(self, response, *args, **kwargs):
+        path = urlparse(response.url).path
+        group = ENDPOINT_GROUPS.get(path, "market" if path.startswith("/v5/market/") else None)
+        if group:
+            self.limiter.update_from_headers(group, response.headers)
+    
+    def limiter_stats(self):
+        return {**self.limiter.stats, "coalesced": self.coalescer.merged}
+    
+    def transport_stats(self):
+        """Requests sent vs. connections opened on the pooled transport; reuse means no new TLS handshake."""
+        requests_sent = connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+        return {"requests": requests_sent, "new_connections": connections, "reused": requests_sent - connections}
+    
+    @staticmethod
+    def order_from_raw(order):
+        return {"order_id": order["orderId"], "symbol": order["symbol"], "side": order["side"], "order_type": order["orderType"],
+                "qty": order["qty"], "price": order["price"], "order_status": order["orderStatus"]}
+    
+    @staticmethod
+    def position_from_raw(pos):
+        return {"symbol": pos["symbol"], "side": pos["side"], "size": pos["size"],
+                "entry_price": pos["entryPrice"], "unrealised_pnl": pos["unrealisedPnl"]}
+    
+    @rate_limited("market", coalesce=True)
+    def get_instruments(self):
+        """Fetch spot instrument filters (tick size, lot size, min notional) from the exchange."""
         try:
             response = self.session.get_instruments_info(category="spot")
             if response["retCode"] == 0:
-                return [instrument["symbol"] for instrument in response["result"]["list"]]
-            logger.error(f"Failed to fetch symbols: {response['retMsg']}")
+                return [
+                    Instrument(
+                        symbol=inst["symbol"], base_coin=inst["baseCoin"], quote_coin=inst["quoteCoin"],
+                        tick_size=inst["priceFilter"]["tickSize"],
+                        qty_step=inst["lotSizeFilter"]["basePrecision"],
+                        min_qty=inst["lotSizeFilter"]["minOrderQty"],
+                        min_notional=inst["lotSizeFilter"]["minOrderAmt"]
+                    )
+                    for inst in response["result"]["list"]
+                ]
+            logger.error(f"Failed to fetch instruments: {response['retMsg']}")
             return []
         except Exception as e:
-            logger.error(f"Exception in get_available_symbols: {str(e)}")
+            logger.error(f"Exception in get_instruments: {str(e)}")
             return []
     
+    def get_available_symbols(self):
+        # Served from the background-refreshed registry; no request-time round trip
+        return self.instruments.symbols()
+    
+    def _format_qty(self, symbol, qty):
+        inst = self.instruments.get(symbol)
+        return inst.round_qty(qty) if inst else str(qty)
+    
+    def _format_price(self, symbol, price):
+        inst = self.instruments.get(symbol)
+        return inst.round_price(price) if inst else str(price)
+    
+    def _check_order(self, symbol, side, qty, price=None):
+        # Lot size and min notional against the cached filters, so an order the exchange would reject never leaves
+        inst = self.instruments.get(symbol)
+        if inst is None:
+            return None
+        if price is None and side.capitalize() == "Buy":
+            return inst.check_quote(qty)
+        return inst.check_order(qty, price)
+    
+    @rate_limited("trade", priority=PRIORITY_ORDER)
     def place_market_order(self, symbol, side, qty):
         try:
+            # Spot market buys are sized in quote coin, so only sells snap to the base lot size
+            qty = self._format_qty(symbol, qty) if side.capitalize() == "Sell" else str(qty)
+            error = self._check_order(symbol, side, qty)
+            if error:
+                logger.warning("Market %s order not sent: %s", side, error)
+                return f"Error: {error}"
             response = self.session.place_order(
                 category="spot", symbol=symbol, side=side.capitalize(),
-                orderType="Market", qty=str(qty)
+                orderType="Market", qty=qty
             )
             return f"Market {side} order placed: {response}" if response["retCode"] == 0 else f"Error: {response['retMsg']}"
         except Exception as e:
             logger.error(f"Exception in place_market_order: {str(e)}")
             return f"Exception: {e}"
     
+    @rate_limited("trade", priority=PRIORITY_ORDER)
     def place_limit_order(self, symbol, side, qty, price):
         try:
+            qty, price = self._format_qty(symbol, qty), self._format_price(symbol, price)
+            error = self._check_order(symbol, side, qty, price)
+            if error:
+                logger.warning("Limit %s order not sent: %s", side, error)
+                return f"Error: {error}"
             response = self.session.place_order(
                 category="spot", symbol=symbol, side=side.capitalize(),
-                orderType="Limit", qty=str(qty), price=str(price)
+                orderType="Limit", qty=qty, price=price
             )
             return f"Limit {side} order placed: {response}" if response["retCode"] == 0 else f"Error: {response['retMsg']}"
         except Exception as e:
             logger.error(f"Exception in place_limit_order: {str(e)}")
             return f"Exception: {e}"
     
+    @rate_limited("order_read", coalesce=True)
     def get_open_orders(self):
         try:
             response = self.session.get_open_orders(category="spot")
             if response["retCode"] == 0:
-                return [
-                    {"symbol": order["symbol"], "side": order["side"], "order_type": order["orderType"],
-                     "qty": order["qty"], "price": order["price"], "order_status": order["orderStatus"]}
-                    for order in response["result"]["list"]
-                ]
+                return [self.order_from_raw(order) for order in response["result"]["list"]]
             logger.error(f"Failed to fetch open orders: {response['retMsg']}")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Exception in get_open_orders: {str(e)}")
-            return []
+            return None
+    
+    @rate_limited("order_read")
+    def get_executions(self, start=None, cursor=None, limit=100):
+        """One page of spot executions, newest first, as (raw executions, next cursor); None on failure."""
+        try:
+            params = {"category": "spot", "limit": limit}
+            if start is not None:
+                params["startTime"] = int(start)
+            if cursor:
+                params["cursor"] = cursor
+            response = self.session.get_executions(**params)
+            if response["retCode"] == 0:
+                return response["result"]["list"], response["result"].get("nextPageCursor") or None
+            logger.error(f"Failed to fetch executions: {response['retMsg']}")
+            return None
+        except Exception as e:
+            logger.error(f"Exception in get_executions: {str(e)}")
+            return None
     
+    @rate_limited("position", coalesce=True)
     def get_positions(self):
         try:
             response = self.session.get_positions(category="linear")
             if response["retCode"] == 0:
-                return [
-                    {"symbol": pos["symbol"], "side": pos["side"], "size": pos["size"],
-                     "entry_price": pos["entryPrice"], "unrealised_pnl": pos["unrealisedPnl"]}
-                    for pos in response["result"]["list"] if float(pos["size"]) > 0
-                ]
+                return [self.position_from_raw(pos) for pos in response["result"]["list"] if float(pos["size"]) > 0]
             logger.error(f"Failed to fetch positions: {response['retMsg']}")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Exception in get_positions: {str(e)}")
-            return []
+            return None
     
-    def cancel_all_orders(self):
+    @rate_limited("market", coalesce=True)
+    def get_ticker(self, symbol):
         try:
-            response = self.session.cancel_all_orders(category="spot")
+            response = self.session.get_tickers(category="spot", symbol=symbol)
+            if response["retCode"] == 0 and response["result"]["list"]:
+                ticker = response["result"]["list"][0]
+                return {"symbol": ticker["symbol"], "last_price": ticker["lastPrice"]}
+            logger.error(f"Failed to fetch ticker for {symbol}: {response['retMsg']}")
+            return None
+        except Exception as e:
+            logger.error(f"Exception in get_ticker: {str(e)}")
+            return None
+    
+    @rate_limited("market", coalesce=True)
+    def get_price_snapshot(self):
+        """Last price for every spot symbol in one tickers call: {symbol: price}."""
+        try:
+            response = self.session.get_tickers(category="spot")
+            if response["retCode"] == 0:
+                return {ticker["symbol"]: float(ticker["lastPrice"]) for ticker in response["result"]["list"]}
+            logger.error(f"Failed to fetch price snapshot: {response['retMsg']}")
+            return {}
+        except Exception as e:
+            logger.error(f"Exception in get_price_snapshot: {str(e)}")
+            return {}
+    
+    @rate_limited("market", coalesce=True)
+    def get_ticker_table(self):
+        """24h stats for every spot symbol in one tickers call, as parallel columns; None on failure."""
+        try:
+            response = self.session.get_tickers(category="spot")
+            if response["retCode"] == 0:
+                rows = response["result"]["list"]
+                column = lambda key: [float(ticker.get(key) or "nan") for ticker in rows]
+                return {"symbol": [ticker["symbol"] for ticker in rows], "last": column("lastPrice"),
+                        "high": column("highPrice24h"), "low": column("lowPrice24h"), "change": column("price24hPcnt"),
+                        "volume": column("volume24h"), "turnover": column("turnover24h")}
+            logger.error(f"Failed to fetch ticker table: {response['retMsg']}")
+            return None
+        except Exception as e:
+            logger.error(f"Exception in get_ticker_table: {str(e)}")
+            return None
+    
+    @rate_limited("trade", priority=PRIORITY_ORDER)
+    def cancel_all_orders(self, symbol=None):
+        try:
+            if symbol:
+                response = self.session.cancel_all_orders(category="spot", symbol=symbol)
+            else:
+                response = self.session.cancel_all_orders(category="spot")
             if response["retCode"] == 0:
                 return "All open orders cancelled successfully."
             logger.error(f"Failed to cancel orders: {response['retMsg']}")
@@ -81,17 +305,19 @@ class BybitAPI:
             logger.error(f"Exception in cancel_all_orders: {str(e)}")
             return f"Exception: {e}"
     
+    @rate_limited("account", coalesce=True)
     def get_wallet_balance(self):
         try:
             response = self.session.get_wallet_balance(accountType="SPOT")
             if response["retCode"] == 0:
                 return response["result"]["list"][0]["coin"]
             logger.error(f"Failed to fetch wallet balance: {response['retMsg']}")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Exception in get_wallet_balance: {str(e)}")
-            return []
+            return None
     
+    @rate_limited("market", coalesce=True)
     def get_historical_data(self, symbol, interval="60", limit=200):
         """Fetch historical OHLCV data for a symbol."""
         try:
@@ -117,4 +343,22 @@ class BybitAPI:
             return []
         except Exception as e:
             logger.error(f"Exception in get_historical_data: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+    
+    @rate_limited("market", coalesce=True)
+    def get_kline_page(self, symbol, interval, start=None, end=None, limit=1000):
+        """One page of klines as [time_ms, open, high, low, close, volume] rows, oldest first; None on failure."""
+        try:
+            params = {"category": "spot", "symbol": symbol, "interval": str(interval), "limit": limit}
+            if start is not None:
+                params["start"] = int(start)
+            if end is not None:
+                params["end"] = int(end)
+            response = self.session.get_kline(**params)
+            if response["retCode"] == 0:
+                return [[float(value) for value in kline[:6]] for kline in reversed(response["result"]["list"])]
+            logger.error(f"Failed to fetch klines: {response['retMsg']}")
+            return None
+        except Exception as e:
+            logger.error(f"Exception in get_kline_page: {str(e)}")
+            return None
@@ -0,0 +1,116 @@
+import threading
+import time
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+ROW_BYTES = len(COLUMNS) * 8
+KLINE_PAGE_LIMIT = 1000
+INTERVAL_MS = {
+    "1": 60_000, "3": 180_000, "5": 300_000, "15": 900_000, "30": 1_800_000,
+    "60": 3_600_000, "120": 7_200_000, "240": 14_400_000, "360": 21_600_000, "720": 43_200_000,
+    "D": 86_400_000, "W": 604_800_000, "M": 2_678_400_000
+}
+
+class CandleStore:
+    """On-disk OHLCV store: one append-only float64 file per symbol/interval, read back via memmap.
+
+    Rows are (time_ms, open, high, low, close, volume), closed candles only, in time order.
+    """
+
+    def __init__(self, api, root):
+        self.api = api
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _path(self, symbol, interval):
+        return os.path.join(self.root, symbol, f"{interval}.f64")
+
+    def _lock(self, symbol, interval):
+        with self._locks_guard:
+            return self._locks.setdefault((symbol, interval), threading.Lock())
+
+    def load(self, symbol, interval):
+        """All stored candles as a read-only (n, 6) array backed by the file."""
+        path = self._path(symbol, interval)
+        if not os.path.exists(path) or os.path.getsize(path) < ROW_BYTES:
+            return np.empty((0, len(COLUMNS)))
+        rows = os.path.getsize(path) // ROW_BYTES
+        return np.memmap(path, dtype=np.float64, mode="r", shape=(rows, len(COLUMNS)))
+
+    def _fetch_back(self, symbol, interval, start_ms, end_ms):
+        """Page get_kline backwards from end_ms until start_ms; returns closed candles in time order."""
+        pages = []
+        while end_ms >= start_ms:
+            page = self.api.get_kline_page(symbol, interval, start=start_ms, end=end_ms, limit=KLINE_PAGE_LIMIT)
+            if page is None:
+                raise RuntimeError(f"kline fetch failed for {symbol} {interval}")
+            if not page:
+                break
+            pages.append(np.asarray(page, dtype=np.float64))
+            oldest = page[0][0]
+            if len(page) < KLINE_PAGE_LIMIT:
+                break
+            end_ms = oldest - 1
+        if not pages:
+            return np.empty((0, len(COLUMNS)))
+        rows = np.concatenate(pages[::-1])
+        rows = rows[np.unique(rows[:, 0], return_index=True)[1]]
+        # Drop the candle that is still forming
+        closed = rows[:, 0] + INTERVAL_MS[interval] <= time.time() * 1000
+        return rows[closed & (rows[:, 0] >= start_ms)]
+
+    def sync(self, symbol, interval, start_ms=None):
+        """Bring the store up to date: backfill from start_ms if it predates the store, then fetch the tail."""
+        interval = str(interval)
+        now_ms = int(time.time() * 1000)
+        with self._lock(symbol, interval):
+            stored = self.load(symbol, interval)
+            path = self._path(symbol, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            added = 0
+            if len(stored) and start_ms is not None and start_ms < stored[0, 0]:
+                head = self._fetch_back(symbol, interval, start_ms, int(stored[0, 0]) - 1)
+                if len(head):
+                    # Older history has to go in front, so rewrite the file once
+                    merged = np.concatenate([head, np.asarray(stored)])
+                    tmp = path + ".tmp"
+                    merged.tofile(tmp)
+                    os.replace(tmp, path)
+                    added += len(head)
+                    stored = self.load(symbol, interval)
+            if len(stored):
+                tail_start = int(stored[-1, 0]) + INTERVAL_MS[interval]
+            else:
+                tail_start = start_ms if start_ms is not None else now_ms - INTERVAL_MS[interval] * KLINE_PAGE_LIMIT
+            tail = self._fetch_back(symbol, interval, tail_start, now_ms)
+            if len(tail):
+                with open(path, "ab") as f:
+                    tail.tofile(f)
+                added += len(tail)
+        if added:
+            logger.info("Candle store %s %s: +%d candles", symbol, interval, added)
+        return added
+
+    def range(self, symbol, interval, start_ms=None, end_ms=None, sync=False):
+        """Candles with start_ms <= time <= end_ms as an (n, 6) array view, no network unless sync=True."""
+        interval = str(interval)
+        if sync:
+            self.sync(symbol, interval, start_ms)
+        rows = self.load(symbol, interval)
+        times = rows[:, 0]
+        lo = 0 if start_ms is None else np.searchsorted(times, start_ms, side="left")
+        hi = len(rows) if end_ms is None else np.searchsorted(times, end_ms, side="right")
+        return rows[lo:hi]
+
+    def frame(self, symbol, interval, start_ms=None, end_ms=None, sync=False):
+        """Same as range() but as a pandas DataFrame indexed by UTC timestamp."""
+        import pandas as pd
+        rows = self.range(symbol, interval, start_ms, end_ms, sync)
+        df = pd.DataFrame(np.asarray(rows), columns=COLUMNS)
+        df.index = pd.to_datetime(df.pop("time"), unit="ms", utc=True)
+        return df
@@ -0,0 +1,66 @@
+"""State-changing actions on bots and mode, always applied in the leader process.
+
+Routes call dispatch(); in the leader it applies at once, in a follower worker it goes through
+the shared command inbox and the leader applies it a poll interval later.
+"""
+import logging
+from .bots import BotConfig, bots
+from .sweep import apply_params
+
+logger = logging.getLogger(__name__)
+
+def _config(bot, config):
+    for key, value in config.items():
+        if key not in ("name", "dca_enabled"):
+            setattr(bot, key, value)
+    bots.save_config(bot)
+    logger.info("Bot %s configured: %s", bot.name, bot.config())
+
+def _sweep(bot, params):
+    apply_params(bot, params)
+    bots.save_config(bot)
+    logger.info("%s configured from sweep: %s", bot.name, params)
+
+def apply_command(kind, payload):
+    from . import set_active_mode
+    if kind == "mode":
+        set_active_mode(payload["mode"])
+        logger.info("Switched to %s mode", payload["mode"])
+        for bot in bots:
+            bot.clear_positions()
+    elif kind == "clear_positions":
+        for bot in bots:
+            bot.clear_positions()
+    elif kind == "bot_add":
+        if payload["name"] in bots:
+            raise ValueError(f"Bot {payload['name']} already exists")
+        bots.add(BotConfig(payload["name"], dca_enabled=payload["dca_enabled"]))
+        logger.info("Bot %s added (%s)", payload["name"], "dca" if payload["dca_enabled"] else "market")
+    else:
+        bot = bots.get(payload["bot"])
+        if bot is None:
+            raise ValueError(f"Unknown bot: {payload['bot']}")
+        if kind == "config":
+            _config(bot, payload["config"])
+        elif kind == "sweep":
+            _sweep(bot, payload["params"])
+        elif kind == "bot_remove":
+            if bot.positions:
+                raise ValueError(f"Bot {bot.name} still holds positions")
+            bots.remove(bot.name)
+            logger.info("Bot %s removed", bot.name)
+        else:
+            raise ValueError(f"Unknown command: {kind}")
+
+def dispatch(kind, **payload):
+    """Apply now if this process leads, otherwise queue for the leader; returns an error message or None."""
+    from . import leader, inbox
+    if leader is None or leader.is_leader:
+        try:
+            apply_command(kind, payload)
+        except ValueError as e:
+            return str(e)
+        return None
+    inbox.put(kind, payload)
+    logger.info("Forwarded %s command to the leader process", kind)
+    return None
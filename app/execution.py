@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+class OrderExecutor:
+    """Runs multi-leg order jobs (e.g. a DCA ladder) in the background, legs submitted concurrently."""
+
+    def __init__(self, max_workers=8, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="order-exec")
+        self._lock = threading.Lock()
+
+    def submit(self, api, symbol, legs, on_placed=None, label=""):
+        """Queue limit-order legs ({"side", "qty", "price"}) and return the job id straight away.
+
+        on_placed(leg) is called, serialised, for each leg the exchange accepted.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "job_id": job_id,
+            "label": label,
+            "symbol": symbol,
+            "status": "queued",
+            "created_at": time.time(),
+            "finished_at": None,
+            "legs": [dict(leg, index=i + 1, status="queued", response=None, latency_ms=None) for i, leg in enumerate(legs)],
+            "_pending": len(legs),
+            "_cancelled": False,
+            "_done": threading.Event()
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+        if not legs:
+            self._finish(job)
+        for leg in job["legs"]:
+            self._pool.submit(self._place_leg, api, job, leg, on_placed)
+        logger.info("Order job %s queued: %s %d legs for %s", job_id, label, len(legs), symbol)
+        return job_id
+
+    def cancel(self, job_id, timeout=None):
+        """Stop placing a job's remaining legs; with a timeout, wait for legs already in flight.
+
+        Returns True once no leg of the job can still reach the exchange.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return True
+        job["_cancelled"] = True
+        return job["_done"].wait(timeout) if timeout else job["_done"].is_set()
+
+    def _place_leg(self, api, job, leg, on_placed):
+        if job["_cancelled"]:
+            leg["status"] = "cancelled"
+            self._leg_done(job)
+            return
+        job["status"] = "running"
+        started = time.perf_counter()
+        try:
+            response = api.place_limit_order(job["symbol"], leg["side"], leg["qty"], leg["price"])
+            ok = response.startswith("Limit")
+        except Exception as e:
+            response, ok = f"Exception: {e}", False
+        leg["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        leg["response"] = response
+        leg["status"] = "placed" if ok else "failed"
+        if ok:
+            logger.info("Job %s leg #%d placed for %s: qty=%s at %s, response=%s", job["job_id"], leg["index"], job["symbol"], leg["qty"], leg["price"], response)
+        else:
+            logger.error("Job %s leg #%d failed for %s: %s", job["job_id"], leg["index"], job["symbol"], response)
+        self._leg_done(job, on_placed if ok else None, leg)
+
+    def _leg_done(self, job, on_placed=None, leg=None):
+        with self._lock:
+            if on_placed:
+                try:
+                    on_placed(leg)
+                except Exception as e:
+                    logger.error("Order job %s callback failed: %s", job["job_id"], str(e))
+            job["_pending"] -= 1
+            done = job["_pending"] == 0
+        if done:
+            self._finish(job)
+
+    def _finish(self, job):
+        failed = sum(1 for leg in job["legs"] if leg["status"] == "failed")
+        if job["_cancelled"]:
+            job["status"] = "cancelled"
+        else:
+            job["status"] = "done" if not failed else ("failed" if failed == len(job["legs"]) else "partial")
+        job["finished_at"] = time.time()
+        job["_done"].set()
+        logger.info("Order job %s %s in %.0f ms", job["job_id"], job["status"], (job["finished_at"] - job["created_at"]) * 1000)
+
+    def get_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return {k: v for k, v in job.items() if not k.startswith("_")}
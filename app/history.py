@@ -0,0 +1,382 @@
+"""Trade history: every execution, and the bot round trips built from them, in SQLite.
+
+Fills come from the private execution stream (or the paper exchange) and are folded into
+per-symbol average-cost lots as they are written. A lot that goes flat becomes a row in `trades`
+and is added to small rollups (per day and bot, per bot and symbol), so PnL, win-rate and drawdown
+queries read a few rows per day however many years of fills sit underneath.
+"""
+import sqlite3
+import threading
+import queue
+import time
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    exec_id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    order_id TEXT,
+    price REAL NOT NULL,
+    qty REAL NOT NULL,
+    value REAL NOT NULL,
+    fee REAL NOT NULL,
+    bot TEXT
+);
+CREATE INDEX IF NOT EXISTS fills_mode_ts ON fills (mode, ts);
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode TEXT NOT NULL,
+    bot TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    opened_at REAL NOT NULL,
+    closed_at REAL NOT NULL,
+    qty REAL NOT NULL,
+    cost REAL NOT NULL,
+    proceeds REAL NOT NULL,
+    fees REAL NOT NULL,
+    pnl REAL NOT NULL,
+    fills INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_mode_closed ON trades (mode, closed_at);
+CREATE TABLE IF NOT EXISTS lots (
+    mode TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    bot TEXT NOT NULL,
+    opened_at REAL NOT NULL,
+    qty REAL NOT NULL,
+    cost REAL NOT NULL,
+    bought REAL NOT NULL,
+    spent REAL NOT NULL,
+    proceeds REAL NOT NULL,
+    fees REAL NOT NULL,
+    pnl REAL NOT NULL,
+    fills INTEGER NOT NULL,
+    PRIMARY KEY (mode, symbol)
+);
+"""
+
+# Closed round trips are summed into rollups at three grains; a query reads the smallest one that can answer it
+ROLLUPS = {
+    "daily": ("mode", "day", "bot", "symbol"),  # any filter and grouping
+    "bot_days": ("mode", "day", "bot"),  # summaries, drawdown, PnL by day or bot
+    "totals": ("mode", "bot", "symbol")  # all-time PnL by symbol
+}
+ROLLUP_SUMS = ("trades", "wins", "pnl", "fees", "gross_profit", "gross_loss")
+SCHEMA += "".join(f"""
+CREATE TABLE IF NOT EXISTS {name} (
+    {", ".join(f"{key} TEXT NOT NULL" for key in keys)},
+    trades INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    pnl REAL NOT NULL,
+    fees REAL NOT NULL,
+    gross_profit REAL NOT NULL,
+    gross_loss REAL NOT NULL,
+    PRIMARY KEY ({", ".join(keys)})
+) WITHOUT ROWID;""" for name, keys in ROLLUPS.items())
+
+LOT_FIELDS = ("bot", "opened_at", "qty", "cost", "bought", "spent", "proceeds", "fees", "pnl", "fills")
+GROUPS = ("bot", "symbol", "day")
+# A round trip is closed once less than this share of what it bought is left (fee and lot-size dust)
+DUST = 0.01
+UNATTRIBUTED = "manual"
+
+def parse_execution(raw, quote="USDT"):
+    """A Bybit (or paper) execution as a fill row; the fee in quote coin, qty as base actually received."""
+    price, qty = float(raw["execPrice"]), float(raw["execQty"])
+    fee = float(raw.get("execFee") or 0)
+    if (raw.get("feeCurrency") or quote) != quote:
+        # Spot buys pay their fee in the base coin, which comes off what was received
+        if raw["side"] == "Buy":
+            qty -= fee
+        fee *= price
+    ts = int(raw["execTime"]) / 1000
+    return {"exec_id": raw.get("execId") or f"{raw['orderId']}-{raw['execTime']}-{raw['execQty']}", "ts": ts,
+            "symbol": raw["symbol"], "side": raw["side"], "order_id": raw.get("orderId"), "price": price, "qty": qty,
+            "value": float(raw.get("execValue") or price * float(raw["execQty"])), "fee": fee}
+
+def day_of(ts):
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+def max_drawdown(pnls):
+    """Largest peak-to-trough fall of the running total of a PnL series."""
+    total = peak = worst = 0.0
+    for pnl in pnls:
+        total += pnl
+        peak = max(peak, total)
+        worst = max(worst, peak - total)
+    return worst
+
+class TradeHistory:
+    """Execution and round-trip store; the leader writes, every worker can query.
+
+    record() only enqueues, like the state journal: one writer thread inserts each batch in one
+    transaction and keeps the open lots. Query results are cached until the database changes.
+    """
+
+    def __init__(self, path, registry=None, get_mode=None, quote="USDT", flush_interval=0.25, max_batch=1000):
+        self.path = path
+        self.registry = registry
+        self.get_mode = get_mode
+        self.quote = quote
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.lots = {}  # (mode, symbol) -> open round trip
+        self.stats = {"fills": 0, "duplicates": 0, "trades": 0, "batches": 0, "errors": 0, "backfilled": 0}
+        self._queue = queue.Queue()
+        self._db = None
+        self._reader = None
+        self._read_lock = threading.Lock()
+        self._cache = {}
+        self._cache_version = None
+        self._thread = None
+
+    def _connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        return db
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._db = self._connect()
+        self.lots = {(mode, symbol): dict(zip(LOT_FIELDS, values)) for mode, symbol, *values in
+                     self._db.execute(f"SELECT mode, symbol, {', '.join(LOT_FIELDS)} FROM lots")}
+        self._thread = threading.Thread(target=self._run, name="trade-history", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def flush(self, timeout=5):
+        """Block until everything recorded so far is written."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def record(self, mode, executions):
+        """Execution handler (account mirror or paper exchange): raw execution dicts for one account mode."""
+        # Only the writer process keeps history; follower workers see the same stream and drop it
+        if self._thread is not None:
+            self._queue.put((mode, executions))
+
+    def backfill(self, mode, api, max_pages=50):
+        """Fetch executions since the newest stored one over REST, e.g. to cover a restart; the stream then carries on."""
+        if self._db is None:
+            return 0
+        with self._read_lock:
+            newest = self._read().execute("SELECT MAX(ts) FROM fills WHERE mode = ?", (mode,)).fetchone()[0]
+        start = int(newest * 1000) + 1 if newest else None
+        executions, cursor = [], None
+        for _ in range(max_pages):
+            page = api.get_executions(start=start, cursor=cursor)
+            if page is None:
+                break
+            rows, cursor = page
+            executions.extend(row for row in rows if row.get("category", "spot") == "spot")
+            if not cursor:
+                break
+        if executions:
+            # Pages come newest first; lots have to see fills in the order they happened
+            self._queue.put((mode, executions[::-1]))
+            self.stats["backfilled"] += len(executions)
+        logger.info("Trade history backfilled %d %s executions", len(executions), mode)
+        return len(executions)
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            updates = [item for item in batch if isinstance(item, tuple)]
+            if updates:
+                self._write(updates)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    running = False
+        self._db.close()
+        self._db = None
+
+    def _owner(self, mode, symbol):
+        # Bots trade the active mode only. Their entries fill a moment before the position is
+        # recorded; the batch delay covers that
+        if self.registry is None or (self.get_mode is not None and mode != self.get_mode()):
+            return UNATTRIBUTED
+        bots = self.registry.bots_for_symbol(symbol)
+        return min(bot.name for bot in bots) if bots else UNATTRIBUTED
+
+    def _write(self, updates):
+        touched = set()
+        try:
+            with self._db:
+                for mode, executions in updates:
+                    for raw in executions:
+                        fill = parse_execution(raw, self.quote)
+                        touched.add((mode, fill["symbol"]))
+                        self._apply(mode, fill)
+                for key in touched:
+                    lot = self.lots.get(key)
+                    if lot is None:
+                        self._db.execute("DELETE FROM lots WHERE mode = ? AND symbol = ?", key)
+                    else:
+                        self._db.execute(f"INSERT OR REPLACE INTO lots (mode, symbol, {', '.join(LOT_FIELDS)}) VALUES ({', '.join('?' * (len(LOT_FIELDS) + 2))})",
+                                         (*key, *(lot[name] for name in LOT_FIELDS)))
+        except (sqlite3.Error, KeyError, ValueError) as e:
+            self.stats["errors"] += 1
+            logger.error("Trade history write failed: %s", str(e))
+            # The transaction rolled back; reload lots so memory matches the database again
+            self.lots = {(mode, symbol): dict(zip(LOT_FIELDS, values)) for mode, symbol, *values in
+                         self._db.execute(f"SELECT mode, symbol, {', '.join(LOT_FIELDS)} FROM lots")}
+            return
+        self.stats["batches"] += 1
+
+    def _apply(self, mode, fill):
+        key = (mode, fill["symbol"])
+        lot = self.lots.get(key)
+        if fill["side"] == "Buy" and lot is None:
+            lot = self.lots[key] = {"bot": self._owner(mode, fill["symbol"]), "opened_at": fill["ts"], "qty": 0.0, "cost": 0.0,
+                                    "bought": 0.0, "spent": 0.0, "proceeds": 0.0, "fees": 0.0, "pnl": 0.0, "fills": 0}
+        inserted = self._db.execute("INSERT OR IGNORE INTO fills (exec_id, mode, ts, symbol, side, order_id, price, qty, value, fee, bot) "
+                                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (fill["exec_id"], mode, fill["ts"], fill["symbol"], fill["side"], fill["order_id"], fill["price"],
+                                     fill["qty"], fill["value"], fill["fee"], lot["bot"] if lot else UNATTRIBUTED)).rowcount
+        if not inserted:
+            # Already stored (stream and backfill overlap)
+            self.stats["duplicates"] += 1
+            if lot is not None and not lot["fills"]:
+                del self.lots[key]
+            return
+        self.stats["fills"] += 1
+        if lot is None:
+            return  # selling coin no recorded round trip bought
+        lot["fills"] += 1
+        lot["fees"] += fill["fee"]
+        if fill["side"] == "Buy":
+            lot["qty"] += fill["qty"]
+            lot["bought"] += fill["qty"]
+            lot["cost"] += fill["value"] + fill["fee"]
+            lot["spent"] += fill["value"]
+            return
+        # Sells realize against the average cost; any part beyond the lot was held from before
+        sold = min(fill["qty"], lot["qty"])
+        share = sold / fill["qty"] if fill["qty"] else 0
+        average = lot["cost"] / lot["qty"] if lot["qty"] else 0
+        lot["pnl"] += (fill["value"] - fill["fee"]) * share - average * sold
+        lot["proceeds"] += fill["value"] * share
+        lot["cost"] -= average * sold
+        lot["qty"] -= sold
+        if lot["qty"] <= lot["bought"] * DUST:
+            self._close(mode, fill["symbol"], lot, fill["ts"])
+            del self.lots[key]
+
+    def _close(self, mode, symbol, lot, ts):
+        pnl = lot["pnl"]
+        self._db.execute("INSERT INTO trades (mode, bot, symbol, opened_at, closed_at, qty, cost, proceeds, fees, pnl, fills) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (mode, lot["bot"], symbol, lot["opened_at"], ts, lot["bought"], lot["spent"], lot["proceeds"], lot["fees"], pnl, lot["fills"]))
+        keys = {"mode": mode, "day": day_of(ts), "bot": lot["bot"], "symbol": symbol}
+        sums = (1, int(pnl > 0), pnl, lot["fees"], max(pnl, 0), min(pnl, 0))
+        for name, columns in ROLLUPS.items():
+            self._db.execute(f"INSERT INTO {name} ({', '.join(columns + ROLLUP_SUMS)}) VALUES ({', '.join('?' * (len(columns) + len(ROLLUP_SUMS)))}) "
+                             f"ON CONFLICT ({', '.join(columns)}) DO UPDATE SET {', '.join(f'{c} = {c} + excluded.{c}' for c in ROLLUP_SUMS)}",
+                             (*(keys[column] for column in columns), *sums))
+        self.stats["trades"] += 1
+
+    def _read(self):
+        if self._reader is None:
+            if not os.path.exists(self.path):
+                self._connect().close()
+            self._reader = sqlite3.connect(self.path, check_same_thread=False)
+        return self._reader
+
+    def _cached(self, key, compute):
+        with self._read_lock:
+            db = self._read()
+            # data_version moves whenever any connection (this process's writer or the leader's) commits
+            version = db.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._cache_version:
+                self._cache, self._cache_version = {}, version
+            if key not in self._cache:
+                self._cache[key] = compute(db)
+            return self._cache[key]
+
+    @staticmethod
+    def _where(mode, bot=None, since=None, until=None):
+        clauses, params = ["mode = ?"], [mode]
+        for clause, value in (("bot = ?", bot), ("day >= ?", since), ("day <= ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    def pnl_by(self, mode, group="bot", bot=None, since=None, until=None):
+        """Realized PnL, trade count, win rate and fees per bot, symbol or UTC day (days YYYY-MM-DD, inclusive)."""
+        if group not in GROUPS:
+            raise ValueError(f"Unknown group: {group}")
+        where, params = self._where(mode, bot, since, until)
+        table = "bot_days" if group != "symbol" else "totals" if since is None and until is None else "daily"
+
+        def compute(db):
+            rows = db.execute(f"SELECT {group}, SUM(trades), SUM(wins), SUM(pnl), SUM(fees), SUM(gross_profit), SUM(gross_loss) "
+                              f"FROM {table} WHERE {where} GROUP BY {group} ORDER BY {group}", params).fetchall()
+            return [{group: key, "trades": trades, "win_rate": round(wins / trades * 100, 2) if trades else None, "pnl": round(pnl, 8),
+                     "fees": round(fees, 8), "profit_factor": round(profit / -loss, 4) if loss else None}
+                    for key, trades, wins, pnl, fees, profit, loss in rows]
+
+        return self._cached(("pnl_by", mode, group, bot, since, until), compute)
+
+    def summary(self, mode, bot=None, since=None, until=None):
+        """Totals, win rate, today's PnL and max drawdown (on daily closes) of realized round trips."""
+        where, params = self._where(mode, bot, since, until)
+        today = day_of(time.time())
+
+        def compute(db):
+            days = db.execute(f"SELECT day, SUM(trades), SUM(wins), SUM(pnl), SUM(fees) FROM bot_days WHERE {where} GROUP BY day ORDER BY day",
+                              params).fetchall()
+            trades = sum(row[1] for row in days)
+            wins = sum(row[2] for row in days)
+            pnl = sum(row[3] for row in days)
+            open_lots = db.execute("SELECT COUNT(*) FROM lots WHERE mode = ?" + (" AND bot = ?" if bot else ""),
+                                   [mode] + ([bot] if bot else [])).fetchone()[0]
+            return {"trades": trades, "wins": wins, "win_rate": round(wins / trades * 100, 2) if trades else None,
+                    "realized_pnl": round(pnl, 2), "fees": round(sum(row[4] for row in days), 2),
+                    "today_pnl": round(sum(row[3] for row in days if row[0] == today), 2),
+                    "max_drawdown": round(max_drawdown(row[3] for row in days), 2), "open_trades": open_lots,
+                    "first_day": days[0][0] if days else None}
+
+        # today_pnl changes at midnight UTC even when no trade does
+        return self._cached(("summary", mode, bot, since, until, today), compute)
+
+    def recent_trades(self, mode, limit=20, bot=None):
+        def compute(db):
+            rows = db.execute("SELECT trade_id, bot, symbol, opened_at, closed_at, qty, cost, proceeds, fees, pnl, fills FROM trades "
+                              "WHERE mode = ?" + (" AND bot = ?" if bot else "") + " ORDER BY closed_at DESC LIMIT ?",
+                              [mode] + ([bot] if bot else []) + [limit]).fetchall()
+            names = ("trade_id", "bot", "symbol", "opened_at", "closed_at", "qty", "cost", "proceeds", "fees", "pnl", "fills")
+            return [dict(zip(names, row)) for row in rows]
+
+        return self._cached(("recent", mode, limit, bot), compute)
@@ -0,0 +1,100 @@
+"""Closed-loop HTTP benchmark for a running instance: /webhook and /overview throughput and latency.
+
+Usage: python -m app.httpbench --url http://127.0.0.1:5000 --requests 2000 --concurrency 16
+
+Webhook load goes to a dedicated, empty bench bot and only runs against a server in testnet mode.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import argparse
+import os
+import time
+import numpy as np
+import requests
+
+BENCH_BOT = "HttpBench"
+
+def _login(session, url, username, password):
+    session.post(f"{url}/login", data={"username": username, "password": password}, allow_redirects=False, timeout=10)
+
+def bench(url, path, requests_total, concurrency, make_request, username=None, password=None):
+    """Run requests_total calls over `concurrency` keep-alive sessions; returns req/s and latency percentiles."""
+    per_worker = requests_total // concurrency
+    latencies = np.zeros(per_worker * concurrency)
+    statuses = Counter()
+
+    def worker(k):
+        session = requests.Session()
+        if username:
+            _login(session, url, username, password)
+        local = Counter()
+        for i in range(per_worker):
+            started = time.perf_counter()
+            try:
+                local[make_request(session, url + path, k * per_worker + i).status_code] += 1
+            except requests.RequestException:
+                local["error"] += 1
+            latencies[k * per_worker + i] = time.perf_counter() - started
+        return local
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for local in pool.map(worker, range(concurrency)):
+            statuses.update(local)
+    elapsed = time.perf_counter() - started
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+        "statuses": dict(statuses)
+    }
+
+def webhook_request(secret, symbols, bot=BENCH_BOT):
+    def make(session, target, i):
+        # Sells for a bot holding nothing are rejected by the ingest worker before any order is sent.
+        # Unique signal ids so the dedup window does not turn the run into duplicate acks
+        return session.post(target, json={"secret": secret, "symbol": symbols[i % len(symbols)], "price": 1, "quantity": 1,
+                                          "action": "sell", "bot": bot, "signal_id": f"bench-{time.time_ns()}-{i}"}, timeout=30)
+    return make
+
+def server_mode(session, url):
+    """Trading mode the server's webhook signals run in ("testnet"/"live"), or None if it cannot be read."""
+    response = session.get(f"{url}/webhook/status", allow_redirects=False, timeout=10)
+    if response.status_code != 200:
+        return None
+    return response.json().get("mode")
+
+def get_request(session, target, i):
+    return session.get(target, timeout=30)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.httpbench", description="Benchmark /webhook and /overview on a running server.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--paths", default="/webhook,/overview")
+    parser.add_argument("--symbols", default="BTCUSDT,ETHUSDT,SOLUSDT,XRPUSDT")
+    args = parser.parse_args(argv)
+    paths = args.paths.split(",")
+    admin = requests.Session()
+    if "/webhook" in paths:
+        _login(admin, args.url, os.getenv("APP_USERNAME"), os.getenv("APP_PASSWORD"))
+        mode = server_mode(admin, args.url)
+        if mode != "testnet":
+            parser.error(f"Refusing to post webhook signals: server reports mode {mode!r}, not testnet")
+        admin.post(f"{args.url}/bots/add", data={"name": BENCH_BOT, "kind": "market"}, allow_redirects=False, timeout=10)
+    try:
+        for path in paths:
+            if path == "/webhook":
+                result = bench(args.url, path, args.requests, args.concurrency, webhook_request(os.getenv("WEBHOOK_SECRET"), args.symbols.split(",")))
+            else:
+                result = bench(args.url, path, args.requests, args.concurrency, get_request, os.getenv("APP_USERNAME"), os.getenv("APP_PASSWORD"))
+            print(" ".join(f"{key}={value}" for key, value in result.items()))
+    finally:
+        if "/webhook" in paths:
+            admin.post(f"{args.url}/bots/{BENCH_BOT}/remove", allow_redirects=False, timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+import json
+import time
+import uuid
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS inbox_status ON inbox (status, seq);
+CREATE TABLE IF NOT EXISTS signal_keys (
+    key TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    id TEXT NOT NULL
+);
+"""
+
+class CommandInbox:
+    """Cross-process hand-off from follower workers to the leader, in a shared SQLite (WAL) file.
+
+    Followers put() webhook signals and state-changing commands; the leader polls rows still
+    queued, in order, and records each outcome. Signal dedup keys live here too, so a retry that
+    lands on a different worker is still caught.
+    """
+
+    def __init__(self, path, poll_interval=0.02, keep_seconds=3600):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.keep_seconds = keep_seconds
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            # Acks survive a worker crash; an OS crash can lose the last few, which senders retry
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._local.db = db
+        return db
+
+    def _claim(self, db, key, item_id, window, now):
+        key = json.dumps(key)
+        row = db.execute("SELECT ts, id FROM signal_keys WHERE key = ?", (key,)).fetchone()
+        if row and now - row[0] < window:
+            return row[1]
+        db.execute("INSERT OR REPLACE INTO signal_keys (key, ts, id) VALUES (?, ?, ?)", (key, now, item_id))
+        return None
+
+    def claim(self, key, window):
+        """Dedup only, for signals the leader queues itself: returns ("queued" | "duplicate", id)."""
+        return self.put(None, None, key, window)
+
+    def put(self, kind, payload, key=None, window=None):
+        """Queue a command; with a dedup key, returns ("duplicate", id) if the key was seen within window."""
+        item_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            existing = self._claim(db, key, item_id, window, now) if key is not None else None
+            if existing is None and kind is not None:
+                db.execute("INSERT INTO inbox (id, ts, kind, payload) VALUES (?, ?, ?, ?)", (item_id, now, kind, json.dumps(payload)))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        if existing is not None:
+            return "duplicate", existing
+        return "queued", item_id
+
+    def release(self, key):
+        """Forget a claimed key, e.g. when the signal could not be queued and the sender should retry."""
+        self._db().execute("DELETE FROM signal_keys WHERE key = ?", (json.dumps(key),))
+
+    def set_result(self, item_id, status, result):
+        self._db().execute("UPDATE inbox SET status = ?, result = ? WHERE id = ?", (status, json.dumps(result), item_id))
+
+    def get(self, item_id):
+        row = self._db().execute("SELECT id, ts, kind, payload, status, result FROM inbox WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            return None
+        return {"signal_id": row[0], "received_at": row[1], "kind": row[2], **json.loads(row[3]), "status": row[4],
+                "result": json.loads(row[5]) if row[5] else None}
+
+    def start(self, apply):
+        """Leader side: apply(kind, payload, item_id) for every queued row, oldest first."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(apply,), name="command-inbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, apply):
+        last_prune = 0
+        while not self._stop.is_set():
+            try:
+                rows = self._db().execute("SELECT seq, id, kind, payload FROM inbox WHERE status = 'queued' ORDER BY seq LIMIT 500").fetchall()
+                for seq, item_id, kind, payload in rows:
+                    self._db().execute("UPDATE inbox SET status = 'taken' WHERE seq = ?", (seq,))
+                    try:
+                        apply(kind, json.loads(payload), item_id)
+                    except Exception as e:
+                        logger.error("Failed to apply %s command %s from inbox: %s", kind, item_id, str(e))
+                        self.set_result(item_id, "failed", {"error": str(e)})
+                if time.time() - last_prune > 60:
+                    self._prune()
+                    last_prune = time.time()
+            except sqlite3.Error as e:
+                logger.error("Command inbox poll failed: %s", str(e))
+                rows = ()
+            if not rows:
+                self._stop.wait(self.poll_interval)
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        db = self._db()
+        db.execute("DELETE FROM inbox WHERE ts < ? AND status != 'queued'", (cutoff,))
+        db.execute("DELETE FROM signal_keys WHERE ts < ?", (cutoff,))
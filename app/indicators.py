@@ -0,0 +1,447 @@
+"""Streaming indicators and rule-driven entries, fed by the live price feed instead of TradingView.
+
+Every indicator updates in O(1) per closed candle and can be peeked at the forming candle on each
+tick, with the same definitions as the `ta` package (EMA with adjust=False, Wilder RSI and ATR,
+Bollinger bands on the population std). Bars are built from ticks after a warm-up from
+get_historical_data; rules fire the same signals the /webhook handler queues.
+"""
+from collections import deque
+import threading
+import json
+import math
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bybit kline intervals in seconds
+INTERVAL_SECONDS = {"1": 60, "3": 180, "5": 300, "15": 900, "30": 1800, "60": 3600, "120": 7200, "240": 14400,
+                    "360": 21600, "720": 43200, "D": 86400}
+
+class EMA:
+    __slots__ = ("period", "alpha", "value", "count")
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+        self.count = 0
+
+    @property
+    def ready(self):
+        return self.count >= self.period
+
+    def update(self, high, low, close):
+        self.value = close if self.value is None else self.value + self.alpha * (close - self.value)
+        self.count += 1
+        return self.value
+
+    def peek(self, high, low, close):
+        return close if self.value is None else self.value + self.alpha * (close - self.value)
+
+class SMA:
+    __slots__ = ("period", "window", "total")
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+    @property
+    def value(self):
+        return self.total / len(self.window) if self.window else None
+
+    def update(self, high, low, close):
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(close)
+        self.total += close
+        return self.value
+
+    def peek(self, high, low, close):
+        if not self.window:
+            return close
+        if len(self.window) < self.period:
+            return (self.total + close) / (len(self.window) + 1)
+        return (self.total - self.window[0] + close) / self.period
+
+class RSI:
+    """Wilder's RSI: gains and losses smoothed with alpha = 1/period."""
+    __slots__ = ("period", "prev", "gain", "loss", "count")
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev = None
+        self.gain = None
+        self.loss = None
+        self.count = 0
+
+    @property
+    def ready(self):
+        return self.count >= self.period
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if gain is None:
+            return None
+        return 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+
+    def _step(self, close):
+        # As in `ta`, the first close counts as a zero change, so smoothing starts from it
+        change = close - self.prev if self.prev is not None else 0.0
+        up, down = max(change, 0.0), max(-change, 0.0)
+        if self.gain is None:
+            return up, down
+        a = 1 / self.period
+        return self.gain + a * (up - self.gain), self.loss + a * (down - self.loss)
+
+    @property
+    def value(self):
+        return self._rsi(self.gain, self.loss)
+
+    def update(self, high, low, close):
+        self.gain, self.loss = self._step(close)
+        self.count += 1
+        self.prev = close
+        return self.value
+
+    def peek(self, high, low, close):
+        return self._rsi(*self._step(close))
+
+class ATR:
+    """Wilder's average true range: the mean of the first `period` true ranges, then smoothed."""
+    __slots__ = ("period", "prev_close", "value", "count", "_seed")
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.value = None
+        self.count = 0
+        self._seed = 0.0
+
+    @property
+    def ready(self):
+        return self.value is not None
+
+    def _true_range(self, high, low):
+        if self.prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def _next(self, high, low):
+        tr = self._true_range(high, low)
+        if self.value is not None:
+            return self.value + (tr - self.value) / self.period
+        if self.count + 1 == self.period:
+            return (self._seed + tr) / self.period
+        return None
+
+    def update(self, high, low, close):
+        value = self._next(high, low)
+        if self.value is None:
+            self._seed += self._true_range(high, low)
+        self.value = value
+        self.count += 1
+        self.prev_close = close
+        return self.value
+
+    def peek(self, high, low, close):
+        return self._next(high, low)
+
+class Bollinger:
+    """Moving average +/- k population standard deviations, from running sums over the window."""
+    __slots__ = ("period", "k", "window", "total", "squares")
+
+    def __init__(self, period=20, k=2):
+        self.period = period
+        self.k = k
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.squares = 0.0
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+    def _bands(self, total, squares, n):
+        mean = total / n
+        std = math.sqrt(max(squares / n - mean * mean, 0.0))
+        return mean - self.k * std, mean, mean + self.k * std
+
+    @property
+    def value(self):
+        return self._bands(self.total, self.squares, len(self.window)) if self.window else None
+
+    def update(self, high, low, close):
+        if len(self.window) == self.period:
+            dropped = self.window[0]
+            self.total -= dropped
+            self.squares -= dropped * dropped
+        self.window.append(close)
+        self.total += close
+        self.squares += close * close
+        return self.value
+
+    def peek(self, high, low, close):
+        if len(self.window) < self.period:
+            return self._bands(self.total + close, self.squares + close * close, len(self.window) + 1)
+        dropped = self.window[0]
+        return self._bands(self.total - dropped + close, self.squares - dropped * dropped + close * close, self.period)
+
+INDICATORS = {"ema": EMA, "sma": SMA, "rsi": RSI, "atr": ATR, "bb": Bollinger}
+
+class CandleSeries:
+    """Bars for one symbol and interval, built from ticks, plus the indicators computed over them."""
+
+    def __init__(self, symbol, interval):
+        self.symbol = symbol
+        self.interval = interval
+        self.seconds = INTERVAL_SECONDS[interval]
+        self.indicators = {}
+        self.bar = None  # [start, open, high, low, close] of the forming candle
+        self.ready = False  # warmed up and taking live ticks
+
+    def add(self, spec):
+        """spec is (kind, *params), e.g. ("ema", 21); shared by every rule that asks for it."""
+        if spec not in self.indicators:
+            self.indicators[spec] = INDICATORS[spec[0]](*spec[1:])
+            self.ready = False
+        return self.indicators[spec]
+
+    def _close(self, bar):
+        for indicator in self.indicators.values():
+            indicator.update(bar[2], bar[3], bar[4])
+
+    def warm_up(self, candles, now=None):
+        """candles: oldest first, as get_historical_data returns them reversed; the forming one stays open."""
+        now = time.time() if now is None else now
+        for indicator_spec in list(self.indicators):
+            self.indicators[indicator_spec] = INDICATORS[indicator_spec[0]](*indicator_spec[1:])
+        self.bar = None
+        for candle in candles:
+            bar = [candle["time"], candle["open"], candle["high"], candle["low"], candle["close"]]
+            if bar[0] + self.seconds > now:
+                self.bar = bar
+            else:
+                self._close(bar)
+
+    def on_price(self, price, now):
+        """Fold a tick into the forming bar; returns the bar that just closed, if this tick opened a new one."""
+        start = now - now % self.seconds
+        bar = self.bar
+        if bar is None or start > bar[0]:
+            self.bar = [start, price, price, price, price]
+            if bar is not None:
+                self._close(bar)
+                return bar
+            return None
+        if price > bar[2]:
+            bar[2] = price
+        elif price < bar[3]:
+            bar[3] = price
+        bar[4] = price
+        return None
+
+    def values(self, live=True):
+        """Indicator values at the forming bar (live) or at the last closed bar; None until each has its period."""
+        if live and self.bar:
+            _, _, high, low, close = self.bar
+            return {spec: ind.peek(high, low, close) if ind.ready else None for spec, ind in self.indicators.items()}
+        return {spec: ind.value if ind.ready else None for spec, ind in self.indicators.items()}
+
+def _ema_cross(params):
+    fast, slow = ("ema", int(params.get("fast", 9))), ("ema", int(params.get("slow", 21)))
+
+    def regime(values, price):
+        return "buy" if values[fast] > values[slow] else "sell"
+    return (fast, slow), regime
+
+def _rsi(params):
+    rsi = ("rsi", int(params.get("period", 14)))
+    lower, upper = float(params.get("lower", 30)), float(params.get("upper", 70))
+
+    def regime(values, price):
+        return "buy" if values[rsi] < lower else "sell" if values[rsi] > upper else None
+    return (rsi,), regime
+
+def _bollinger(params):
+    bb = ("bb", int(params.get("period", 20)), float(params.get("k", 2)))
+
+    def regime(values, price):
+        lower, _, upper = values[bb]
+        return "buy" if price < lower else "sell" if price > upper else None
+    return (bb,), regime
+
+RULES = {"ema_cross": _ema_cross, "rsi": _rsi, "bollinger": _bollinger}
+
+class IndicatorRule:
+    """Turns indicator regimes into bot signals: fires on the change into "buy" or "sell", never on start-up.
+
+    By default rules are judged on closed candles; on_tick=True judges every tick against the forming
+    candle (faster, but noisier). min_atr_percent skips signals while the market is too quiet.
+    """
+
+    def __init__(self, bot, symbols, qty, kind="ema_cross", interval="15", on_tick=False, min_atr_percent=None, **params):
+        if kind not in RULES:
+            raise ValueError(f"Unknown indicator rule: {kind}")
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unsupported interval: {interval}")
+        self.bot = bot
+        self.symbols = list(symbols)
+        self.kind = kind
+        self.interval = interval
+        self.qty = qty
+        self.on_tick = on_tick
+        self.params = params
+        self.specs, self._regime = RULES[kind](params)
+        self.atr = ("atr", int(params.get("atr_period", 14))) if min_atr_percent else None
+        self.min_atr_percent = min_atr_percent
+        if self.atr:
+            self.specs = self.specs + (self.atr,)
+        self.name = f"{bot}:{kind}:{interval}"
+        self.last = {}  # symbol -> last regime
+
+    def evaluate(self, symbol, values, price):
+        """Return "buy"/"sell" when the regime just changed into one, else None."""
+        if any(values.get(spec) is None for spec in self.specs):
+            return None
+        regime = self._regime(values, price)
+        if regime and self.atr and values[self.atr] / price * 100 < self.min_atr_percent:
+            regime = None
+        previous = self.last.get(symbol, "unset")
+        self.last[symbol] = regime
+        if previous == "unset" or regime is None or regime == previous:
+            return None
+        return regime
+
+class IndicatorEngine:
+    """Candle series for every (symbol, interval) a rule watches, updated from price ticks.
+
+    fire(signal) receives dicts shaped like parse_signal's output, so the webhook ingestor queues them
+    and the bots act exactly as on a TradingView alert. One tick costs a few float operations per
+    indicator on that symbol, which keeps hundreds of symbols within one process.
+    """
+
+    def __init__(self, get_api, fire, history=300):
+        self.get_api = get_api
+        self.fire = fire
+        self.history = history
+        self.rules = []
+        self.series = {}  # (symbol, interval) -> CandleSeries
+        self._by_symbol = {}  # symbol -> [(series, [rules])]
+        self.stats = {"ticks": 0, "bars": 0, "signals": 0, "warmups": 0, "warmup_failures": 0}
+        self._lock = threading.Lock()
+        self._running = False
+
+    def add_rule(self, rule):
+        with self._lock:
+            self.rules.append(rule)
+            fresh = []
+            for symbol in rule.symbols:
+                key = (symbol, rule.interval)
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = CandleSeries(symbol, rule.interval)
+                    self._by_symbol.setdefault(symbol, []).append((series, []))
+                for spec in rule.specs:
+                    series.add(spec)
+                for entry in self._by_symbol[symbol]:
+                    if entry[0] is series:
+                        entry[1].append(rule)
+                if not series.ready:
+                    fresh.append(series)
+        if self._running and fresh:
+            self._warm_up_async(fresh)
+        return rule
+
+    def load_rules(self, path):
+        """Rules from a JSON list of IndicatorRule keyword arguments; a missing file means none."""
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            specs = json.load(f)
+        for spec in specs:
+            self.add_rule(IndicatorRule(**spec))
+        logger.info("Loaded %d indicator rules from %s", len(specs), path)
+        return len(specs)
+
+    def start(self):
+        self._running = True
+        series = [s for s in self.series.values() if not s.ready]
+        if series:
+            self._warm_up_async(series)
+
+    def stop(self):
+        self._running = False
+
+    def _warm_up_async(self, series):
+        threading.Thread(target=self.warm_up, args=(series,), name="indicator-warmup", daemon=True).start()
+
+    def warm_up(self, series):
+        api = self.get_api()
+        limit = min(1000, self.history)
+        for s in series:
+            candles = api.get_historical_data(s.symbol, s.interval, limit)
+            if not candles:
+                self.stats["warmup_failures"] += 1
+                logger.warning("Indicator warm-up got no candles for %s %s; building from live ticks only", s.symbol, s.interval)
+            # Bybit returns the newest candle first
+            s.warm_up(list(reversed(candles or [])))
+            self.stats["warmups"] += 1
+            # Seed the regimes so the first live evaluation does not fire on stale history
+            for entry_series, rules in self._by_symbol[s.symbol]:
+                if entry_series is s and s.bar:
+                    for rule in rules:
+                        rule.evaluate(s.symbol, s.values(live=rule.on_tick), s.bar[4])
+            s.ready = True
+        api.market_data.track(sorted({s.symbol for s in series}))
+
+    def on_price(self, symbol, price, now=None):
+        entries = self._by_symbol.get(symbol)
+        if not entries or not self._running:
+            return
+        now = time.time() if now is None else now
+        self.stats["ticks"] += 1
+        for series, rules in entries:
+            if not series.ready:
+                continue
+            closed = series.on_price(price, now)
+            if closed:
+                self.stats["bars"] += 1
+            live = None
+            for rule in rules:
+                if closed and not rule.on_tick:
+                    action = rule.evaluate(symbol, series.values(live=False), closed[4])
+                    bar_start = closed[0]
+                elif rule.on_tick:
+                    live = live or series.values()
+                    action = rule.evaluate(symbol, live, price)
+                    bar_start = series.bar[0]
+                else:
+                    continue
+                if action:
+                    self._fire(rule, symbol, action, price, bar_start)
+
+    def _fire(self, rule, symbol, action, price, bar_start):
+        self.stats["signals"] += 1
+        signal = {"bot": rule.bot, "symbol": symbol, "action": action, "price": price, "qty": rule.qty,
+                  "key": ("indicator", rule.name, symbol, action, bar_start), "source": "indicator"}
+        logger.info("Indicator rule %s fired %s for %s at %s", rule.name, action, symbol, price)
+        try:
+            self.fire(signal)
+        except Exception as e:
+            logger.error("Failed to queue indicator signal for %s: %s", symbol, str(e))
+
+    def status(self):
+        return {
+            **self.stats,
+            "rules": [{"name": r.name, "symbols": r.symbols, "params": r.params, "on_tick": r.on_tick} for r in self.rules],
+            "series": {f"{s.symbol}:{s.interval}": {"ready": s.ready, "bar": s.bar,
+                                                     **{"_".join(map(str, spec)): value for spec, value in s.values().items()}}
+                       for s in self.series.values()}
+        }
@@ -0,0 +1,178 @@
+from collections import OrderedDict
+import threading
+import hmac
+import queue
+import time
+import uuid
+import zlib
+import logging
+from .metrics import signal_latency
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("buy", "sell")
+
+def parse_signal(data, expected_secret, is_valid_symbol, has_bot):
+    """Validate a webhook payload without any I/O; returns (signal, None) or (None, (error, http_status))."""
+    if not data or not isinstance(data, dict):
+        return None, ("No JSON data received", 400)
+    secret = data.get("secret")
+    if not secret or not expected_secret or not hmac.compare_digest(str(secret), expected_secret):
+        return None, ("Invalid or missing secret token", 403)
+    symbol = data.get("symbol")
+    price = data.get("price")
+    qty = data.get("quantity")
+    action = str(data.get("action", "")).lower()
+    bot_name = data.get("bot", "Bot1")
+    if not all([symbol, price, qty]) or action not in ACTIONS:
+        return None, ("Missing or invalid parameters. Required: symbol, price, quantity, action='buy' or 'sell'", 400)
+    try:
+        price = float(price)
+        qty = float(qty)
+    except (ValueError, TypeError):
+        return None, ("Price and quantity must be numbers", 400)
+    if not is_valid_symbol(symbol):
+        return None, (f"Invalid symbol: {symbol}", 400)
+    if not has_bot(bot_name):
+        return None, (f"Unknown bot: {bot_name}", 400)
+    signal_id = data.get("signal_id") or data.get("id")
+    # Without an explicit id, an identical payload inside the window is a retry or a storm repeat
+    key = ("id", str(signal_id)) if signal_id else (bot_name, symbol, action, price, qty)
+    return {"bot": bot_name, "symbol": symbol, "action": action, "price": price, "qty": qty, "key": key}, None
+
+class DedupWindow:
+    """Signal keys seen in the last `window` seconds, oldest first, mapped to the id they were accepted under."""
+
+    def __init__(self, window=30, max_keys=100000):
+        self.window = window
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key, signal_id, now=None):
+        """Record key for signal_id and return None, or return the id it already belongs to."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._keys:
+                oldest, (seen_at, _) = next(iter(self._keys.items()))
+                if now - seen_at < self.window and len(self._keys) < self.max_keys:
+                    break
+                del self._keys[oldest]
+            existing = self._keys.get(key)
+            if existing is not None:
+                return existing[1]
+            self._keys[key] = (now, signal_id)
+            return None
+
+    def release(self, key):
+        with self._lock:
+            self._keys.pop(key, None)
+
+class WebhookIngestor:
+    """Acks webhook signals straight after dedup and hands them to worker threads.
+
+    Each symbol hashes to one worker queue, so signals for a symbol are handled in arrival order
+    while different symbols proceed in parallel. handler(signal) returns a result dict.
+    """
+
+    def __init__(self, handler, workers=4, dedup_window=30, max_queue=10000, max_results=1000, start_count=0, on_done=None):
+        self.handler = handler
+        self.on_done = on_done
+        self.dedup = DedupWindow(dedup_window)
+        self.max_results = max_results
+        self.results = OrderedDict()
+        self.stats = {"received": start_count, "queued": 0, "duplicates": 0, "dropped": 0, "processed": 0, "failed": 0}
+        self._queues = [queue.Queue(maxsize=max(1, max_queue // workers)) for _ in range(workers)]
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def count(self):
+        """Number this request; replaces the old module-level webhook_count."""
+        with self._lock:
+            self.stats["received"] += 1
+            return self.stats["received"]
+
+    def record_duplicate(self):
+        """Count a duplicate caught upstream (the shared dedup table) rather than by submit()."""
+        with self._lock:
+            self.stats["duplicates"] += 1
+
+    def start(self):
+        if self._threads:
+            return
+        for i, q in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(q,), name=f"webhook-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        for q in self._queues:
+            q.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, signal, signal_id=None):
+        """Returns ("queued" | "duplicate" | "full", signal_id)."""
+        signal_id = signal_id or uuid.uuid4().hex[:12]
+        existing = self.dedup.claim(signal["key"], signal_id)
+        if existing is not None:
+            with self._lock:
+                self.stats["duplicates"] += 1
+            return "duplicate", existing
+        record = {"signal_id": signal_id, "bot": signal["bot"], "symbol": signal["symbol"], "action": signal["action"],
+                  "price": signal["price"], "qty": signal["qty"], "status": "queued", "received_at": time.time(),
+                  "finished_at": None, "latency_ms": None, "result": None}
+        try:
+            self._queues[zlib.crc32(signal["symbol"].encode()) % len(self._queues)].put_nowait((signal, record, time.perf_counter()))
+        except queue.Full:
+            self.dedup.release(signal["key"])
+            with self._lock:
+                self.stats["dropped"] += 1
+            return "full", signal_id
+        with self._lock:
+            self.stats["queued"] += 1
+            self.results[signal_id] = record
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+        return "queued", signal_id
+
+    def _run(self, q):
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            signal, record, queued_at = item
+            dequeued = time.perf_counter()
+            record["status"] = "running"
+            try:
+                result = self.handler(signal)
+                record["status"] = result.get("status", "success")
+                record["result"] = result
+                failed = False
+            except Exception as e:
+                logger.error("Failed to process webhook signal %s: %s", record["signal_id"], str(e))
+                record["status"] = "failed"
+                record["result"] = {"error": f"Failed to process webhook: {str(e)}"}
+                failed = True
+            finished = time.perf_counter()
+            record["finished_at"] = time.time()
+            record["latency_ms"] = round((finished - queued_at) * 1000, 2)
+            signal_latency.observe(dequeued - queued_at, "queue_wait", signal["symbol"])
+            signal_latency.observe(finished - dequeued, "execute", signal["symbol"])
+            # received_at is the /webhook arrival on the same monotonic clock, when the signal was accepted here
+            signal_latency.observe(finished - signal.get("received_at", queued_at), "end_to_end", signal["symbol"])
+            with self._lock:
+                self.stats["processed"] += 1
+                self.stats["failed"] += failed
+            if self.on_done:
+                try:
+                    self.on_done(signal, record)
+                except Exception as e:
+                    logger.error("Webhook signal %s completion callback failed: %s", record["signal_id"], str(e))
+
+    def pending(self):
+        return sum(q.qsize() for q in self._queues)
+
+    def get(self, signal_id):
+        return self.results.get(signal_id)
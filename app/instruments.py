@@ -0,0 +1,115 @@
+from decimal import Decimal, ROUND_DOWN
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Instrument:
+    __slots__ = ("symbol", "base_coin", "quote_coin", "tick_size", "qty_step", "min_qty", "min_notional")
+
+    def __init__(self, symbol, base_coin, quote_coin, tick_size, qty_step, min_qty, min_notional):
+        self.symbol = symbol
+        self.base_coin = base_coin
+        self.quote_coin = quote_coin
+        self.tick_size = Decimal(tick_size)
+        self.qty_step = Decimal(qty_step)
+        self.min_qty = Decimal(min_qty)
+        self.min_notional = Decimal(min_notional)
+
+    def round_price(self, price):
+        """Round a price down to the instrument tick size and return it as a string."""
+        return _floor_to_step(price, self.tick_size)
+
+    def round_qty(self, qty):
+        """Round a base-coin quantity down to the instrument lot size and return it as a string."""
+        return _floor_to_step(qty, self.qty_step)
+
+    def check_order(self, qty, price):
+        """Return an error message if qty/price violate the lot size or min notional, else None."""
+        qty = Decimal(str(qty))
+        if qty < self.min_qty:
+            return f"Quantity {qty} below minimum {self.min_qty} for {self.symbol}"
+        if price is not None and qty * Decimal(str(price)) < self.min_notional:
+            return f"Order value below minimum {self.min_notional} {self.quote_coin} for {self.symbol}"
+        return None
+
+    def check_quote(self, amount):
+        """Same check for a quote-sized spot market buy."""
+        if Decimal(str(amount)) < self.min_notional:
+            return f"Order value below minimum {self.min_notional} {self.quote_coin} for {self.symbol}"
+        return None
+
+def _floor_to_step(value, step):
+    # Fixed-point output: str(Decimal) turns small values into "1E-7" / "0E-8", which Bybit rejects
+    value = Decimal(str(value))
+    if step <= 0:
+        return format(value, "f")
+    return format((value / step).to_integral_value(rounding=ROUND_DOWN) * step, "f")
+
+class InstrumentRegistry:
+    """In-memory spot instrument index for one BybitAPI client, refreshed in the background."""
+
+    def __init__(self, api, ttl=300):
+        self.api = api
+        self.ttl = ttl
+        self.loaded_at = 0
+        self._instruments = {}
+        self._symbols = frozenset()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def refresh(self):
+        instruments = self.api.get_instruments()
+        if not instruments:
+            logger.warning("Instrument refresh returned nothing, keeping %d cached symbols", len(self._symbols))
+            return False
+        index = {inst.symbol: inst for inst in instruments}
+        with self._lock:
+            self._instruments = index
+            self._symbols = frozenset(index)
+            self.loaded_at = time.time()
+        logger.info("Instrument registry refreshed: %d symbols", len(index))
+        return True
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="instrument-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                ok = self.refresh()
+            except Exception as e:
+                logger.error("Exception refreshing instrument registry: %s", str(e))
+                ok = False
+            # Retry quickly until the first load succeeds, then settle into the TTL
+            self._stop.wait(self.ttl if ok else min(self.ttl, 10))
+
+    @property
+    def loaded(self):
+        return bool(self._symbols)
+
+    @property
+    def stale(self):
+        return time.time() - self.loaded_at > self.ttl
+
+    def symbols(self):
+        return self._symbols
+
+    def get(self, symbol):
+        return self._instruments.get(symbol)
+
+    def __contains__(self, symbol):
+        return symbol in self._symbols
+
+    def is_valid(self, symbol):
+        # Until the first load completes we cannot reject anything
+        return symbol in self._symbols or not self._symbols
@@ -0,0 +1,187 @@
+import sqlite3
+import threading
+import queue
+import json
+import time
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    bot TEXT,
+    symbol TEXT,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    seq INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    state TEXT NOT NULL
+);
+"""
+
+def empty_state():
+    return {"bots": {}, "meta": {}}
+
+def apply_event(state, kind, bot, symbol, data):
+    """Fold one journal event into a plain-dict state; used both for replay and the writer's replica."""
+    bots = state["bots"]
+    if kind == "meta":
+        state["meta"].update(data)
+    elif kind == "bot_add":
+        bots[bot] = {"dca_enabled": data["dca_enabled"], "config": data.get("config", {}), "positions": {}}
+    elif kind == "bot_remove":
+        bots.pop(bot, None)
+    elif bot not in bots:
+        return
+    elif kind == "config":
+        bots[bot]["config"] = data
+    elif kind == "open":
+        bots[bot]["positions"][symbol] = data
+    elif kind == "fill":
+        position = bots[bot]["positions"].get(symbol)
+        if position is not None:
+            position.update(data)
+    elif kind == "close":
+        bots[bot]["positions"].pop(symbol, None)
+
+class StateJournal:
+    """Append-only SQLite (WAL) journal of bot state transitions.
+
+    record() only enqueues, so callers on the order path never touch the disk. One writer thread
+    drains the queue in batches, one transaction (and one fsync) per batch, and folds long event
+    runs into a checkpoint row so startup replays a snapshot plus a short tail.
+    """
+
+    def __init__(self, path, flush_interval=0.05, max_batch=500, checkpoint_every=5000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.checkpoint_every = checkpoint_every
+        self.state = empty_state()
+        self.stats = {"events": 0, "batches": 0, "checkpoints": 0, "errors": 0}
+        self._queue = queue.Queue()
+        self._since_checkpoint = 0
+        self._data_version = None
+        self._db = None
+        self._thread = None
+
+    def _connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=FULL")
+        db.executescript(SCHEMA)
+        return db
+
+    def load(self):
+        """Rebuild state from the last checkpoint plus the events written after it."""
+        if self._db is None:
+            self._db = self._connect()
+        started = time.perf_counter()
+        row = self._db.execute("SELECT seq, state FROM checkpoint WHERE id = 1").fetchone()
+        state, seq = (json.loads(row[1]), row[0]) if row else (empty_state(), 0)
+        replayed = 0
+        for kind, bot, symbol, data in self._db.execute(
+                "SELECT kind, bot, symbol, data FROM events WHERE seq > ? ORDER BY seq", (seq,)):
+            apply_event(state, kind, bot, symbol, json.loads(data) if data else {})
+            replayed += 1
+        first = self._data_version is None
+        self._data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        self.state = state
+        self._since_checkpoint = replayed
+        logger.log(logging.INFO if first else logging.DEBUG, "State journal %s loaded: %d bots, %d events replayed in %.1f ms",
+                   self.path, len(state["bots"]), replayed, (time.perf_counter() - started) * 1000)
+        return json.loads(json.dumps(state))
+
+    def changed(self):
+        """Whether another process (the leader's writer) committed since the last load()."""
+        return self._db is None or self._db.execute("PRAGMA data_version").fetchone()[0] != self._data_version
+
+    def record(self, kind, bot=None, symbol=None, **data):
+        self._queue.put((time.time(), kind, bot, symbol, data))
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if self._db is None:
+            self.load()
+        self._thread = threading.Thread(target=self._run, name="state-journal", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def flush(self, timeout=5):
+        """Block until everything recorded so far is durable (shutdown and tests)."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        if self._since_checkpoint:
+            self.checkpoint()  # keep the next startup's replay short
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            # Let a burst accumulate so it lands in one transaction
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            events = [item for item in batch if isinstance(item, tuple)]
+            if events:
+                self._write(events)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    running = False
+        self._db.close()
+        self._db = None
+
+    def _write(self, events):
+        rows = [(ts, kind, bot, symbol, json.dumps(data) if data else None) for ts, kind, bot, symbol, data in events]
+        try:
+            with self._db:
+                self._db.executemany("INSERT INTO events (ts, kind, bot, symbol, data) VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            logger.error("State journal write of %d events failed: %s", len(rows), str(e))
+            return
+        for _, kind, bot, symbol, data in events:
+            apply_event(self.state, kind, bot, symbol, data)
+        self.stats["events"] += len(rows)
+        self.stats["batches"] += 1
+        self._since_checkpoint += len(rows)
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Store the replica as a snapshot and drop the events it covers (writer thread only)."""
+        try:
+            with self._db:
+                seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+                self._db.execute("INSERT OR REPLACE INTO checkpoint (id, seq, ts, state) VALUES (1, ?, ?, ?)",
+                                 (seq, time.time(), json.dumps(self.state)))
+                self._db.execute("DELETE FROM events WHERE seq <= ?", (seq,))
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            logger.error("State journal checkpoint failed: %s", str(e))
+            return
+        self._since_checkpoint = 0
+        self.stats["checkpoints"] += 1
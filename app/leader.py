@@ -0,0 +1,64 @@
+import threading
+import fcntl
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LeaderElection:
+    """One leader among the server's worker processes: whoever holds an exclusive flock on `path`.
+
+    The kernel drops the lock when the holder exits, so a follower's retry loop takes over
+    after a worker crash or restart. on_elected runs once, in the process that wins.
+    """
+
+    def __init__(self, path, on_elected, retry_interval=2):
+        self.path = path
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._fd = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def try_acquire(self):
+        if self.is_leader:
+            return True
+        if self._fd is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        os.ftruncate(self._fd, 0)
+        os.write(self._fd, str(os.getpid()).encode())
+        self.is_leader = True
+        logger.info("Process %d elected leader (%s)", os.getpid(), self.path)
+        self.on_elected()
+        return True
+
+    def start(self):
+        """Try once now; if another process leads, keep retrying in the background."""
+        if self.try_acquire():
+            return True
+        logger.info("Process %d following the current leader", os.getpid())
+        self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+        self._thread.start()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.retry_interval):
+            try:
+                if self.try_acquire():
+                    return
+            except Exception as e:
+                logger.error("Leader election attempt failed: %s", str(e))
+
+    def stop(self):
+        self._stop.set()
+        if self._fd is not None:
+            os.close(self._fd)  # releases the lock
+            self._fd = None
+        self.is_leader = False
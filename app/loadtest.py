@@ -0,0 +1,139 @@
+"""Load test for webhook ingestion: parse + dedup + queue + per-symbol workers against an offline PaperExchange.
+
+Usage: python -m app.loadtest --signals 50000 --symbols 100 --producers 8 --workers 4 --duplicate-rate 0.2
+"""
+from collections import defaultdict
+import argparse
+import threading
+import json
+import time
+import logging
+import numpy as np
+from .bots import BotConfig, BotRegistry, execute_signal
+from .ingest import WebhookIngestor, parse_signal
+from .paper import PaperExchange
+
+SECRET = "loadtest"
+
+class _StubInstruments:
+    def __init__(self, symbols):
+        self.symbols = frozenset(symbols)
+
+    def is_valid(self, symbol):
+        return symbol in self.symbols
+
+    def get(self, symbol):
+        return None
+
+def make_exchange(symbols, latency_ms=0.0, price=100.0):
+    """Offline PaperExchange standing in for BybitAPI, with every symbol priced and deeply funded."""
+    balances = {"USDT": 1e15, **{name[:-len("USDT")]: 1e15 for name in symbols}}
+    api = PaperExchange(instruments=_StubInstruments(symbols), balances=balances, latency_ms=latency_ms)
+    for name in symbols:
+        api.market_data.prices[name] = price
+    return api
+
+def make_payloads(symbols, count, duplicate_rate, seed=0):
+    """Per-symbol alternating buy/sell bodies with explicit signal ids; duplicates resend an earlier body."""
+    rng = np.random.default_rng(seed)
+    seq = defaultdict(int)
+    payloads = []
+    for i in range(count):
+        symbol = symbols[i % len(symbols)]
+        if payloads and rng.random() < duplicate_rate:
+            # A retry of this symbol's latest signal, as TradingView does on a slow ack
+            previous = [p for p in payloads[-len(symbols):] if p[0] == symbol]
+            if previous:
+                payloads.append(previous[-1])
+                continue
+        n = seq[symbol]
+        seq[symbol] += 1
+        body = {"secret": SECRET, "symbol": symbol, "price": 100.0, "quantity": 1.0, "bot": "LoadBot",
+                "action": "buy" if n % 2 == 0 else "sell", "signal_id": f"{symbol}-{n}"}
+        payloads.append((symbol, json.dumps(body).encode()))
+    return payloads
+
+def run(signals=20000, symbols=50, producers=4, workers=4, duplicate_rate=0.1, latency_ms=0.0, queue_size=None, timeout=120):
+    names = [f"SYM{i}USDT" for i in range(symbols)]
+    api = make_exchange(names, latency_ms)
+    registry = BotRegistry()
+    bot = registry.add(BotConfig("LoadBot"))
+    handled = defaultdict(list)
+
+    def handler(signal):
+        result = execute_signal(bot, api, signal["symbol"], signal["action"], signal["price"], signal["qty"], None)
+        handled[signal["symbol"]].append(int(signal["key"][1].rsplit("-", 1)[1]))
+        return result
+
+    # By default every worker queue can hold the whole run; a smaller --queue-size shows 503 backpressure
+    ingestor = WebhookIngestor(handler, workers=workers, dedup_window=60, max_queue=queue_size or signals * workers)
+    ingestor.start()
+    payloads = make_payloads(names, signals, duplicate_rate)
+    # Each producer owns a disjoint set of symbols so per-symbol arrival order is well defined
+    owner = {name: i % producers for i, name in enumerate(names)}
+    shards = [[p for p in payloads if owner[p[0]] == k] for k in range(producers)]
+    ack_ns = [np.zeros(len(shard), dtype=np.int64) for shard in shards]
+    statuses = defaultdict(int)
+    statuses_lock = threading.Lock()
+
+    def produce(k):
+        local = defaultdict(int)
+        for j, (_, body) in enumerate(shards[k]):
+            started = time.perf_counter_ns()
+            signal, error = parse_signal(json.loads(body), SECRET, api.instruments.is_valid, registry.__contains__)
+            status = error[0] if error else ingestor.submit(signal)[0]
+            ack_ns[k][j] = time.perf_counter_ns() - started
+            local[status] += 1
+        with statuses_lock:
+            for status, n in local.items():
+                statuses[status] += n
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(k,)) for k in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    acked = time.perf_counter()
+    deadline = acked + timeout
+    while ingestor.stats["processed"] < statuses["queued"] and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    finished = time.perf_counter()
+    ingestor.stop()
+
+    acks = np.concatenate(ack_ns) / 1000
+    out_of_order = sum(1 for seqs in handled.values() for a, b in zip(seqs, seqs[1:]) if b <= a)
+    return {
+        "signals": signals,
+        "queued": statuses["queued"],
+        "duplicates": statuses["duplicate"],
+        "dropped": statuses["full"],
+        "processed": ingestor.stats["processed"],
+        "failed": ingestor.stats["failed"],
+        "orders": api.stats["orders"],
+        "fills": api.stats["fills"],
+        "out_of_order": out_of_order,
+        "ack_signals_per_sec": round(signals / (acked - started)),
+        "sustained_signals_per_sec": round(ingestor.stats["processed"] / (finished - started)),
+        "ack_p50_us": round(float(np.percentile(acks, 50)), 1),
+        "ack_p99_us": round(float(np.percentile(acks, 99)), 1),
+        "elapsed_s": round(finished - started, 3)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.loadtest", description="Drive the webhook ingestion path with synthetic signals.")
+    parser.add_argument("--signals", type=int, default=20000)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duplicate-rate", dest="duplicate_rate", type=float, default=0.1)
+    parser.add_argument("--latency-ms", dest="latency_ms", type=float, default=0.0, help="simulated exchange round trip per order")
+    parser.add_argument("--queue-size", dest="queue_size", type=int, help="total ingest queue capacity (WEBHOOK_QUEUE_SIZE)")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+    result = run(args.signals, args.symbols, args.producers, args.workers, args.duplicate_rate, args.latency_ms, args.queue_size)
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bybit spot accepts at most 10 topics per subscribe request
+SPOT_SUBSCRIBE_BATCH = 10
+
+class BybitTickerFeed:
+    """Single multiplexed public spot ticker stream over pybit's WebSocket client."""
+
+    def __init__(self, testnet=False):
+        self.testnet = testnet
+        self.ws = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, symbols, on_price):
+        from pybit.unified_trading import WebSocket
+
+        def handle(message):
+            data = message.get("data") or {}
+            if "lastPrice" in data:
+                on_price(data["symbol"], float(data["lastPrice"]))
+
+        with self._lock:
+            if self.ws is None:
+                self.ws = WebSocket(testnet=self.testnet, channel_type="spot")
+            symbols = sorted(symbols)
+            for i in range(0, len(symbols), SPOT_SUBSCRIBE_BATCH):
+                self.ws.ticker_stream(symbol=symbols[i:i + SPOT_SUBSCRIBE_BATCH], callback=handle)
+
+    def close(self):
+        with self._lock:
+            if self.ws is not None:
+                self.ws.exit()
+                self.ws = None
+
+class LocalPriceFeed:
+    """Stand-in feed for offline runs and tests: prices are pushed in by hand or from a recording."""
+
+    def __init__(self):
+        self.symbols = set()
+        self._on_price = None
+
+    def subscribe(self, symbols, on_price):
+        self.symbols.update(symbols)
+        self._on_price = on_price
+
+    def push(self, symbol, price):
+        if self._on_price and symbol in self.symbols:
+            self._on_price(symbol, float(price))
+
+    def close(self):
+        self.symbols.clear()
+
+class MarketDataEngine:
+    """Last-price table fed by one ticker stream, dispatching every tick to registered handlers."""
+
+    def __init__(self, testnet=False, feed=None):
+        self.feed = feed or BybitTickerFeed(testnet)
+        self.prices = {}
+        self.updated_at = {}
+        self._symbols = set()
+        self._handlers = []
+        self._lock = threading.Lock()
+        self._dispatch_lock = threading.Lock()
+
+    def add_handler(self, handler):
+        self._handlers.append(handler)
+
+    def track(self, symbols):
+        """Make sure the stream covers these symbols; subscription happens off the caller's thread."""
+        with self._lock:
+            new = set(symbols) - self._symbols
+            self._symbols.update(new)
+        if new:
+            threading.Thread(target=self._subscribe, args=(new,), name="market-data-subscribe", daemon=True).start()
+        return new
+
+    def tracked(self):
+        return frozenset(self._symbols)
+
+    def _subscribe(self, symbols):
+        try:
+            self.feed.subscribe(symbols, self._on_price)
+            logger.info("Market data subscribed: %s", ", ".join(sorted(symbols)))
+        except Exception as e:
+            logger.error("Exception subscribing market data for %s: %s", sorted(symbols), str(e))
+            with self._lock:
+                self._symbols.difference_update(symbols)
+
+    def _on_price(self, symbol, price):
+        self.prices[symbol] = price
+        self.updated_at[symbol] = time.time()
+        # Handlers place orders, so ticks are evaluated one at a time
+        with self._dispatch_lock:
+            for handler in self._handlers:
+                try:
+                    handler(symbol, price)
+                except Exception as e:
+                    logger.error("Market data handler failed for %s: %s", symbol, str(e))
+
+    def push(self, symbol, price):
+        """Feed a price straight into the table and handlers, bypassing the stream (replays, paper trading)."""
+        self._on_price(symbol, float(price))
+
+    def get_price(self, symbol):
+        return self.prices.get(symbol)
+
+    def close(self):
+        self.feed.close()
@@ -0,0 +1,178 @@
+"""In-process latency histograms and counters, rendered in the Prometheus text format.
+
+Each server worker keeps its own registry; the leader process is the one placing orders and
+running the monitors, so that is the worker to scrape for the order path.
+"""
+from bisect import bisect_left
+import threading
+import time
+
+# Seconds; spans an in-memory ack (sub-millisecond) up to a slow REST call timing out
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _round(seconds):
+    return round(seconds, 6) if seconds is not None else None
+
+def _number(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+class Histogram:
+    """Fixed-bucket histogram per label set: observe() is a bisect and three adds under a lock."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def time(self, *labels):
+        """Context manager observing the wall time of its block."""
+        return _Timer(self, labels)
+
+    def quantile(self, q, *labels):
+        """Estimate from the buckets, interpolating linearly inside the bucket the rank falls in."""
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None or not series[2]:
+                return None
+            counts, total = list(series[0]), series[2]
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def summary(self):
+        """{label values: {"count", "p50", "p99"}} for every series seen so far."""
+        with self._lock:
+            keys = list(self._series)
+        return {labels: {"count": self._series[labels][2], "p50": _round(self.quantile(0.5, *labels)), "p99": _round(self.quantile(0.99, *labels))}
+                for labels in keys}
+
+    def render(self):
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = []
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families = []
+        self._collectors = []
+
+    def histogram(self, name, help, labelnames=(), buckets=BUCKETS):
+        family = Histogram(name, help, labelnames, buckets)
+        self.families.append(family)
+        return family
+
+    def counter(self, name, help, labelnames=()):
+        family = Counter(name, help, labelnames)
+        self.families.append(family)
+        return family
+
+    def add_collector(self, collect):
+        """collect() returns [(name, "counter" | "gauge", help, labelnames, [(label values, value)])], read at scrape time.
+
+        For numbers other components already keep (rate-limiter and queue stats), so the hot path pays nothing.
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for family in self.families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            lines.extend(family.render())
+        for collect in self._collectors:
+            for name, kind, help, labelnames, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_labels(labelnames, labels)} {_number(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """p50/p99 per series of every histogram, keyed by family name then joined label values."""
+        return {family.name: {"/".join(map(str, labels)) or "all": stats for labels, stats in family.summary().items()}
+                for family in self.families if family.kind == "histogram"}
+
+metrics = MetricsRegistry()
+
+api_latency = metrics.histogram("bybit_api_request_seconds", "BybitAPI call time including rate-limiter wait", ("mode", "method", "symbol"))
+api_errors = metrics.counter("bybit_api_errors_total", "BybitAPI calls that raised or returned an error", ("mode", "method"))
+webhook_latency = metrics.histogram("webhook_ack_seconds", "Time spent in each phase of the /webhook ack path", ("phase",))
+signal_latency = metrics.histogram("webhook_signal_seconds", "Queued webhook signals: queue wait, execution and receipt to exchange ack", ("phase", "symbol"))
+overview_latency = metrics.histogram("overview_seconds", "Time spent in each phase of the overview page", ("phase",))
+monitor_latency = metrics.histogram("bot_monitor_seconds", "Bot TP/SL evaluation time per bot", ("bot", "source"))
+scheduler_latency = metrics.histogram("scheduler_tick_seconds", "Full bot scheduler tick: account reads, prices and evaluation")
+account_latency = metrics.histogram("account_order_seconds", "Follower account fan-out order time, per account", ("account",))
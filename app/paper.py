@@ -0,0 +1,286 @@
+from collections import OrderedDict, deque
+import itertools
+import threading
+import heapq
+import time
+import uuid
+import logging
+from .market_data import MarketDataEngine, LocalPriceFeed
+
+logger = logging.getLogger(__name__)
+
+class PaperOrderBook:
+    """Resting limit orders for one symbol.
+
+    Each side maps price -> FIFO of orders, with a heap over the prices (bids negated) for the best
+    level. Insert is O(log n) for a new level and O(1) otherwise; cancel is O(1) and empty levels
+    leave the heap lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self.levels = {"Buy": {}, "Sell": {}}
+        self._heaps = {"Buy": [], "Sell": []}
+        self.orders = {}
+
+    def add(self, order):
+        levels = self.levels[order["side"]]
+        level = levels.get(order["price"])
+        if level is None:
+            level = levels[order["price"]] = OrderedDict()
+            heapq.heappush(self._heaps[order["side"]], -order["price"] if order["side"] == "Buy" else order["price"])
+        level[order["order_id"]] = order
+        self.orders[order["order_id"]] = order
+
+    def remove(self, order_id):
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        levels = self.levels[order["side"]]
+        level = levels[order["price"]]
+        del level[order_id]
+        if not level:
+            del levels[order["price"]]
+        return order
+
+    def best(self, side):
+        heap, levels = self._heaps[side], self.levels[side]
+        while heap:
+            price = -heap[0] if side == "Buy" else heap[0]
+            if price in levels:
+                return price
+            heapq.heappop(heap)
+        return None
+
+    def crossed(self, price):
+        """Orders a trade at `price` fills: bids at or above it, asks at or below it, best level first."""
+        filled = []
+        for side in ("Buy", "Sell"):
+            while True:
+                best = self.best(side)
+                if best is None or (best < price if side == "Buy" else best > price):
+                    break
+                filled.extend(self.levels[side][best].values())
+                for order in list(self.levels[side][best].values()):
+                    self.remove(order["order_id"])
+        return filled
+
+    def __len__(self):
+        return len(self.orders)
+
+class PaperExchange:
+    """Local simulated spot exchange with BybitAPI's order and account methods and return shapes.
+
+    Market orders fill at the last price from `market_data` plus slippage; limit orders that do not
+    cross rest in a per-symbol PaperOrderBook and fill (as maker) when a tick trades through them.
+    As on Bybit spot, a market Buy's qty is in the quote coin. Fees are charged in the quote coin.
+    Works offline with a LocalPriceFeed, so it also serves as the test double for BybitAPI.
+    """
+
+    testnet = True
+
+    def __init__(self, market_data=None, instruments=None, balances=None, quote="USDT", maker_fee=0.001, taker_fee=0.001,
+                 slippage_bps=5, latency_ms=0, price_fallback=None, max_executions=1000):
+        self.market_data = market_data or MarketDataEngine(feed=LocalPriceFeed())
+        self.instruments = instruments
+        self.account = None
+        self.quote = quote
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.slippage = slippage_bps / 10000
+        self.latency = latency_ms / 1000
+        self.price_fallback = price_fallback
+        self.balances = {coin: {"free": float(amount), "locked": 0.0} for coin, amount in (balances or {quote: 10000}).items()}
+        self.books = {}
+        self.executions = deque(maxlen=max_executions)
+        self.stats = {"orders": 0, "fills": 0, "rejected": 0, "fees": 0.0}
+        self._execution_handlers = []
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self.market_data.add_handler(self.on_price)
+
+    def add_execution_handler(self, handler):
+        self._execution_handlers.append(handler)
+
+    def _base_coin(self, symbol):
+        inst = self.instruments.get(symbol) if self.instruments else None
+        if inst:
+            return inst.base_coin
+        return symbol[:-len(self.quote)] if symbol.endswith(self.quote) else symbol
+
+    def _balance(self, coin):
+        return self.balances.setdefault(coin, {"free": 0.0, "locked": 0.0})
+
+    def _last_price(self, symbol):
+        price = self.market_data.get_price(symbol)
+        if price is None and self.price_fallback:
+            ticker = self.price_fallback(symbol)
+            if ticker:
+                price = float(ticker["last_price"])
+                self.market_data.prices[symbol] = price
+        self.market_data.track([symbol])
+        return price
+
+    def _placed(self, kind, side, order_id):
+        response = {"retCode": 0, "retMsg": "OK", "result": {"orderId": order_id, "orderLinkId": ""}}
+        return f"{kind} {side} order placed: {response}"
+
+    def _reject(self, message):
+        self.stats["rejected"] += 1
+        return f"Error: {message}"
+
+    def _check(self, symbol, qty, price):
+        if self.instruments and not self.instruments.is_valid(symbol):
+            return f"Invalid symbol {symbol}"
+        inst = self.instruments.get(symbol) if self.instruments else None
+        return inst.check_order(qty, price) if inst else None
+
+    def _fill(self, order_id, symbol, side, qty, price, fee_rate, order_type):
+        """Settle one fill against free balances (the caller has already released any lock)."""
+        base, quote = self._balance(self._base_coin(symbol)), self._balance(self.quote)
+        notional = qty * price
+        fee = notional * fee_rate
+        if side == "Buy":
+            quote["free"] -= notional + fee
+            base["free"] += qty
+        else:
+            base["free"] -= qty
+            quote["free"] += notional - fee
+        self.stats["fills"] += 1
+        self.stats["fees"] += fee
+        execution = {"execId": uuid.uuid4().hex, "symbol": symbol, "side": side, "orderId": order_id, "orderType": order_type, "execPrice": str(price),
+                     "execQty": str(qty), "execValue": str(notional), "execFee": str(fee), "feeCurrency": self.quote,
+                     "execTime": str(int(time.time() * 1000)), "category": "spot"}
+        self.executions.append(execution)
+        return execution
+
+    def _notify(self, executions):
+        if executions:
+            for handler in self._execution_handlers:
+                try:
+                    handler(executions)
+                except Exception as e:
+                    logger.error("Paper execution handler failed: %s", str(e))
+
+    def place_market_order(self, symbol, side, qty):
+        if self.latency:
+            time.sleep(self.latency)
+        side = side.capitalize()
+        qty = float(qty)
+        with self._lock:
+            self.stats["orders"] += 1
+            last = self._last_price(symbol)
+            if last is None:
+                return self._reject(f"No price for {symbol}")
+            price = last * (1 + self.slippage) if side == "Buy" else last * (1 - self.slippage)
+            base_qty = qty / price if side == "Buy" else qty
+            error = self._check(symbol, base_qty, price)
+            if error:
+                return self._reject(error)
+            if side == "Buy" and self._balance(self.quote)["free"] < qty * (1 + self.taker_fee):
+                return self._reject("Insufficient balance")
+            if side == "Sell" and self._balance(self._base_coin(symbol))["free"] < qty:
+                return self._reject("Insufficient balance")
+            order_id = f"paper-{next(self._ids)}"
+            execution = self._fill(order_id, symbol, side, base_qty, price, self.taker_fee, "Market")
+        self._notify([execution])
+        return self._placed("Market", side, order_id)
+
+    def place_limit_order(self, symbol, side, qty, price):
+        if self.latency:
+            time.sleep(self.latency)
+        side = side.capitalize()
+        inst = self.instruments.get(symbol) if self.instruments else None
+        qty = float(inst.round_qty(qty)) if inst else float(qty)
+        price = float(inst.round_price(price)) if inst else float(price)
+        with self._lock:
+            self.stats["orders"] += 1
+            error = self._check(symbol, qty, price)
+            if error:
+                return self._reject(error)
+            order_id = f"paper-{next(self._ids)}"
+            last = self._last_price(symbol)
+            if last is not None and (price >= last if side == "Buy" else price <= last):
+                # Marketable: takes liquidity at the last price, which is no worse than the limit
+                if side == "Buy" and self._balance(self.quote)["free"] < qty * last * (1 + self.taker_fee):
+                    return self._reject("Insufficient balance")
+                if side == "Sell" and self._balance(self._base_coin(symbol))["free"] < qty:
+                    return self._reject("Insufficient balance")
+                execution = self._fill(order_id, symbol, side, qty, last, self.taker_fee, "Limit")
+            else:
+                coin, amount = (self.quote, qty * price * (1 + self.maker_fee)) if side == "Buy" else (self._base_coin(symbol), qty)
+                balance = self._balance(coin)
+                if balance["free"] < amount:
+                    return self._reject("Insufficient balance")
+                balance["free"] -= amount
+                balance["locked"] += amount
+                self.books.setdefault(symbol, PaperOrderBook()).add(
+                    {"order_id": order_id, "symbol": symbol, "side": side, "qty": qty, "price": price,
+                     "locked": amount, "lock_coin": coin, "created_at": time.time()})
+                execution = None
+        if execution:
+            self._notify([execution])
+        return self._placed("Limit", side, order_id)
+
+    def _release(self, order):
+        balance = self._balance(order["lock_coin"])
+        balance["locked"] -= order["locked"]
+        balance["free"] += order["locked"]
+
+    def on_price(self, symbol, price):
+        """Price feed handler: fill every resting order the trade price reaches, at its limit price."""
+        book = self.books.get(symbol)
+        if not book:
+            return
+        with self._lock:
+            executions = []
+            for order in book.crossed(price):
+                self._release(order)
+                executions.append(self._fill(order["order_id"], symbol, order["side"], order["qty"], order["price"], self.maker_fee, "Limit"))
+        self._notify(executions)
+
+    def cancel_order(self, symbol, order_id):
+        with self._lock:
+            book = self.books.get(symbol)
+            order = book.remove(order_id) if book else None
+            if order is None:
+                return f"Error cancelling order: {order_id} not found"
+            self._release(order)
+        return "Order cancelled successfully."
+
+    def cancel_all_orders(self, symbol=None):
+        with self._lock:
+            for sym in [symbol] if symbol else list(self.books):
+                book = self.books.get(sym)
+                for order_id in list(book.orders) if book else ():
+                    self._release(book.remove(order_id))
+        return "All open orders cancelled successfully."
+
+    def get_open_orders(self):
+        with self._lock:
+            return [{"order_id": order["order_id"], "symbol": order["symbol"], "side": order["side"], "order_type": "Limit",
+                     "qty": str(order["qty"]), "price": str(order["price"]), "order_status": "New"}
+                    for book in self.books.values() for order in book.orders.values()]
+
+    def get_positions(self):
+        # Spot only: Bybit reports linear positions here, and the paper exchange has none
+        return []
+
+    def get_wallet_balance(self):
+        with self._lock:
+            return [{"coin": coin, "walletBalance": str(b["free"] + b["locked"]), "free": str(b["free"]), "locked": str(b["locked"])}
+                    for coin, b in self.balances.items() if b["free"] or b["locked"]]
+
+    def get_ticker(self, symbol):
+        price = self._last_price(symbol)
+        return {"symbol": symbol, "last_price": str(price)} if price is not None else None
+
+    def get_price_snapshot(self):
+        return dict(self.market_data.prices)
+
+def replay_candles(exchange, symbol, candles):
+    """Drive the exchange's feed from (time, open, high, low, close, volume) rows, visiting each bar's
+    extremes in the order a down bar or an up bar most plausibly traded them."""
+    push = exchange.market_data.push
+    for _, o, h, l, c, _ in candles:
+        for price in ((o, h, l, c) if c < o else (o, l, h, c)):
+            push(symbol, price)
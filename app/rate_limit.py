@@ -0,0 +1,142 @@
+from collections import defaultdict
+from concurrent.futures import Future
+import heapq
+import itertools
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first when requests are queued behind the limiter
+PRIORITY_ORDER = 0
+PRIORITY_READ = 1
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def update_from_exchange(self, remaining, reset_at):
+        """Trust the exchange's view of our budget: never hold more tokens than it says remain."""
+        self.tokens = min(self.tokens, remaining)
+        if remaining <= 0 and reset_at:
+            # reset_at is wall-clock; convert to our monotonic clock
+            self.blocked_until = time.monotonic() + max(0, reset_at - time.time())
+
+class RateLimiter:
+    """Token buckets per Bybit endpoint group plus one shared IP-wide bucket.
+
+    Callers queue per group in priority order, so a group waiting out its own limit never holds up
+    another group, and order placement is never stuck behind dashboard reads.
+    """
+
+    def __init__(self, group_rates, global_rate=100):
+        self.buckets = {group: TokenBucket(rate) for group, rate in group_rates.items()}
+        self.global_bucket = TokenBucket(global_rate)
+        self.stats = {"acquired": 0, "throttled": 0, "throttled_ms": 0.0, "exchange_limit_hits": 0}
+        self._waiters = defaultdict(list)  # {group: heap of (priority, seq)}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, group, priority=PRIORITY_READ):
+        bucket = self.buckets.get(group)
+        me = (priority, next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            queue = self._waiters[group]
+            heapq.heappush(queue, me)
+            while True:
+                if queue[0] == me:
+                    now = time.monotonic()
+                    wait = max(self.global_bucket.wait_time(now), bucket.wait_time(now) if bucket else 0)
+                    if wait == 0 and self._outranked(group, me, now):
+                        self._cond.wait()
+                        continue
+                    if wait == 0:
+                        self.global_bucket.take()
+                        if bucket:
+                            bucket.take()
+                        heapq.heappop(queue)
+                        self._cond.notify_all()
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+        waited = time.monotonic() - started
+        self.stats["acquired"] += 1
+        if waited > 0.001:
+            self.stats["throttled"] += 1
+            self.stats["throttled_ms"] += waited * 1000
+
+    def _outranked(self, group, me, now):
+        # The shared global token goes to the best-ranked head of a group whose own bucket has room
+        for other, queue in self._waiters.items():
+            if other != group and queue and queue[0] < me:
+                bucket = self.buckets.get(other)
+                if bucket is None or bucket.wait_time(now) == 0:
+                    return True
+        return False
+
+    def update_from_headers(self, group, headers):
+        """Apply Bybit's X-Bapi-Limit-Status / X-Bapi-Limit-Reset-Timestamp response headers."""
+        remaining = headers.get("X-Bapi-Limit-Status")
+        bucket = self.buckets.get(group)
+        if remaining is None or bucket is None:
+            return
+        reset_ms = headers.get("X-Bapi-Limit-Reset-Timestamp")
+        remaining = int(remaining)
+        with self._cond:
+            bucket.update_from_exchange(remaining, int(reset_ms) / 1000 if reset_ms else None)
+            if remaining <= 0:
+                self.stats["exchange_limit_hits"] += 1
+                logger.warning("Bybit rate limit exhausted for %s group until %s", group, reset_ms)
+            self._cond.notify_all()
+
+class RequestCoalescer:
+    """Merge identical in-flight calls: later callers wait for the first call's result."""
+
+    def __init__(self):
+        self.merged = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.merged += 1
+        if not owner:
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
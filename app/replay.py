@@ -0,0 +1,414 @@
+"""Record a session at the BybitAPI boundary, then replay it offline through the real bot code.
+
+Recording (RECORD_SESSION=path, in the leader) appends to a JSON Lines file, each event stamped
+with its offset in seconds:
+- every BybitAPI read and order response
+- every price tick
+- every scheduler tick
+- bot configs and positions
+- every signal handed to the webhook ingestor
+
+Replay pushes the ticks through a MarketDataEngine into BotScheduler.evaluate_tick, runs scheduler
+ticks where they happened, and sends signals through parse_signal and a WebhookIngestor into
+execute_signal. API calls are answered from the recording, so a replay makes no network calls, and
+the same session always produces the same orders.
+
+Usage: python -m app.replay session.jsonl [--speed 0] [--mode testnet] [--tracemalloc]
+       python -m app.replay --synthetic session.jsonl --symbols 20 --ticks 100000 --signals 500
+"""
+from collections import defaultdict, deque
+import argparse
+import threading
+import tracemalloc
+import hashlib
+import random
+import json
+import time
+import gc
+import sys
+import logging
+import numpy as np
+from .bots import BotConfig, BotRegistry, SymbolState, execute_signal
+from .ingest import WebhookIngestor, parse_signal
+from .market_data import MarketDataEngine, LocalPriceFeed
+from .scheduler import BotScheduler
+
+logger = logging.getLogger(__name__)
+
+RECORDED_METHODS = ("get_ticker", "get_price_snapshot", "get_ticker_table", "get_historical_data", "get_kline_page",
+                    "get_open_orders", "get_positions", "get_wallet_balance", "get_executions",
+                    "place_market_order", "place_limit_order", "cancel_all_orders")
+ORDER_METHODS = ("place_market_order", "place_limit_order", "cancel_all_orders")
+SECRET = "replay"
+
+def _key(args, kwargs):
+    return json.dumps([args, kwargs], default=str, sort_keys=True)
+
+class SessionRecorder:
+    """Appends session events to a JSON Lines file; attach() it to the live components to capture them."""
+
+    def __init__(self, path):
+        self.path = path
+        self.stats = {"events": 0}
+        self._modes = {}  # id(api) -> mode
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1 << 16)
+        self.write({"kind": "session", "version": 1, "started_at": time.time()})
+
+    def write(self, event):
+        event["t"] = round(time.monotonic() - self._started, 6)
+        line = json.dumps(event, default=str)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self.stats["events"] += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def attach(self, api, mode):
+        """Record this client's calls and responses, and its price ticks."""
+        self._modes[id(api)] = mode
+        for name in RECORDED_METHODS:
+            method = getattr(api, name)
+
+            def recorded(*args, _name=name, _method=method, **kwargs):
+                started = time.perf_counter()
+                result = _method(*args, **kwargs)
+                self.write({"kind": "call", "mode": mode, "method": _name, "args": args, "kwargs": kwargs, "result": result,
+                            "ms": round((time.perf_counter() - started) * 1000, 3)})
+                return result
+
+            # Instance attributes shadow the class methods, so every caller goes through the recording
+            setattr(api, name, recorded)
+        api.market_data.add_handler(lambda symbol, price: self.write({"kind": "tick", "mode": mode, "symbol": symbol, "price": price}))
+
+    def attach_bots(self, registry):
+        """Record the bots as they are now, then every config change."""
+        for bot in registry:
+            self._write_bot(bot)
+        registry.listeners.append(self._on_record)
+
+    def _write_bot(self, bot):
+        self.write({"kind": "bot", "bot": bot.name, "dca_enabled": bot.dca_enabled, "config": bot.config(),
+                    "positions": {symbol: {"qty": s.qty, "entry_price": s.entry_price, "status": s.status,
+                                           "dca_orders_placed": s.dca_orders_placed} for symbol, s in bot.positions.items()}})
+
+    def _on_record(self, kind, bot, symbol, data):
+        if kind in ("bot_add", "config"):
+            self.write({"kind": "bot", "bot": bot, "dca_enabled": data.get("dca_enabled"), "config": data.get("config", data)})
+        elif kind == "bot_remove":
+            self.write({"kind": "bot_remove", "bot": bot})
+
+    def attach_scheduler(self, scheduler):
+        tick = scheduler.tick
+
+        def recorded_tick():
+            self.write({"kind": "scheduler_tick"})
+            return tick()
+
+        scheduler.tick = recorded_tick
+
+    def attach_ingestor(self, ingestor):
+        """Record every signal submitted, before dedup, so a replay exercises dedup too."""
+        submit = ingestor.submit
+
+        def recorded_submit(signal, signal_id=None):
+            self.write({"kind": "signal", "mode": self._modes.get(id(signal.get("api"))),
+                        **{k: signal[k] for k in ("bot", "symbol", "action", "price", "qty", "key")}, "source": signal.get("source")})
+            return submit(signal, signal_id=signal_id)
+
+        ingestor.submit = recorded_submit
+
+class _ReplayInstruments:
+    def __init__(self, symbols):
+        self.symbols_seen = frozenset(symbols)
+        self.loaded = True
+        self.loaded_at = 0
+
+    def is_valid(self, symbol):
+        return symbol in self.symbols_seen
+
+    def get(self, symbol):
+        return None
+
+    def symbols(self):
+        return self.symbols_seen
+
+class ReplayAPI:
+    """BybitAPI stand-in answering each call with the recorded response to the same call, in order.
+
+    A call the recording does not have (the code under test now asks differently) gets the next
+    recorded answer for that method, then its last one, and counts as a miss.
+    """
+
+    def __init__(self, calls, symbols=(), latency=False):
+        self.testnet = True
+        self.account = None
+        self.latency = latency
+        self.market_data = MarketDataEngine(feed=LocalPriceFeed())
+        self.instruments = _ReplayInstruments(symbols)
+        self.orders = []  # (method, args) of every order call, in order
+        self.stats = {"calls": 0, "misses": 0}
+        self._by_call = defaultdict(deque)
+        self._by_method = defaultdict(deque)
+        self._last = {}
+        for call in calls:
+            answer = [call["result"], call.get("ms", 0), False]  # result, latency, used
+            self._by_call[(call["method"], _key(call["args"], call["kwargs"]))].append(answer)
+            self._by_method[call["method"]].append(answer)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _take(answers):
+        while answers:
+            answer = answers.popleft()
+            if not answer[2]:
+                answer[2] = True
+                return answer
+        return None
+
+    def _answer(self, method, *args, **kwargs):
+        with self._lock:
+            self.stats["calls"] += 1
+            if method in ORDER_METHODS:
+                self.orders.append((method, args, kwargs))
+            answer = self._take(self._by_call.get((method, _key(list(args), kwargs)), deque()))
+            if answer is None:
+                self.stats["misses"] += 1
+                answer = self._take(self._by_method.get(method, deque())) or self._last.get(method) or [self._default(method, args), 0, True]
+            self._last[method] = answer
+        if self.latency and answer[1]:
+            time.sleep(answer[1] / 1000)
+        return answer[0]
+
+    @staticmethod
+    def _default(method, args):
+        if method == "place_market_order":
+            return f"Market {args[1]} order placed: {{'replayed': True}}"
+        if method == "place_limit_order":
+            return f"Limit {args[1]} order placed: {{'replayed': True}}"
+        return None
+
+    def __getattr__(self, name):
+        if name in RECORDED_METHODS:
+            return lambda *args, **kwargs: self._answer(name, *args, **kwargs)
+        raise AttributeError(name)
+
+class InlineExecutor:
+    """OrderExecutor stand-in placing legs one by one on the calling thread, so ladders replay in a fixed order."""
+
+    def __init__(self):
+        self.jobs = 0
+
+    def submit(self, api, symbol, legs, on_placed=None, label=""):
+        self.jobs += 1
+        for leg in legs:
+            response = api.place_limit_order(symbol, leg["side"], leg["qty"], leg["price"])
+            if isinstance(response, str) and response.startswith("Limit") and on_placed:
+                on_placed(leg)
+        return f"inline-{self.jobs}"
+
+    def cancel(self, job_id, timeout=None):
+        return True
+
+def load_session(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _apply_bot(registry, event):
+    bot = registry.get(event["bot"])
+    if bot is None:
+        bot = registry.add(BotConfig(event["bot"], dca_enabled=bool(event.get("dca_enabled"))))
+    for key, value in (event.get("config") or {}).items():
+        if key not in ("name", "dca_enabled"):
+            setattr(bot, key, value)
+    for symbol, pos in (event.get("positions") or {}).items():
+        state = bot.positions[symbol] = SymbolState(symbol, pos["qty"], pos["entry_price"], pos["status"])
+        state.dca_orders_placed = pos.get("dca_orders_placed", 0)
+        registry.index(bot, symbol)
+
+def _body(event):
+    body = {"secret": SECRET, "symbol": event["symbol"], "price": event["price"], "quantity": event["qty"],
+            "action": event["action"], "bot": event["bot"]}
+    key = event["key"]
+    # Webhook keys without an id are rebuilt from the same fields; any other key becomes an explicit id
+    if key[0] == "id":
+        body["signal_id"] = key[1]
+    elif list(key) != [event["bot"], event["symbol"], event["action"], event["price"], event["qty"]]:
+        body["signal_id"] = "|".join(map(str, key))
+    return body
+
+def _percentiles(samples_ns):
+    if not samples_ns:
+        return None, None
+    values = np.asarray(samples_ns) / 1000
+    return round(float(np.percentile(values, 50)), 1), round(float(np.percentile(values, 99)), 1)
+
+def replay(events, mode=None, speed=0, latency=False, trace_allocations=False):
+    """Run a recorded session through the bots; speed 0 is as fast as possible, 1 is recorded time."""
+    modes = [e.get("mode") for e in events if e["kind"] in ("tick", "signal", "call") and e.get("mode")]
+    mode = mode or (max(set(modes), key=modes.count) if modes else None)
+    events = [e for e in events if e.get("mode") in (None, mode)]
+    symbols = {e["symbol"] for e in events if e["kind"] in ("tick", "signal")}
+    api = ReplayAPI([e for e in events if e["kind"] == "call"], symbols, latency=latency)
+    registry = BotRegistry()
+    scheduler = BotScheduler(registry, lambda: api)
+    executor = InlineExecutor()
+    api.market_data.add_handler(lambda symbol, price: scheduler.evaluate_tick(api, symbol, price))
+    done = threading.Event()
+    signal_ns = []
+
+    def on_done(signal, record):
+        signal_ns.append(time.perf_counter_ns() - signal["received_ns"])
+        done.set()
+
+    # One worker and one signal in flight keep the interleaving with ticks the same on every run
+    ingestor = WebhookIngestor(lambda signal: execute_signal(registry[signal["bot"]], api, signal["symbol"], signal["action"],
+                                                             signal["price"], signal["qty"], executor),
+                               workers=1, dedup_window=30, on_done=on_done)
+    ingestor.start()
+    counts = defaultdict(int)
+    tick_ns = []
+    tick_ms = []
+    gc.collect()
+    gc_before = gc.get_stats()[0]["collections"]
+    blocks_before = sys.getallocatedblocks()
+    if trace_allocations:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for event in events:
+        kind = event["kind"]
+        if kind in ("session", "call"):
+            continue
+        counts[kind] += 1
+        if speed:
+            delay = event["t"] / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        if kind == "tick":
+            t0 = time.perf_counter_ns()
+            api.market_data.push(event["symbol"], event["price"])
+            tick_ns.append(time.perf_counter_ns() - t0)
+        elif kind == "signal":
+            received = time.perf_counter_ns()
+            signal, error = parse_signal(_body(event), SECRET, api.instruments.is_valid, registry.__contains__)
+            if error:
+                counts["rejected"] += 1
+                continue
+            signal["received_ns"] = received
+            done.clear()
+            status, _ = ingestor.submit(signal)
+            if status == "queued":
+                done.wait(30)
+            else:
+                counts[status] += 1
+        elif kind == "scheduler_tick":
+            t0 = time.perf_counter()
+            scheduler.tick()
+            tick_ms.append((time.perf_counter() - t0) * 1000)
+        elif kind == "bot":
+            _apply_bot(registry, event)
+        elif kind == "bot_remove" and event["bot"] in registry:
+            registry.remove(event["bot"])
+    elapsed = time.perf_counter() - started
+    allocations = {"gc_gen0_collections": gc.get_stats()[0]["collections"] - gc_before,
+                   "allocated_blocks_delta": sys.getallocatedblocks() - blocks_before}
+    if trace_allocations:
+        snapshot = tracemalloc.take_snapshot()
+        allocations["traced_peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        allocations["top_sites"] = [f"{stat.traceback[0].filename.rsplit('/', 1)[-1]}:{stat.traceback[0].lineno} "
+                                    f"{stat.count} blocks {round(stat.size / 1024, 1)} KiB" for stat in snapshot.statistics("lineno")[:5]]
+        tracemalloc.stop()
+    ingestor.stop()
+    replayed = sum(counts[k] for k in ("tick", "signal", "scheduler_tick"))
+    digest = hashlib.sha1(json.dumps(api.orders, default=str).encode()).hexdigest()[:16]
+    tick_p50, tick_p99 = _percentiles(tick_ns)
+    signal_p50, signal_p99 = _percentiles(signal_ns)
+    return {
+        "mode": mode,
+        "ticks": counts["tick"],
+        "signals": counts["signal"],
+        "duplicates": counts["duplicate"],
+        "rejected": counts["rejected"],
+        "scheduler_ticks": counts["scheduler_tick"],
+        "api_calls": api.stats["calls"],
+        "unmatched_calls": api.stats["misses"],
+        "orders": len(api.orders),
+        "orders_digest": digest,
+        "elapsed_s": round(elapsed, 3),
+        "events_per_sec": round(replayed / elapsed) if elapsed else None,
+        "tick_decision_p50_us": tick_p50,
+        "tick_decision_p99_us": tick_p99,
+        "signal_decision_p50_us": signal_p50,
+        "signal_decision_p99_us": signal_p99,
+        "scheduler_tick_p50_ms": round(float(np.percentile(tick_ms, 50)), 3) if tick_ms else None,
+        **allocations
+    }
+
+def synthetic_session(path, symbols=20, ticks=100000, signals=500, tick_every=200, seed=0):
+    """Write a reproducible session (random-walk prices, Bot1/Bot2 entries, scheduler ticks) for baselines without a recording.
+
+    It holds account reads but no order responses, so every order gets a default ack and counts as unmatched.
+    """
+    rng = random.Random(seed)
+    names = [f"SYN{i}USDT" for i in range(symbols)]
+    prices = {name: 100.0 for name in names}
+    signal_every = max(1, ticks // max(signals, 1))
+    t = 0.0
+    with open(path, "w") as f:
+        def write(event):
+            f.write(json.dumps(dict(event, t=round(t, 6))) + "\n")
+
+        write({"kind": "session", "version": 1, "started_at": 0, "synthetic": True})
+        write({"kind": "bot", "bot": "Bot1", "dca_enabled": False, "config": {}, "positions": {}})
+        write({"kind": "bot", "bot": "Bot2", "dca_enabled": True, "config": {}, "positions": {}})
+        for i in range(ticks):
+            t += 0.01
+            name = names[i % symbols]
+            prices[name] = round(prices[name] * (1 + rng.gauss(0, 0.004)), 6)
+            write({"kind": "tick", "mode": "testnet", "symbol": name, "price": prices[name]})
+            if i % signal_every == 0:
+                target = names[rng.randrange(symbols)]
+                bot = "Bot2" if rng.random() < 0.3 else "Bot1"
+                write({"kind": "signal", "mode": "testnet", "bot": bot, "symbol": target, "action": "buy",
+                       "price": prices[target], "qty": 10.0, "key": ["id", f"syn-{i}"], "source": None})
+            if i % tick_every == 0:
+                write({"kind": "scheduler_tick"})
+                write({"kind": "call", "mode": "testnet", "method": "get_price_snapshot", "args": [], "kwargs": {}, "result": dict(prices), "ms": 0})
+                for method, result in (("get_open_orders", []), ("get_positions", []),
+                                       ("get_wallet_balance", [{"coin": "USDT", "walletBalance": "100000"}])):
+                    write({"kind": "call", "mode": "testnet", "method": method, "args": [], "kwargs": {}, "result": result, "ms": 0})
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.replay", description="Replay a recorded session through the bot code offline.")
+    parser.add_argument("session", help="session file (JSON Lines) to replay, or to write with --synthetic")
+    parser.add_argument("--mode", help="account mode to replay (default: the one with most events)")
+    parser.add_argument("--speed", type=float, default=0, help="0 = as fast as possible, 1 = recorded pace")
+    parser.add_argument("--latency", action="store_true", help="sleep each call's recorded latency")
+    parser.add_argument("--tracemalloc", action="store_true", help="trace allocations (slower) and report the top sites")
+    parser.add_argument("--json", action="store_true", help="print the report as one JSON object")
+    parser.add_argument("--synthetic", action="store_true", help="write a synthetic session instead of replaying")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=100000)
+    parser.add_argument("--signals", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.synthetic:
+        synthetic_session(args.session, args.symbols, args.ticks, args.signals, seed=args.seed)
+        print(f"Wrote synthetic session to {args.session}")
+        return
+    result = replay(load_session(args.session), args.mode, args.speed, args.latency, args.tracemalloc)
+    if args.json:
+        print(json.dumps(result))
+        return
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Pre-trade risk: capital a bot commits per entry, checked before any order reaches the exchange.
+
+Each bot's ladder is reduced to cumulative cost and worst-case loss once per config change; a new
+entry is then a few comparisons against the cached free balance and the running exposure totals.
+A DCA ladder that does not fit is cut to the legs that do, anything else is rejected outright.
+"""
+from bisect import bisect_right
+from collections import deque
+import threading
+import time
+import logging
+from .bots import build_safety_ladder
+
+logger = logging.getLogger(__name__)
+
+LADDER_KEYS = ("amount_per_trade", "max_dca_orders", "price_deviation", "order_size_multiplier",
+               "price_deviation_multiplier", "stop_loss_percent", "order_type")
+
+def order_notional(order_type, qty, price):
+    """Quote coin an entry spends: spot market buys are sized in quote coin, limit buys in base."""
+    return qty if order_type == "market" else qty * price
+
+def coin_free(coin):
+    if coin.get("free") not in (None, ""):
+        return float(coin["free"])
+    return float(coin.get("walletBalance") or 0) - float(coin.get("locked") or 0)
+
+def ladder_profile(bot):
+    """Cumulative cost and stop-out loss of the safety ladder, per unit of entry price when the amount is a percent.
+
+    Legs at or below the stop price never fill before the stop closes the trade, so they add cost
+    (their funds are locked) but no loss.
+    """
+    stop = bot.stop_loss_percent / 100
+    legs = build_safety_ladder(bot, 1.0) if bot.dca_enabled else []
+    cost, loss = [], []
+    total_cost = total_loss = 0.0
+    for leg in legs:
+        total_cost += leg["qty"] * leg["price"]
+        total_loss += leg["qty"] * max(leg["price"] - (1 - stop), 0)
+        cost.append(total_cost)
+        loss.append(total_loss)
+    return {
+        "dca": bot.dca_enabled,
+        "per_price": bot.dca_enabled and not isinstance(bot.amount_per_trade, (int, float)),
+        "legs": len(legs),
+        "fillable_legs": sum(1 for leg in legs if leg["price"] > 1 - stop),
+        "ladder_cost": round(total_cost, 8),
+        "ladder_loss": round(total_loss, 8),
+        "stop_loss_percent": bot.stop_loss_percent,
+        "cumulative_cost": cost,
+        "cumulative_loss": loss
+    }
+
+class RiskEngine:
+    """Admits or resizes bot entries against free quote balance, max exposure and max loss, in the leader.
+
+    Exposure is reserved per (bot, symbol) on admission and released when the bot closes the
+    position. Balance reads lag the orders just sent, so admissions also count as pending against
+    the free balance until a read taken after them (or reserve_ttl seconds) has passed.
+    """
+
+    def __init__(self, registry, quote="USDT", max_exposure=None, max_loss=None, min_legs=0, reserve_ttl=10):
+        self.registry = registry
+        self.quote = quote
+        self.max_exposure = max_exposure
+        self.max_loss = max_loss
+        self.min_legs = min_legs
+        self.reserve_ttl = reserve_ttl
+        self.exposure = {}  # (bot, symbol) -> (cost, loss)
+        self.total_exposure = 0.0
+        self.total_loss = 0.0
+        self.stats = {"checked": 0, "accepted": 0, "resized": 0, "rejected": 0, "unknown_balance": 0}
+        self._profiles = {}  # bot name -> (config key, profile)
+        self._free = {}  # api -> (free quote balance, read at)
+        self._pending = {}  # api -> [deque of (at, amount), sum]
+        self._lock = threading.Lock()
+        registry.listeners.append(self._on_record)
+
+    def profile(self, bot):
+        key = tuple(str(getattr(bot, name, None)) for name in LADDER_KEYS)
+        cached = self._profiles.get(bot.name)
+        if cached is None or cached[0] != key:
+            cached = self._profiles[bot.name] = (key, ladder_profile(bot))
+        return cached[1]
+
+    def _on_record(self, kind, bot, symbol, data):
+        if kind == "close":
+            self.release(bot, symbol)
+        elif kind in ("config", "bot_add") and bot in self.registry:
+            # Precompute now so the next entry only does arithmetic
+            self.profile(self.registry[bot])
+        elif kind == "bot_remove":
+            self._profiles.pop(bot, None)
+            for name, held in list(self.exposure):
+                if name == bot:
+                    self.release(name, held)
+
+    def refresh(self, api, balances, read_at=None):
+        """Cache the free quote balance from an account read (the scheduler tick's wallet balance)."""
+        if balances is None:
+            return
+        read_at = time.time() if read_at is None else read_at
+        free = next((coin_free(coin) for coin in balances if coin["coin"] == self.quote), 0.0)
+        with self._lock:
+            self._free[api] = (free, read_at)
+            self._expire(api, read_at)
+
+    def free(self, api):
+        """Free quote balance: the private-stream mirror when live, else the last cached read; None if never read."""
+        mirror = getattr(api, "account", None)
+        if mirror is not None and mirror.ready:
+            coin = mirror.balances.get(self.quote)
+            return coin_free(coin) if coin else 0.0
+        cached = self._free.get(api)
+        return cached[0] if cached else None
+
+    def _expire(self, api, before):
+        pending = self._pending.get(api)
+        if pending:
+            queue = pending[0]
+            while queue and queue[0][0] < before:
+                pending[1] -= queue.popleft()[1]
+
+    def admit(self, bot, api, symbol, qty, price):
+        """Check a buy and reserve what it commits; returns {"ok", "legs", "cost", "loss", "reason"}.
+
+        For a DCA bot, "legs" is how many safety orders fit (fewer than configured means resized).
+        """
+        profile = self.profile(bot)
+        scale = price if profile["per_price"] else 1
+        initial = order_notional(bot.order_type if not bot.dca_enabled else "market", qty, price)
+        initial_loss = initial * profile["stop_loss_percent"] / 100
+        cost, loss = profile["cumulative_cost"], profile["cumulative_loss"]
+        now = time.time()
+        with self._lock:
+            self.stats["checked"] += 1
+            self._expire(api, now - self.reserve_ttl)
+            room = float("inf") if self.max_exposure is None else self.max_exposure - self.total_exposure
+            free = self.free(api)
+            if free is None:
+                self.stats["unknown_balance"] += 1
+            else:
+                pending = self._pending.get(api)
+                room = min(room, free - (pending[1] if pending else 0))
+            loss_room = float("inf") if self.max_loss is None else self.max_loss - self.total_loss
+            if initial > room or initial_loss > loss_room:
+                self.stats["rejected"] += 1
+                return {"ok": False, "legs": 0, "cost": initial, "loss": initial_loss,
+                        "reason": f"{bot.name} entry of {initial:.2f} {self.quote} exceeds available {max(room, 0):.2f} {self.quote}"
+                                  if initial > room else f"{bot.name} entry would take worst-case loss past {self.max_loss} {self.quote}"}
+            legs = len(cost)
+            if legs and (initial + cost[-1] * scale > room or initial_loss + loss[-1] * scale > loss_room):
+                legs = min(bisect_right(cost, (room - initial) / scale), bisect_right(loss, (loss_room - initial_loss) / scale))
+                if legs < self.min_legs:
+                    self.stats["rejected"] += 1
+                    return {"ok": False, "legs": legs, "cost": initial + cost[-1] * scale, "loss": initial_loss + loss[-1] * scale,
+                            "reason": f"Only {legs} of {len(cost)} {bot.name} safety orders fit in {max(room, 0):.2f} {self.quote}"}
+                self.stats["resized"] += 1
+            else:
+                self.stats["accepted"] += 1
+            committed = initial + (cost[legs - 1] * scale if legs else 0)
+            at_risk = initial_loss + (loss[legs - 1] * scale if legs else 0)
+            self._reserve(bot.name, symbol, committed, at_risk)
+            pending = self._pending.setdefault(api, [deque(), 0.0])
+            pending[0].append((now, committed))
+            pending[1] += committed
+        return {"ok": True, "legs": legs, "cost": committed, "loss": at_risk, "reason": None}
+
+    def _reserve(self, bot, symbol, cost, loss):
+        previous = self.exposure.get((bot, symbol))
+        if previous:
+            self.total_exposure -= previous[0]
+            self.total_loss -= previous[1]
+        self.exposure[(bot, symbol)] = (cost, loss)
+        self.total_exposure += cost
+        self.total_loss += loss
+
+    def release(self, bot, symbol):
+        with self._lock:
+            held = self.exposure.pop((bot, symbol), None)
+            if held:
+                self.total_exposure -= held[0]
+                self.total_loss -= held[1]
+
+    def sync(self):
+        """Rebuild exposure from the registry's open positions, e.g. after restoring them from the journal.
+
+        A restored entry's size is not journaled in quote terms, so each counts the bot's configured
+        ladder at its entry price plus the position as recorded.
+        """
+        with self._lock:
+            self.exposure.clear()
+            self.total_exposure = self.total_loss = 0.0
+            for bot in self.registry:
+                profile = self.profile(bot)
+                for symbol, state in bot.positions.items():
+                    scale = state.entry_price if profile["per_price"] else 1
+                    initial = order_notional(bot.order_type if not bot.dca_enabled else "market", state.qty, state.entry_price)
+                    self._reserve(bot.name, symbol, initial + profile["ladder_cost"] * scale,
+                                  initial * profile["stop_loss_percent"] / 100 + profile["ladder_loss"] * scale)
+
+    def status(self, api=None):
+        profiles = {bot.name: {k: v for k, v in self.profile(bot).items() if not k.startswith("cumulative")} for bot in self.registry}
+        pending = self._pending.get(api)
+        return {
+            "quote": self.quote,
+            "free": self.free(api) if api is not None else None,
+            "pending": round(pending[1], 8) if pending else 0,
+            "total_exposure": round(self.total_exposure, 8),
+            "total_loss": round(self.total_loss, 8),
+            "max_exposure": self.max_exposure,
+            "max_loss": self.max_loss,
+            "exposure": [{"bot": bot, "symbol": symbol, "cost": round(cost, 8), "loss": round(loss, 8)}
+                         for (bot, symbol), (cost, loss) in list(self.exposure.items())],
+            "profiles": profiles,
+            **self.stats
+        }
@@ -1,51 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify, session, flash
-from . import live_api, testnet_api, active_mode, logger
-from .utils import get_summary_stats
+from flask import Blueprint, Response, render_template, request, redirect, url_for, jsonify, session, flash
+from . import live_api, testnet_api, paper_api, scheduler, dashboard, indicators, scanner, risk, history, accounts, order_executor, webhook_ingestor, journal, inbox, leader, logger, get_active_api, get_active_mode
+from .bots import bots
+from .commands import dispatch
+from .ingest import parse_signal
+from .utils import AccountSnapshot, get_summary_stats
+from .sweep import load_best
+from .metrics import metrics, webhook_latency, overview_latency
 import os
+import time
 from functools import wraps
 
 bp = Blueprint('main', __name__)
 
-# Global symbol states
-live_symbol = None
-paper_symbol = None
-
-# Webhook request counter
-webhook_count = 0
-
-# Bot configuration storage
-class BotConfig:
-    def __init__(self, name, dca_enabled=False):
-        self.name = name
-        self.dca_enabled = dca_enabled
-        if not dca_enabled:  # Bot 1
-            self.order_type = "market"  # "market" or "limit"
-            self.stop_loss_percent = 10
-            self.take_profit_targets = [{"percent": 5, "sell_percent": 100}]
-            self.trades = {}  # {symbol: {"qty": qty, "entry_price": price, "status": "Running"}}
-        else:  # Bot 2
-            self.order_type = "market"
-            self.amount_per_trade = 10
-            self.take_profit_targets = [{"percent": 1, "sell_percent": 100}]
-            self.stop_loss_percent = 20
-            self.max_dca_orders = 5
-            self.price_deviation = 1
-            self.order_size_multiplier = 2
-            self.price_deviation_multiplier = 2
-            self.total_qty = 0
-            self.dca_orders_placed = 0
-            self.symbol = None
-            self.entry_price = None
-            self.status = "Not Activated"
-
-bots = {
-    "Bot1": BotConfig("Bot1", dca_enabled=False),
-    "Bot2": BotConfig("Bot2", dca_enabled=True)
-}
-
-# Helper to get the active API
-def get_active_api():
-    return testnet_api if active_mode == "testnet" else live_api
+# Chosen symbols live in the user's session so every server worker sees the same one
 
 # Login required decorator
 def login_required(f):
@@ -80,22 +47,21 @@ def logout():
 @bp.route("/", methods=["GET", "POST"])
 @login_required
 def index():
-    global live_symbol
     api = get_active_api()
     if request.method == "POST":
         symbol = request.form.get("symbol").strip().upper()
-        symbols = api.get_available_symbols()
-        if symbol in symbols or not symbols:
-            live_symbol = symbol
-            logger.info("Symbol set to: %s", live_symbol)
-    summary_stats = get_summary_stats(api)
-    return render_template("index.html", symbol=live_symbol, summary_stats=summary_stats, mode=active_mode)
+        if api.instruments.is_valid(symbol):
+            session["live_symbol"] = symbol
+            logger.info("Symbol set to: %s", symbol)
+    live_symbol = session.get("live_symbol")
+    summary_stats = get_summary_stats(AccountSnapshot(api))
+    return render_template("index.html", symbol=live_symbol, summary_stats=summary_stats, mode=get_active_mode())
 
 @bp.route("/place_order", methods=["POST"])
 @login_required
 def place_order():
-    global live_symbol
     api = get_active_api()
+    live_symbol = session.get("live_symbol")
     if not live_symbol:
         logger.warning("No symbol set for order placement")
         return redirect(url_for("main.index"))
@@ -117,119 +83,191 @@ def place_order():
         logger.warning("Invalid order type: %s", order_type)
     
     logger.info("Order placed: %s, %s, qty: %s, price: %s, response: %s", order_type, live_symbol, qty, price, response)
-    summary_stats = get_summary_stats(api)
-    return render_template("index.html", symbol=live_symbol, response=response, summary_stats=summary_stats, mode=active_mode)
+    summary_stats = get_summary_stats(AccountSnapshot(api))
+    return render_template("index.html", symbol=live_symbol, response=response, summary_stats=summary_stats, mode=get_active_mode())
 
 @bp.route("/overview", methods=["GET", "POST"])
 @login_required
 def overview():
-    global active_mode
+    started = time.perf_counter()
     api = get_active_api()
-    open_orders = api.get_open_orders() or []
-    positions = api.get_positions() or []
-    summary_stats = get_summary_stats(api)
-    
-    # Monitor Bot 1 trades
-    bot1 = bots["Bot1"]
-    for symbol, trade in list(bot1.trades.items()):
-        if trade["status"] == "Running":
-            try:
-                current_price = float(api.get_ticker(symbol)["last_price"])
-                entry_price = trade["entry_price"]
-                qty = trade["qty"]
-                # Take-profit
-                for tp in bot1.take_profit_targets:
-                    if current_price >= entry_price * (1 + tp["percent"] / 100):
-                        api.place_market_order(symbol, "Sell", qty * (tp["sell_percent"] / 100))
-                        logger.info("Bot1 TP hit for %s: sold %s at %s", symbol, qty, current_price)
-                        del bot1.trades[symbol]  # Remove trade
-                        break
-                # Stop-loss
-                if current_price <= entry_price * (1 - bot1.stop_loss_percent / 100):
-                    api.place_market_order(symbol, "Sell", qty)
-                    logger.info("Bot1 SL hit for %s: sold %s at %s", symbol, qty, current_price)
-                    del bot1.trades[symbol]
-            except Exception as e:
-                logger.error("Error monitoring Bot1 trade for %s: %s", symbol, str(e))
-    
-    # Monitor Bot 2 DCA
-    bot2 = bots["Bot2"]
-    if bot2.status == "Activated" and bot2.symbol:
-        symbol_orders = [o for o in open_orders if o.get("symbol") == bot2.symbol]
-        symbol_positions = [p for p in positions if p.get("symbol") == bot2.symbol and float(p.get("size", 0)) > 0]
-        if not symbol_orders and not symbol_positions:
-            logger.info("No open orders or positions for %s, resetting Bot2", bot2.symbol)
-            bot2.status = "Not Activated"
-            bot2.total_qty = 0
-            bot2.dca_orders_placed = 0
-            bot2.symbol = None
-            bot2.entry_price = None
-        else:
-            try:
-                current_price = float(api.get_ticker(bot2.symbol)["last_price"])
-                if current_price >= bot2.entry_price * (1 + bot2.take_profit_targets[0]["percent"] / 100):
-                    api.cancel_all_orders(symbol=bot2.symbol)
-                    api.place_market_order(bot2.symbol, "Sell", bot2.total_qty)
-                    logger.info("Bot2 TP hit for %s: sold %s at %s", bot2.symbol, bot2.total_qty, current_price)
-                    bot2.status = "Not Activated"
-                    bot2.total_qty = 0
-                    bot2.dca_orders_placed = 0
-                    bot2.symbol = None
-                    bot2.entry_price = None
-                elif current_price <= bot2.entry_price * (1 - bot2.stop_loss_percent / 100):
-                    api.cancel_all_orders(symbol=bot2.symbol)
-                    api.place_market_order(bot2.symbol, "Sell", bot2.total_qty)
-                    logger.info("Bot2 SL hit for %s: sold %s at %s", bot2.symbol, bot2.total_qty, current_price)
-                    bot2.status = "Not Activated"
-                    bot2.total_qty = 0
-                    bot2.dca_orders_placed = 0
-                    bot2.symbol = None
-                    bot2.entry_price = None
-            except Exception as e:
-                logger.error("Error monitoring Bot2 for %s: %s", bot2.symbol, str(e))
+    # Bot monitoring belongs to the scheduler; the page only reads its last tick
+    state = scheduler.snapshot(api)
+    if state:
+        open_orders, positions, summary_stats = state["open_orders"], state["positions"], state["summary_stats"]
+    else:
+        account = AccountSnapshot(api)
+        open_orders = account.get_open_orders() or []
+        positions = account.get_positions() or []
+        summary_stats = get_summary_stats(account)
+    overview_latency.observe(time.perf_counter() - started, "snapshot" if state else "account_reads")
     
     # Handle configuration updates
     if request.method == "POST":
         bot_name = request.form.get("bot_name")
         if bot_name in bots:
             bot = bots[bot_name]
-            if bot_name == "Bot1":
-                bot.order_type = request.form.get("order_type", "market")
-                bot.stop_loss_percent = float(request.form.get("stop_loss_percent", 10))
-                bot.take_profit_targets = [{"percent": float(request.form.get("tp_percent", 5)), "sell_percent": float(request.form.get("tp_sell_percent", 100))}]
-            elif bot_name == "Bot2":
-                bot.order_type = request.form.get("order_type", "market")
-                bot.amount_per_trade = request.form.get("amount_per_trade", "10")
-                bot.stop_loss_percent = float(request.form.get("stop_loss_percent", 20))
-                bot.max_dca_orders = int(request.form.get("max_dca_orders", 5))
-                bot.price_deviation = float(request.form.get("price_deviation", 1))
-                bot.order_size_multiplier = float(request.form.get("order_size_multiplier", 2))
-                bot.price_deviation_multiplier = float(request.form.get("price_deviation_multiplier", 2))
-                bot.take_profit_targets = [{"percent": float(request.form.get("tp_percent", 1)), "sell_percent": float(request.form.get("tp_sell_percent", 100))}]
-            logger.info("Bot %s configured: %s", bot_name, vars(bot))
+            if not bot.dca_enabled:
+                config = {
+                    "order_type": request.form.get("order_type", "market"),
+                    "stop_loss_percent": float(request.form.get("stop_loss_percent", 10)),
+                    "take_profit_targets": [{"percent": float(request.form.get("tp_percent", 5)), "sell_percent": float(request.form.get("tp_sell_percent", 100))}]
+                }
+            else:
+                config = {
+                    "order_type": request.form.get("order_type", "market"),
+                    "amount_per_trade": request.form.get("amount_per_trade", "10"),
+                    "stop_loss_percent": float(request.form.get("stop_loss_percent", 20)),
+                    "max_dca_orders": int(request.form.get("max_dca_orders", 5)),
+                    "price_deviation": float(request.form.get("price_deviation", 1)),
+                    "order_size_multiplier": float(request.form.get("order_size_multiplier", 2)),
+                    "price_deviation_multiplier": float(request.form.get("price_deviation_multiplier", 2)),
+                    "take_profit_targets": [{"percent": float(request.form.get("tp_percent", 1)), "sell_percent": float(request.form.get("tp_sell_percent", 100))}]
+                }
+            dispatch("config", bot=bot_name, config=config)
     
     logger.info("Overview accessed: %d open orders, %d positions", len(open_orders), len(positions))
-    return render_template("overview.html", open_orders=open_orders, positions=positions, summary_stats=summary_stats, bots=bots, mode=active_mode)
+    rendering = time.perf_counter()
+    page = _render_overview(api, open_orders, positions, summary_stats)
+    finished = time.perf_counter()
+    overview_latency.observe(finished - rendering, "render")
+    overview_latency.observe(finished - started, "total")
+    return page
+
+def _render_overview(api, open_orders, positions, summary_stats, **extra):
+    # Every page rendering overview.html goes through here; risk profiles are recomputed only when a bot's settings changed
+    risk_profiles = {bot.name: risk.profile(bot) for bot in bots}
+    return render_template("overview.html", open_orders=open_orders, positions=positions, summary_stats=summary_stats, bots=bots, mode=get_active_mode(),
+                           best_sweep=load_best(os.getenv("SWEEP_DIR", "data/sweeps")), scanner_results=scanner.ranked(),
+                           risk_profiles=risk_profiles, risk_free=risk.free(api), quote=risk.quote,
+                           performance=history.summary(get_active_mode()), performance_by_bot=history.pnl_by(get_active_mode(), "bot"),
+                           recent_trades=history.recent_trades(get_active_mode(), limit=10), **extra)
+
+@bp.route("/overview/load_sweep", methods=["POST"])
+@login_required
+def load_sweep():
+    best = load_best(os.getenv("SWEEP_DIR", "data/sweeps"), request.form.get("symbol") or None)
+    bot = bots.get(request.form.get("bot_name", "Bot2"))
+    if best is None or bot is None or not bot.dca_enabled:
+        logger.warning("No sweep result or DCA bot to load it into")
+    else:
+        dispatch("sweep", bot=bot.name, params=best["params"])
+        logger.info("%s configured from %s sweep: %s", bot.name, best["symbol"], best["params"])
+    return redirect(url_for("main.overview"))
+
+@bp.route("/bots/add", methods=["POST"])
+@login_required
+def add_bot():
+    name = request.form.get("name", "").strip()
+    if not name or name in bots:
+        flash(f"Bot name {name!r} is empty or already taken")
+    else:
+        error = dispatch("bot_add", name=name, dca_enabled=request.form.get("kind") == "dca")
+        if error:
+            flash(error)
+    return redirect(url_for("main.overview"))
+
+@bp.route("/bots/<name>/remove", methods=["POST"])
+@login_required
+def remove_bot(name):
+    bot = bots.get(name)
+    if bot is None or bot.positions:
+        flash(f"Bot {name} does not exist or still holds positions")
+    else:
+        error = dispatch("bot_remove", bot=name)
+        if error:
+            flash(error)
+    return redirect(url_for("main.overview"))
+
+@bp.route("/scheduler/status")
+@login_required
+def scheduler_status():
+    return jsonify({"interval": scheduler.interval, "held_symbols": sorted(scheduler.held_symbols()), **scheduler.stats})
+
+@bp.route("/stream")
+@login_required
+def dashboard_stream():
+    # Server-Sent Events: a snapshot, then diffs of orders, positions, PnL and bot status as they change
+    frames = dashboard.subscribe(request.headers.get("Last-Event-ID"))
+    if frames is None:
+        # Every stream slot in this worker is taken; the page keeps its server-rendered values and retries later
+        return jsonify({"error": "Too many dashboard streams, retry later"}), 503, {"Retry-After": "30"}
+    response = Response(frames, mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(dashboard.release)
+    return response
+
+@bp.route("/stream/status")
+@login_required
+def dashboard_stream_status():
+    return jsonify({**dashboard.stats, "version": dashboard.version, "interval": dashboard.interval})
+
+@bp.route("/indicators/status")
+@login_required
+def indicators_status():
+    return jsonify(indicators.status())
+
+@bp.route("/scanner/status")
+@login_required
+def scanner_status():
+    return jsonify({"config": scanner.config, "stats": scanner.stats, "results": scanner.ranked()})
+
+@bp.route("/history/pnl")
+@login_required
+def history_pnl():
+    mode = request.args.get("mode", get_active_mode())
+    group = request.args.get("group", "bot")
+    if group not in ("bot", "symbol", "day"):
+        return jsonify({"error": f"Unknown group: {group}"}), 400
+    bot, since, until = request.args.get("bot"), request.args.get("since"), request.args.get("until")
+    return jsonify({"mode": mode, "summary": history.summary(mode, bot, since, until),
+                    "rows": history.pnl_by(mode, group, bot, since, until)})
+
+@bp.route("/history/trades")
+@login_required
+def history_trades():
+    mode = request.args.get("mode", get_active_mode())
+    return jsonify(history.recent_trades(mode, limit=min(int(request.args.get("limit", 50)), 1000), bot=request.args.get("bot")))
+
+@bp.route("/risk/status")
+@login_required
+def risk_status():
+    return jsonify(risk.status(get_active_api()))
+
+@bp.route("/accounts/status")
+@login_required
+def accounts_status():
+    return jsonify(accounts.status())
+
+@bp.route("/transport/status")
+@login_required
+def transport_status():
+    return jsonify({mode: {**api.transport_stats(), "rate_limiter": api.limiter_stats()}
+                    for mode, api in (("testnet", testnet_api), ("live", live_api)) if api})
+
+@bp.route("/metrics")
+def prometheus_metrics():
+    # Unauthenticated for the scraper, so only served to the addresses in METRICS_ALLOW
+    allowed = os.getenv("METRICS_ALLOW", "127.0.0.1,::1").split(",")
+    if "*" not in allowed and request.remote_addr not in allowed:
+        return jsonify({"error": "Forbidden"}), 403
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@bp.route("/metrics/summary")
+@login_required
+def metrics_summary():
+    return jsonify(metrics.summary())
 
 @bp.route("/switch_mode", methods=["POST"])
 @login_required
 def switch_mode():
-    global active_mode
     if live_api is None:
         logger.warning("Cannot switch to live mode: Live API credentials not provided")
         return redirect(url_for("main.overview"))
     
     new_mode = request.form.get("mode")
     if new_mode in ["testnet", "live"]:
-        active_mode = new_mode
-        logger.info("Switched to %s mode", active_mode)
-        # Reset bots
-        bots["Bot1"].trades.clear()
-        bots["Bot2"].status = "Not Activated"
-        bots["Bot2"].total_qty = 0
-        bots["Bot2"].dca_orders_placed = 0
-        bots["Bot2"].symbol = None
-        bots["Bot2"].entry_price = None
+        # Switching resets the bots' positions as well
+        dispatch("mode", mode=new_mode)
     return redirect(url_for("main.overview"))
 
 @bp.route("/panic", methods=["POST"])
@@ -248,16 +286,12 @@ def panic_confirm():
     if request.form.get("confirm") == "yes" and pin == expected_pin:
         result = api.cancel_all_orders()
         logger.info("Panic executed successfully: %s", result)
-        bots["Bot1"].trades.clear()
-        bots["Bot2"].status = "Not Activated"
-        bots["Bot2"].total_qty = 0
-        bots["Bot2"].dca_orders_placed = 0
-        bots["Bot2"].symbol = None
-        bots["Bot2"].entry_price = None
-        open_orders = api.get_open_orders() or []
-        positions = api.get_positions() or []
-        summary_stats = get_summary_stats(api)
-        return render_template("overview.html", open_orders=open_orders, positions=positions, panic_result=result, summary_stats=summary_stats, bots=bots, mode=active_mode)
+        dispatch("clear_positions")
+        account = AccountSnapshot(api)
+        open_orders = account.get_open_orders() or []
+        positions = account.get_positions() or []
+        summary_stats = get_summary_stats(account)
+        return _render_overview(api, open_orders, positions, summary_stats, panic_result=result)
     elif pin != expected_pin:
         logger.warning("Invalid PIN attempt for panic: %s", pin)
         return render_template("panic_confirm.html", error="Invalid PIN")
@@ -267,20 +301,19 @@ def panic_confirm():
 @bp.route("/papertrading", methods=["GET", "POST"])
 @login_required
 def papertrading():
-    global paper_symbol
     if request.method == "POST":
         symbol = request.form.get("symbol").strip().upper()
-        symbols = testnet_api.get_available_symbols()
-        if symbol in symbols or not symbols:
-            paper_symbol = symbol
-            logger.info("Paper trading symbol set to: %s", paper_symbol)
-    summary_stats = get_summary_stats(testnet_api)
-    return render_template("papertrading.html", symbol=paper_symbol, summary_stats=summary_stats, mode=active_mode)
+        if testnet_api.instruments.is_valid(symbol):
+            session["paper_symbol"] = symbol
+            logger.info("Paper trading symbol set to: %s", symbol)
+    paper_symbol = session.get("paper_symbol")
+    summary_stats = get_summary_stats(AccountSnapshot(paper_api))
+    return render_template("papertrading.html", symbol=paper_symbol, summary_stats=summary_stats, mode=get_active_mode())
 
 @bp.route("/place_paper_order", methods=["POST"])
 @login_required
 def place_paper_order():
-    global paper_symbol
+    paper_symbol = session.get("paper_symbol")
     if not paper_symbol:
         logger.warning("No symbol set for paper order placement")
         return redirect(url_for("main.papertrading"))
@@ -290,120 +323,85 @@ def place_paper_order():
     price = request.form.get("price")
     
     if order_type == "market_buy":
-        response = testnet_api.place_market_order(paper_symbol, "Buy", qty)
+        response = paper_api.place_market_order(paper_symbol, "Buy", qty)
     elif order_type == "market_sell":
-        response = testnet_api.place_market_order(paper_symbol, "Sell", qty)
+        response = paper_api.place_market_order(paper_symbol, "Sell", qty)
     elif order_type == "limit_buy":
-        response = testnet_api.place_limit_order(paper_symbol, "Buy", qty, float(price))
+        response = paper_api.place_limit_order(paper_symbol, "Buy", qty, float(price))
     elif order_type == "limit_sell":
-        response = testnet_api.place_limit_order(paper_symbol, "Sell", qty, float(price))
+        response = paper_api.place_limit_order(paper_symbol, "Sell", qty, float(price))
     else:
         response = "Invalid order type"
         logger.warning("Invalid paper order type: %s", order_type)
     
     logger.info("Paper order placed: %s, %s, qty: %s, price: %s, response: %s", order_type, paper_symbol, qty, price, response)
-    summary_stats = get_summary_stats(testnet_api)
-    return render_template("papertrading.html", symbol=paper_symbol, response=response, summary_stats=summary_stats, mode=active_mode)
+    summary_stats = get_summary_stats(AccountSnapshot(paper_api))
+    return render_template("papertrading.html", symbol=paper_symbol, response=response, summary_stats=summary_stats, mode=get_active_mode())
 
-def place_safety_orders(bot, symbol, initial_price, initial_qty):
-    api = get_active_api()
-    amount = bot.amount_per_trade if isinstance(bot.amount_per_trade, (int, float)) else float(bot.amount_per_trade.strip("%")) / 100 * initial_price
-    current_deviation = bot.price_deviation
-    
-    for i in range(bot.max_dca_orders):
-        qty = amount / initial_price * (bot.order_size_multiplier ** i)
-        dca_price = initial_price * (1 - current_deviation / 100)
-        try:
-            response = api.place_limit_order(symbol, "Buy", qty, dca_price)
-            bot.total_qty += qty
-            bot.dca_orders_placed += 1
-            logger.info("Safety order #%d placed for %s: qty=%s at %s, response=%s", i+1, symbol, qty, dca_price, response)
-        except Exception as e:
-            logger.error("Failed to place safety order #%d for %s: %s", i+1, symbol, str(e))
-        current_deviation *= bot.price_deviation_multiplier
+@bp.route("/orders/jobs/<job_id>")
+@login_required
+def order_job(job_id):
+    job = order_executor.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job)
 
 @bp.route("/webhook", methods=["POST"])
 def webhook():
-    global webhook_count
-    api = get_active_api()
-    data = request.get_json()
-    
-    webhook_count += 1
-    log_data = {k: v if k != "secret" else "****" for k, v in (data or {}).items()}
-    logger.info("Webhook request #%d received: %s", webhook_count, log_data)
-    
-    if not data:
-        logger.warning("No JSON data received in webhook request #%d", webhook_count)
-        return jsonify({"error": "No JSON data received"}), 400
-    
-    symbol = data.get("symbol")
-    price = data.get("price")
-    qty = data.get("quantity")
-    action = data.get("action", "").lower()
-    secret = data.get("secret")
-    bot_name = data.get("bot", "Bot1")
-    
-    expected_secret = os.getenv("WEBHOOK_SECRET")
-    if not secret or secret != expected_secret:
-        logger.warning("Invalid or missing secret token in webhook request #%d", webhook_count)
-        return jsonify({"error": "Invalid or missing secret token"}), 403
-    
-    if not all([symbol, price, qty]) or action not in ["buy", "sell"]:
-        logger.warning("Missing or invalid parameters in webhook request #%d: %s", webhook_count, log_data)
-        return jsonify({"error": "Missing or invalid parameters. Required: symbol, price, quantity, action='buy' or 'sell'"}), 400
+    # Ack path: parse, authenticate and dedup in memory, then queue; orders are placed by the ingest workers
+    started = time.perf_counter()
+    number = webhook_ingestor.count()
+    if leader.is_leader:
+        journal.record("meta", webhook_count=number)
+    data = request.get_json(silent=True)
+    log_data = {k: v if k != "secret" else "****" for k, v in data.items()} if isinstance(data, dict) else data
+    logger.info("Webhook request #%d received: %s", number, log_data)
     
-    try:
-        price = float(price)
-        qty = float(qty)
-    except (ValueError, TypeError):
-        logger.warning("Price or quantity not numbers in webhook request #%d: %s", webhook_count, log_data)
-        return jsonify({"error": "Price and quantity must be numbers"}), 400
-    
-    symbols = api.get_available_symbols()
-    if symbol not in symbols and symbols:
-        logger.warning("Invalid symbol in webhook request #%d: %s", webhook_count, symbol)
-        return jsonify({"error": f"Invalid symbol: {symbol}"}), 400
+    api = get_active_api()
+    signal, error = parse_signal(data, os.getenv("WEBHOOK_SECRET"), api.instruments.is_valid, bots.__contains__)
+    parsed = time.perf_counter()
+    webhook_latency.observe(parsed - started, "parse")
+    if error:
+        message, status_code = error
+        logger.warning("Rejected webhook request #%d: %s", number, message)
+        return jsonify({"error": message}), status_code
     
-    bot = bots.get(bot_name, bots["Bot1"])
-    try:
-        if bot_name == "Bot1":
-            if action == "buy":
-                if bot.order_type == "market":
-                    response = api.place_market_order(symbol, "Buy", qty)
-                else:
-                    response = api.place_limit_order(symbol, "Buy", qty, price)
-                bot.trades[symbol] = {"qty": qty, "entry_price": price, "status": "Running"}
-                logger.info("Bot1 %s buy for %s: qty=%s at %s", bot.order_type, symbol, qty, price)
-            elif action == "sell":
-                if symbol in bot.trades:
-                    trade = bot.trades[symbol]
-                    if bot.order_type == "market":
-                        response = api.place_market_order(symbol, "Sell", trade["qty"])
-                    else:
-                        response = api.place_limit_order(symbol, "Sell", trade["qty"], price)
-                    del bot.trades[symbol]
-                    logger.info("Bot1 %s sell for %s: qty=%s at %s", bot.order_type, symbol, trade["qty"], price)
-                else:
-                    return jsonify({"error": f"No active trade for {symbol} to sell"}), 400
-            return jsonify({"status": "success", "message": f"{action.capitalize()} order placed for {qty} {symbol} at {price}", "response": response})
-        else:  # Bot2
-            if action == "buy":
-                if bot.status == "Not Activated":
-                    response = api.place_market_order(symbol, "Buy", qty)
-                    bot.entry_price = price
-                    bot.total_qty = qty
-                    bot.dca_orders_placed = 0
-                    bot.symbol = symbol
-                    bot.status = "Activated"
-                    logger.info("Bot2 initial buy for %s: qty=%s at %s", symbol, qty, price)
-                    place_safety_orders(bot, symbol, price, qty)
-                    return jsonify({"status": "success", "message": f"DCA started for {qty} {symbol} at {price} with {bot.max_dca_orders} safety orders", "response": response})
-                else:
-                    logger.warning("Bot2 already activated for %s", bot.symbol)
-                    return jsonify({"error": "Bot2 is already activated for another trade"}), 400
-            elif action == "sell":
-                logger.warning("Sell action not supported for Bot2 DCA via webhook")
-                return jsonify({"error": "Sell action not supported for Bot2 DCA"}), 400
-    except Exception as e:
-        logger.error("Failed to process webhook request #%d: %s", webhook_count, str(e))
-        return jsonify({"error": f"Failed to process webhook: {str(e)}"}), 500
\ No newline at end of file
+    if leader.is_leader:
+        # The key is claimed in the shared table too, so a retry that hit a follower worker is caught
+        status, signal_id = inbox.claim(signal["key"], webhook_ingestor.dedup.window)
+        claimed = time.perf_counter()
+        webhook_latency.observe(claimed - parsed, "dedup")
+        if status == "queued":
+            signal["api"] = api
+            signal["received_at"] = started
+            status, signal_id = webhook_ingestor.submit(signal, signal_id=signal_id)
+            webhook_latency.observe(time.perf_counter() - claimed, "enqueue")
+            if status == "full":
+                inbox.release(signal["key"])
+    else:
+        # Another worker owns bot state: hand the signal over through the shared inbox, deduped there
+        status, signal_id = inbox.put("signal", dict(signal, mode=get_active_mode()), key=signal["key"], window=webhook_ingestor.dedup.window)
+        webhook_latency.observe(time.perf_counter() - parsed, "forward")
+    webhook_latency.observe(time.perf_counter() - started, "ack")
+    signal_url = url_for("main.webhook_signal", signal_id=signal_id)
+    if status == "duplicate":
+        webhook_ingestor.record_duplicate()
+        logger.info("Webhook request #%d is a duplicate of signal %s", number, signal_id)
+        return jsonify({"status": "duplicate", "signal_id": signal_id, "signal_url": signal_url}), 200
+    if status == "full":
+        logger.error("Webhook queue full, dropping request #%d", number)
+        return jsonify({"error": "Webhook queue is full, retry later"}), 503
+    return jsonify({"status": "queued", "signal_id": signal_id, "signal_url": signal_url}), 202
+
+@bp.route("/webhook/signals/<signal_id>")
+@login_required
+def webhook_signal(signal_id):
+    record = webhook_ingestor.get(signal_id) or inbox.get(signal_id)
+    if record is None:
+        return jsonify({"error": f"Unknown signal: {signal_id}"}), 404
+    return jsonify(record)
+
+@bp.route("/webhook/status")
+@login_required
+def webhook_status():
+    return jsonify({**webhook_ingestor.stats, "pending": webhook_ingestor.pending(), "leader": leader.is_leader, "mode": get_active_mode()})
@@ -0,0 +1,264 @@
+"""Market scanner: every spot symbol's 24h stats and recent closes in numpy arrays, filtered and
+ranked in one vectorized pass per tick.
+
+Each tick costs one tickers call, however many symbols are listed. The recent bars are built from
+those snapshots rather than fetched per symbol, so RSI/EMA conditions become available once
+enough bars have passed.
+"""
+import threading
+import json
+import time
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("last", "high", "low", "change", "volume", "turnover")
+RANKINGS = ("turnover", "volume", "change", "volatility", "momentum", "rsi", "ema_gap")
+DEFAULT_CONFIG = {
+    "filters": {"min_turnover": 100000},
+    "rank_by": "turnover",
+    "ascending": False,
+    "top": 20,
+    "rsi_period": 14,
+    "ema_period": 20,
+    # {"bot": "Bot2", "qty": 10, "max_active": 1, "cooldown": 3600, "min_gap": 60} starts DCA runs on the top symbols
+    "trigger": None
+}
+
+def wilder_rsi(closes, period=14):
+    """RSI at the newest bar for every row (rows are symbols, columns bars oldest first, NaN before a symbol's first bar)."""
+    rows = closes.shape[0]
+    gain, loss, count = np.zeros(rows), np.zeros(rows), np.zeros(rows, dtype=np.int64)
+    previous = closes[:, 0]
+    a = 1 / period
+    # Smoothing is sequential in time but vectorized across symbols: one numpy step per bar
+    for j in range(1, closes.shape[1]):
+        current = closes[:, j]
+        valid = ~np.isnan(current) & ~np.isnan(previous)
+        change = np.where(valid, current - previous, 0.0)
+        gain = np.where(valid, gain + a * (np.maximum(change, 0) - gain), gain)
+        loss = np.where(valid, loss + a * (np.maximum(-change, 0) - loss), loss)
+        count += valid
+        previous = np.where(np.isnan(current), previous, current)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+    return np.where(count >= period, rsi, np.nan)
+
+def ema_last(closes, period=20):
+    """EMA (adjust=False, seeded on each symbol's first bar) at the newest bar, NaN until `period` bars."""
+    alpha = 2 / (period + 1)
+    ema = np.full(closes.shape[0], np.nan)
+    count = np.zeros(closes.shape[0], dtype=np.int64)
+    for j in range(closes.shape[1]):
+        current = closes[:, j]
+        valid = ~np.isnan(current)
+        ema = np.where(valid & np.isnan(ema), current, np.where(valid, ema + alpha * (current - ema), ema))
+        count += valid
+    return np.where(count >= period, ema, np.nan)
+
+class MarketScanner:
+    """Ranks the spot universe every `interval` seconds; the leader runs it, followers read its published results."""
+
+    def __init__(self, get_api, bots=None, fire=None, interval=5, bar_seconds=60, window=120, quote="USDT",
+                 config=None, publish_path=None):
+        self.get_api = get_api
+        self.bots = bots
+        self.fire = fire
+        self.interval = interval
+        self.bar_seconds = bar_seconds
+        self.window = window
+        self.quote = quote
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.publish_path = publish_path
+        self.symbols = []
+        self.columns = {name: np.empty(0) for name in COLUMNS}
+        self.closes = np.empty((0, window))
+        self.bar_start = None
+        self.results = []
+        self.updated_at = None
+        self.stats = {"scans": 0, "api_calls": 0, "errors": 0, "last_scan_ms": None, "universe": 0, "matched": 0, "triggered": 0}
+        self._universe = np.empty(0, dtype=bool)
+        self._universe_key = None
+        self._triggered = {}
+        self._last_trigger = 0
+        self._published = (None, None)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load_config(self, path):
+        """Merge settings from a JSON file over the defaults; a missing file keeps them."""
+        if not path or not os.path.exists(path):
+            return False
+        with open(path) as f:
+            self.config = {**DEFAULT_CONFIG, **json.load(f)}
+        if self.config["rank_by"] not in RANKINGS:
+            raise ValueError(f"Unknown scanner ranking: {self.config['rank_by']}")
+        logger.info("Scanner configured from %s: %s", path, self.config)
+        return True
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="market-scanner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error("Exception in market scanner tick: %s", str(e))
+            self._stop.wait(self.interval)
+
+    def _reindex(self, symbols):
+        # Listings change rarely; carry the bars of symbols that are still there over to the new order
+        old = {symbol: i for i, symbol in enumerate(self.symbols)}
+        closes = np.full((len(symbols), self.window), np.nan)
+        keep = [(i, old[symbol]) for i, symbol in enumerate(symbols) if symbol in old]
+        if keep:
+            new_rows, old_rows = map(list, zip(*keep))
+            closes[new_rows] = self.closes[old_rows]
+        self.symbols = list(symbols)
+        self.closes = closes
+        self._universe_key = None
+
+    def _universe_mask(self, instruments):
+        key = (len(self.symbols), instruments.loaded_at if instruments is not None else None)
+        if key != self._universe_key:
+            known = instruments.symbols() if instruments is not None and instruments.loaded else None
+            self._universe = np.array([s.endswith(self.quote) and (known is None or s in known) for s in self.symbols], dtype=bool)
+            self._universe_key = key
+        return self._universe
+
+    def update(self, table, now=None):
+        """Load one tickers snapshot (get_ticker_table's columns) and fold its prices into the current bar."""
+        now = time.time() if now is None else now
+        if table["symbol"] != self.symbols:
+            self._reindex(table["symbol"])
+        for name in COLUMNS:
+            self.columns[name] = np.asarray(table[name], dtype=np.float64)
+        start = now - now % self.bar_seconds
+        if self.bar_start is None or start > self.bar_start:
+            self.closes = np.roll(self.closes, -1, axis=1)
+            self.closes[:, -1] = np.nan
+            self.bar_start = start
+        last = self.columns["last"]
+        self.closes[:, -1] = np.where(np.isnan(last), self.closes[:, -1], last)
+
+    def metrics(self, needed):
+        c = self.columns
+        out = {"turnover": c["turnover"], "volume": c["volume"], "change": c["change"] * 100}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["volatility"] = (c["high"] - c["low"]) / c["low"] * 100
+            if "momentum" in needed:
+                # Change over the bars held so far: newest close against each row's oldest
+                first = self.closes[np.arange(len(self.symbols)), np.argmax(~np.isnan(self.closes), axis=1)]
+                out["momentum"] = (c["last"] / first - 1) * 100
+            if "rsi" in needed:
+                out["rsi"] = wilder_rsi(self.closes, self.config["rsi_period"])
+            if "ema_gap" in needed:
+                out["ema_gap"] = (c["last"] / ema_last(self.closes, self.config["ema_period"]) - 1) * 100
+        return out
+
+    def scan(self, instruments=None):
+        """Apply the filters and ranking over every symbol at once; returns the top rows as dicts."""
+        filters = self.config["filters"]
+        rank_by = self.config["rank_by"]
+        needed = {rank_by}
+        if "rsi_below" in filters or "rsi_above" in filters:
+            needed.add("rsi")
+        if "min_ema_gap" in filters or "max_ema_gap" in filters:
+            needed.add("ema_gap")
+        if "min_momentum" in filters:
+            needed.add("momentum")
+        m = self.metrics(needed)
+        mask = self._universe_mask(instruments) & ~np.isnan(self.columns["last"])
+        with np.errstate(invalid="ignore"):
+            for name, (metric, op) in {"min_turnover": ("turnover", np.greater_equal), "min_volume": ("volume", np.greater_equal),
+                                       "min_change": ("change", np.greater_equal), "max_change": ("change", np.less_equal),
+                                       "min_volatility": ("volatility", np.greater_equal), "max_volatility": ("volatility", np.less_equal),
+                                       "min_momentum": ("momentum", np.greater_equal), "rsi_below": ("rsi", np.less),
+                                       "rsi_above": ("rsi", np.greater), "min_ema_gap": ("ema_gap", np.greater_equal),
+                                       "max_ema_gap": ("ema_gap", np.less_equal)}.items():
+                if name in filters:
+                    # NaN (not enough bars yet) compares False, so the symbol is filtered out
+                    mask &= op(m[metric], float(filters[name]))
+        matched = np.flatnonzero(mask)
+        values = m[rank_by][matched]
+        order = np.argsort(values if self.config["ascending"] else -values, kind="stable")
+        top = matched[order[:int(self.config["top"])]]
+        self.stats["matched"] = int(len(matched))
+        self.stats["universe"] = int(self._universe.sum())
+        return [{"symbol": self.symbols[i], "price": float(self.columns["last"][i]),
+                 **{name: None if np.isnan(column[i]) else round(float(column[i]), 4) for name, column in m.items()}}
+                for i in top]
+
+    def tick(self, now=None):
+        started = time.perf_counter()
+        api = self.get_api()
+        table = api.get_ticker_table()
+        self.stats["api_calls"] += 1
+        if not table:
+            self.stats["errors"] += 1
+            return None
+        self.update(table, now)
+        self.results = self.scan(api.instruments)
+        self.updated_at = time.time()
+        self.stats["scans"] += 1
+        self.stats["last_scan_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if self.config["trigger"] and self.fire:
+            self._trigger(self.config["trigger"])
+        if self.publish_path:
+            self._publish()
+        return self.results
+
+    def _trigger(self, trigger):
+        """Start a DCA run on the best-ranked symbol the bot is not in, up to max_active, once per cooldown."""
+        bot = self.bots.get(trigger["bot"]) if self.bots is not None else None
+        if bot is None or not bot.dca_enabled or len(bot.positions) >= int(trigger.get("max_active", 1)):
+            return
+        now = time.time()
+        # The position only appears once the queued buy runs; min_gap keeps a failing buy from walking down the ranking
+        if now - self._last_trigger < float(trigger.get("min_gap", 60)):
+            return
+        cooldown = float(trigger.get("cooldown", 3600))
+        for row in self.results:
+            symbol = row["symbol"]
+            if symbol in bot.positions or now - self._triggered.get(symbol, 0) < cooldown:
+                continue
+            self._triggered[symbol] = self._last_trigger = now
+            self.stats["triggered"] += 1
+            logger.info("Scanner starting %s on %s (%s=%s)", bot.name, symbol, self.config["rank_by"], row[self.config["rank_by"]])
+            self.fire({"bot": bot.name, "symbol": symbol, "action": "buy", "price": row["price"], "qty": float(trigger["qty"]),
+                       "key": ("scanner", bot.name, symbol, int(now // cooldown)), "source": "scanner"})
+            return
+
+    def _publish(self):
+        tmp = f"{self.publish_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"results": self.results, "updated_at": self.updated_at, "stats": self.stats}, f)
+        os.replace(tmp, self.publish_path)
+
+    def ranked(self):
+        """Latest results: this process's own when it scans, otherwise the leader's published copy."""
+        if self._thread is not None or not self.publish_path:
+            return self.results
+        try:
+            mtime = os.stat(self.publish_path).st_mtime
+        except OSError:
+            return []
+        if self._published[0] != mtime:
+            try:
+                with open(self.publish_path) as f:
+                    self._published = (mtime, json.load(f)["results"])
+            except (OSError, ValueError, KeyError):
+                return []
+        return self._published[1]
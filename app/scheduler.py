@@ -0,0 +1,185 @@
+import threading
+import json
+import time
+import os
+import logging
+from .bots import monitor_bot1, monitor_bot2, reset_bot2_if_flat, check_position
+from .utils import AccountSnapshot, get_summary_stats
+from .metrics import monitor_latency, scheduler_latency
+
+logger = logging.getLogger(__name__)
+
+class _CountingAPI:
+    """Proxy that counts BybitAPI method calls made during one tick."""
+
+    def __init__(self, api):
+        self._api = api
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if not callable(attr):
+            return attr
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return attr(*args, **kwargs)
+        return counted
+
+class BotScheduler:
+    """Owns the bots and runs their monitoring on a fixed tick, off the Flask request threads."""
+
+    def __init__(self, bots, get_api, interval=5, publish_path=None, on_tick=None):
+        self.bots = bots
+        self.get_api = get_api
+        self.interval = interval
+        self.publish_path = publish_path
+        self.on_tick = on_tick
+        self.state = None
+        self._published = (None, None)
+        self.stats = {"ticks": 0, "skipped": 0, "last_tick_ms": None, "max_tick_ms": None,
+                      "last_api_calls": None, "last_tick_at": None, "errors": 0}
+        self._tick_lock = threading.Lock()
+        self._eval_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bot-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Bot scheduler started with a %ss tick", self.interval)
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            self.tick()
+            next_run += self.interval
+            now = time.monotonic()
+            if now > next_run:
+                # The tick overran; drop the ticks we missed instead of running them back to back
+                missed = int((now - next_run) // self.interval) + 1
+                self.stats["skipped"] += missed
+                next_run += missed * self.interval
+            self._stop.wait(max(0, next_run - time.monotonic()))
+
+    def held_symbols(self):
+        return self.bots.held_symbols()
+
+    def _collect_prices(self, api, symbols):
+        api.market_data.track(symbols)
+        # One tickers call covers every held symbol; the stream's table is the fallback
+        prices = api.get_price_snapshot()
+        if not prices:
+            prices = dict(api.market_data.prices)
+        return prices
+
+    def evaluate(self, api, prices, open_orders=None, positions=None, read_at=None):
+        with self._eval_lock:
+            for bot in self.bots:
+                if not bot.positions:
+                    continue
+                if bot.dca_enabled:
+                    if open_orders is not None and positions is not None:
+                        reset_bot2_if_flat(bot, open_orders, positions, read_at)
+                    monitor_bot2(bot, api, prices)
+                else:
+                    monitor_bot1(bot, api, prices)
+
+    def on_price_tick(self, api, symbol, price):
+        """Market data handler: evaluate TP/SL for the bots holding this symbol as soon as it ticks."""
+        # Only the process whose scheduler runs (the elected leader) may act on bot state
+        if self._thread is None or api is not self.get_api():
+            return
+        self.evaluate_tick(api, symbol, price)
+
+    def evaluate_tick(self, api, symbol, price):
+        with self._eval_lock:
+            for bot in self.bots.bots_for_symbol(symbol):
+                state = bot.positions.get(symbol)
+                if state:
+                    with monitor_latency.time(bot.name, "price_tick"):
+                        check_position(bot, api, state, price)
+
+    def tick(self):
+        if not self._tick_lock.acquire(blocking=False):
+            self.stats["skipped"] += 1
+            logger.warning("Bot scheduler tick skipped: previous tick still running")
+            return False
+        try:
+            started = time.perf_counter()
+            real_api = self.get_api()
+            api = _CountingAPI(real_api)
+            read_at = time.time()
+            account = AccountSnapshot(api)
+            prices = self._collect_prices(api, self.held_symbols())
+            # None means the read failed; evaluate() then skips the Bot2 reset check
+            open_orders = account.get_open_orders()
+            positions = account.get_positions()
+            self.evaluate(api, prices, open_orders, positions, read_at)
+            summary_stats = get_summary_stats(account, prices)
+            self.state = {
+                "api": real_api,
+                "open_orders": open_orders or [],
+                "positions": positions or [],
+                "prices": prices,
+                "summary_stats": summary_stats,
+                "balances": account.get_wallet_balance(),
+                "read_at": read_at,
+                "updated_at": time.time()
+            }
+            elapsed = time.perf_counter() - started
+            scheduler_latency.observe(elapsed)
+            elapsed_ms = elapsed * 1000
+            self.stats["ticks"] += 1
+            self.stats["last_tick_ms"] = round(elapsed_ms, 2)
+            self.stats["max_tick_ms"] = round(max(elapsed_ms, self.stats["max_tick_ms"] or 0), 2)
+            self.stats["last_api_calls"] = api.calls
+            self.stats["last_tick_at"] = self.state["updated_at"]
+            if self.publish_path:
+                self._publish(self.state)
+            if self.on_tick:
+                self.on_tick()
+            return True
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error("Exception in bot scheduler tick: %s", str(e))
+            return False
+        finally:
+            self._tick_lock.release()
+
+    def _publish(self, state):
+        # Follower server workers have no scheduler of their own and read this file instead
+        tmp = f"{self.publish_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"testnet": state["api"].testnet, **{k: v for k, v in state.items() if k != "api"}}, f)
+        os.replace(tmp, self.publish_path)
+
+    def _read_published(self, api):
+        try:
+            mtime = os.stat(self.publish_path).st_mtime
+        except OSError:
+            return None
+        cached_mtime, state = self._published
+        if cached_mtime != mtime:
+            with open(self.publish_path) as f:
+                state = json.load(f)
+            self._published = (mtime, state)
+        # A snapshot the leader stopped refreshing is worse than a direct read
+        if state["testnet"] != api.testnet or time.time() - state["updated_at"] > max(30, 5 * self.interval):
+            return None
+        return dict(state, api=api)
+
+    def snapshot(self, api):
+        """Latest tick state for this API client, or None if the scheduler has not covered it yet."""
+        state = self.state
+        if state and state["api"] is api:
+            return state
+        if self._thread is None and self.publish_path:
+            return self._read_published(api)
+        return None
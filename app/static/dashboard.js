@@ -0,0 +1,80 @@
+// Live dashboard: applies the /stream snapshot and diffs to elements marked with data-live attributes.
+//   data-live="summary.open_orders"   text of a field ("section.key")
+//   data-live-list="orders"           list rebuilt from a keyed section
+//   data-live-bot="Bot1"              container with .bot-status and .bot-trades for one bot
+//   data-live-rank="scanner"          ordered list rebuilt from a ranked section, in its order
+(function () {
+    var KEYED = ["orders", "positions", "bots", "paper_orders", "paper_balances"];
+    var state = {};
+
+    var FORMAT = {
+        orders: function (o) { return o.symbol + " " + o.side + " " + o.order_type + " " + o.qty + " @ " + o.price + " (" + o.order_status + ")"; },
+        paper_orders: function (o) { return o.symbol + " " + o.side + " " + o.order_type + " " + o.qty + " @ " + o.price + " (" + o.order_status + ")"; },
+        positions: function (p) { return p.symbol + " " + p.side + " size " + p.size + ", entry " + p.entry_price + ", PnL " + p.unrealised_pnl; },
+        paper_balances: function (b) { return b.coin + ": " + b.walletBalance + " (free " + b.free + ", locked " + b.locked + ")"; },
+        scanner: function (r) { return r.symbol + " " + r.price + ": 24h " + r.change + "%, range " + r.volatility + "%, turnover " + Math.round(r.turnover); }
+    };
+
+    function apply(diff) {
+        Object.keys(diff).forEach(function (section) {
+            if (KEYED.indexOf(section) < 0) {
+                state[section] = diff[section];
+                return;
+            }
+            var items = state[section] = state[section] || {};
+            Object.keys(diff[section].set).forEach(function (id) { items[id] = diff[section].set[id]; });
+            diff[section].del.forEach(function (id) { delete items[id]; });
+        });
+    }
+
+    function fill(list, lines, empty) {
+        list.textContent = "";
+        (lines.length ? lines : [empty]).forEach(function (line) {
+            var li = document.createElement("li");
+            li.textContent = line;
+            list.appendChild(li);
+        });
+    }
+
+    function trade(t, dca) {
+        var line = t.symbol + ": Qty=" + t.qty + ", Entry=" + t.entry_price + ", Status=" + t.status;
+        if (dca) line += ", DCA Orders=" + t.dca_orders_placed;
+        if (t.pnl_percent !== null) line += ", PnL=" + t.pnl_percent + "%";
+        return line;
+    }
+
+    function render() {
+        document.querySelectorAll("[data-live]").forEach(function (el) {
+            var path = el.getAttribute("data-live").split(".");
+            var value = state[path[0]];
+            if (path.length > 1) value = value ? value[path[1]] : undefined;
+            if (value !== undefined && value !== null) el.textContent = value;
+        });
+        document.querySelectorAll("[data-live-list]").forEach(function (list) {
+            var section = list.getAttribute("data-live-list");
+            var items = state[section] || {};
+            fill(list, Object.keys(items).sort().map(function (id) { return FORMAT[section](items[id]); }), list.getAttribute("data-empty") || "None.");
+        });
+        document.querySelectorAll("[data-live-rank]").forEach(function (list) {
+            var section = list.getAttribute("data-live-rank");
+            fill(list, (state[section] || []).map(FORMAT[section]), list.getAttribute("data-empty") || "None.");
+        });
+        document.querySelectorAll("[data-live-bot]").forEach(function (el) {
+            var bot = (state.bots || {})[el.getAttribute("data-live-bot")];
+            if (!bot) return;
+            el.querySelector(".bot-status").textContent = bot.status;
+            fill(el.querySelector(".bot-trades"), bot.trades.map(function (t) { return trade(t, bot.dca_enabled); }), "No active trades.");
+        });
+    }
+
+    window.startDashboard = function (url) {
+        if (!window.EventSource) return;
+        var source = new EventSource(url);
+        source.addEventListener("snapshot", function (e) { state = JSON.parse(e.data); render(); });
+        source.addEventListener("diff", function (e) { apply(JSON.parse(e.data)); render(); });
+        source.onerror = function () {
+            // A refused stream (503 when the server is at its stream limit) is not retried by EventSource itself
+            if (source.readyState === EventSource.CLOSED) setTimeout(function () { window.startDashboard(url); }, 30000);
+        };
+    };
+})();
@@ -0,0 +1,193 @@
+"""Server-Sent Events push of the dashboard state: one shared snapshot, diffed once per change.
+
+A single feeder thread per process rebuilds the snapshot from memory only (the scheduler's last
+tick or the leader's published copy, the bot registry, the paper exchange), so the exchange sees
+the same load with one open tab or a hundred. Each change is serialized once and fanned out.
+"""
+from collections import deque
+import threading
+import json
+import time
+import uuid
+import logging
+from .utils import get_summary_stats
+
+logger = logging.getLogger(__name__)
+
+# Sections that are maps of id -> item and are diffed item by item; the rest are replaced whole
+KEYED = ("orders", "positions", "bots", "paper_orders", "paper_balances")
+
+def _keyed(items, key):
+    return {str(item.get(key)): item for item in items or ()}
+
+def build_dashboard_state(api, mode, scheduler, bots, paper_api=None, scanner=None, history=None):
+    state = scheduler.snapshot(api) or {}
+    prices = state.get("prices") or {}
+    bot_status = {}
+    for bot in bots:
+        trades = []
+        for symbol, position in bot.positions.items():
+            price = prices.get(symbol)
+            pnl = round((price / position.entry_price - 1) * 100, 2) if price and position.entry_price else None
+            trades.append({"symbol": symbol, "qty": position.qty, "entry_price": position.entry_price, "status": position.status,
+                           "dca_orders_placed": position.dca_orders_placed, "price": price, "pnl_percent": pnl})
+        bot_status[bot.name] = {"name": bot.name, "dca_enabled": bot.dca_enabled, "status": bot.status, "trades": trades}
+    snapshot = {
+        "mode": mode,
+        "updated_at": state.get("updated_at"),
+        "summary": state.get("summary_stats"),
+        "orders": _keyed(state.get("open_orders"), "order_id"),
+        "positions": _keyed(state.get("positions"), "symbol"),
+        "bots": bot_status
+    }
+    if paper_api is not None:
+        # The paper exchange is local memory, so reading it costs no exchange calls
+        snapshot["paper_orders"] = _keyed(paper_api.get_open_orders(), "order_id")
+        snapshot["paper_balances"] = _keyed(paper_api.get_wallet_balance(), "coin")
+        snapshot["paper_summary"] = get_summary_stats(paper_api)
+    if scanner is not None:
+        # Ranked rows, sent whole: the order is the information
+        snapshot["scanner"] = scanner.ranked()
+    if history is not None:
+        # Realized results from the local trade store; cached there until a new fill lands
+        snapshot["performance"] = history.summary(mode)
+    return snapshot
+
+def diff_state(old, new):
+    """Sections that changed: keyed ones as {"set": {id: item}, "del": [id]}, the rest as their new value."""
+    diff = {}
+    for section, value in new.items():
+        previous = old.get(section)
+        if section in KEYED:
+            previous = previous or {}
+            changed = {k: v for k, v in value.items() if previous.get(k) != v}
+            removed = [k for k in previous if k not in value]
+            if changed or removed:
+                diff[section] = {"set": changed, "del": removed}
+        elif previous != value or section not in old:
+            diff[section] = value
+    return diff
+
+def _event(kind, event_id, data):
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+
+class DashboardStream:
+    """Latest dashboard snapshot plus the recent diffs, for any number of SSE subscribers.
+
+    The feeder runs only while someone is subscribed. Event ids carry a per-process epoch, so an
+    EventSource reconnecting (to this worker or another) resumes from diffs when it can and gets
+    a full snapshot otherwise. Each subscriber holds a server thread, so at most max_clients stream
+    at once and the rest of the threads stay free for /webhook.
+    """
+
+    def __init__(self, build, interval=1, keep=64, heartbeat=15, max_seconds=300, max_clients=None):
+        self.build = build
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_seconds = max_seconds
+        self.max_clients = max_clients
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.snapshot = {}
+        self.stats = {"clients": 0, "rejected": 0, "builds": 0, "changes": 0, "errors": 0}
+        self._full = None  # (version, serialized snapshot)
+        self._diffs = deque(maxlen=keep)  # (version, serialized diff)
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._build_lock = threading.Lock()
+        self._thread = None
+
+    def wake(self):
+        """Rebuild now rather than at the next interval, e.g. right after a scheduler tick."""
+        self._wake.set()
+
+    def refresh(self):
+        with self._build_lock:
+            new = self.build()
+            self.stats["builds"] += 1
+            diff = diff_state(self.snapshot, new)
+            if not diff:
+                return False
+            data = json.dumps(diff, default=str)
+            with self._cond:
+                self.version += 1
+                self.snapshot = new
+                self._diffs.append((self.version, data))
+                self.stats["changes"] += 1
+                self._cond.notify_all()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self.stats["clients"]:
+                    self._thread = None
+                    return
+            try:
+                self.refresh()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error("Dashboard snapshot failed: %s", str(e))
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _full_snapshot(self):
+        with self._cond:
+            if self._full is None or self._full[0] != self.version:
+                self._full = (self.version, json.dumps(self.snapshot, default=str))
+            return self._full
+
+    def _resume_point(self, last_event_id):
+        epoch, _, version = (last_event_id or "").partition(":")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        with self._cond:
+            oldest = self._diffs[0][0] if self._diffs else self.version + 1
+            return version if version == self.version or version + 1 >= oldest else None
+
+    def subscribe(self, last_event_id=None):
+        """Generator of SSE frames: a snapshot (unless resuming), then diffs as they happen, until max_seconds.
+
+        None when max_clients subscribers are already streaming. The caller calls release() once the
+        response is closed, which also covers a stream whose generator never started.
+        """
+        with self._cond:
+            if self.max_clients is not None and self.stats["clients"] >= self.max_clients:
+                self.stats["rejected"] += 1
+                return None
+            self.stats["clients"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="dashboard-stream", daemon=True)
+                self._thread.start()
+        return self._frames(last_event_id)
+
+    def _frames(self, last_event_id):
+        # Tell the browser how soon to reconnect when the stream is recycled
+        yield "retry: 1000\n\n"
+        seen = self._resume_point(last_event_id)
+        if seen is None:
+            if not self.version:
+                self.refresh()
+            seen, data = self._full_snapshot()
+            yield _event("snapshot", f"{self.epoch}:{seen}", data)
+        deadline = time.monotonic() + self.max_seconds
+        while time.monotonic() < deadline:
+            with self._cond:
+                self._cond.wait_for(lambda: self.version > seen, timeout=self.heartbeat)
+                pending = [(v, d) for v, d in self._diffs if v > seen]
+                behind = self.version > seen and (not pending or pending[0][0] != seen + 1)
+            if behind:
+                # Fell further behind than the diffs we keep: start over from the snapshot
+                seen, data = self._full_snapshot()
+                yield _event("snapshot", f"{self.epoch}:{seen}", data)
+            elif pending:
+                for version, data in pending:
+                    yield _event("diff", f"{self.epoch}:{version}", data)
+                seen = pending[-1][0]
+            else:
+                yield ": keepalive\n\n"
+
+    def release(self):
+        with self._cond:
+            self.stats["clients"] -= 1
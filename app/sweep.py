@@ -0,0 +1,211 @@
+"""Parallel grid search over Bot2 DCA settings, backed by the vectorized backtester.
+
+Usage: python -m app.sweep --symbol BTCUSDT --days 90 --price-deviation 0.5,1,2 --tp 0.5,1,2 --sl 10,20
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import argparse
+import itertools
+import glob
+import heapq
+import json
+import os
+import time
+import logging
+import numpy as np
+from .backtest import backtest, load_candles, add_data_arguments
+from .bots import BotConfig
+
+logger = logging.getLogger(__name__)
+
+PARAMS = ("price_deviation", "price_deviation_multiplier", "order_size_multiplier", "max_dca_orders", "tp", "sl")
+BEST_FILE = "best_bot2_{symbol}.json"  # one per symbol, so sweeps of different symbols do not overwrite each other
+
+def bot2_from_params(params, amount_per_trade=10):
+    bot = BotConfig("Bot2", dca_enabled=True)
+    bot.amount_per_trade = amount_per_trade
+    return apply_params(bot, params)
+
+def apply_params(bot, params):
+    """Copy a sweep parameter set onto a Bot2 config (live or backtest)."""
+    bot.price_deviation = params["price_deviation"]
+    bot.price_deviation_multiplier = params["price_deviation_multiplier"]
+    bot.order_size_multiplier = params["order_size_multiplier"]
+    bot.max_dca_orders = int(params["max_dca_orders"])
+    bot.take_profit_targets = [{"percent": params["tp"], "sell_percent": 100}]
+    bot.stop_loss_percent = params["sl"]
+    return bot
+
+def param_key(params):
+    return tuple(params[name] for name in PARAMS)
+
+# Worker-side view of the parent's candle array; attached once per process
+_shm = None
+_candles = None
+
+def _init_worker(shm_name, shape):
+    global _shm, _candles
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _candles = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+
+def _run_batch(batch, amount_per_trade, fee_rate):
+    results = []
+    for params in batch:
+        result = backtest(bot2_from_params(params, amount_per_trade), _candles, fee_rate=fee_rate)
+        result.pop("trade_log")
+        results.append({"params": params, **result})
+    return results
+
+def load_results(path):
+    """Results already written by an earlier (possibly interrupted) run of the same sweep."""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # partial last line from an interrupted run
+                if "params" in row:
+                    done[param_key(row["params"])] = row
+    return done
+
+def sweep_header(candles, symbol, interval, amount_per_trade, fee_rate):
+    """Everything besides the grid that a result depends on: resuming is only valid when it matches."""
+    return {"symbol": symbol, "interval": interval, "bars": len(candles),
+            "first_ms": int(candles[0, 0]) if len(candles) else None, "last_ms": int(candles[-1, 0]) if len(candles) else None,
+            "amount_per_trade": amount_per_trade, "fee_rate": fee_rate}
+
+def _check_header(path, header, restart=False):
+    # The first line of a results file records the data window and settings it was computed over
+    if restart or not os.path.exists(path) or not os.path.getsize(path):
+        with open(path, "w") as f:
+            f.write(json.dumps({"sweep": header}) + "\n")
+        return
+    with open(path) as f:
+        try:
+            found = json.loads(f.readline()).get("sweep")
+        except ValueError:
+            found = None
+    if found != header:
+        raise ValueError(f"{path} holds results for {found}, not {header}")
+
+def _terminate_last_line(path):
+    # An interrupted run can leave half a line; start appending on a fresh one
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+def write_best(path, row, symbol, interval, rank_by):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"symbol": symbol, "interval": interval, "rank_by": rank_by, "updated_at": time.time(), **row}, f)
+    os.replace(tmp, path)
+
+def best_path(sweep_dir, symbol):
+    return os.path.join(sweep_dir, BEST_FILE.format(symbol=symbol or "all"))
+
+def load_best(sweep_dir, symbol=None):
+    """Best row of the sweep for symbol; without one, the most recently updated best of any symbol."""
+    if symbol is not None:
+        paths = [best_path(sweep_dir, symbol)]
+    else:
+        paths = glob.glob(os.path.join(sweep_dir, BEST_FILE.format(symbol="*")))
+    best = None
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            row = json.load(f)
+        if best is None or row.get("updated_at", 0) > best.get("updated_at", 0):
+            best = row
+    return best
+
+def _rank(rank_by):
+    # Combinations without a closed trade have no win rate; they rank below every measured one
+    return lambda row: float("-inf") if row[rank_by] is None else row[rank_by]
+
+def run_sweep(candles, grid, results_path, symbol="", interval="", workers=None, batch_size=16,
+              amount_per_trade=10, fee_rate=0.001, rank_by="total_pnl", top=10, restart=False):
+    """Evaluate every grid combination not yet in results_path; returns the top rows by rank_by.
+
+    Raises ValueError when results_path was written for other candles or settings, unless restart discards it.
+    """
+    combos = [dict(zip(PARAMS, values)) for values in itertools.product(*(grid[name] for name in PARAMS))]
+    candles = np.ascontiguousarray(candles, dtype=np.float64)
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    _check_header(results_path, sweep_header(candles, symbol, interval, amount_per_trade, fee_rate), restart)
+    done = load_results(results_path)
+    todo = [params for params in combos if param_key(params) not in done]
+    logger.info("Sweep %s: %d combinations, %d already done, %d to run", symbol, len(combos), len(combos) - len(todo), len(todo))
+    _terminate_last_line(results_path)
+    best_file = best_path(os.path.dirname(results_path) or ".", symbol)
+    keys = {param_key(params) for params in combos}
+    ranked = [row for key, row in done.items() if key in keys]
+    rank = _rank(rank_by)
+    best = max(ranked, key=rank, default=None)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(candles.nbytes, 1))
+    try:
+        np.ndarray(candles.shape, dtype=np.float64, buffer=shm.buf)[:] = candles
+        batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shm.name, candles.shape)) as pool, \
+                open(results_path, "a") as out:
+            futures = [pool.submit(_run_batch, batch, amount_per_trade, fee_rate) for batch in batches]
+            for future in as_completed(futures):
+                for row in future.result():
+                    out.write(json.dumps(row) + "\n")
+                    ranked.append(row)
+                    if best is None or rank(row) > rank(best):
+                        best = row
+                        write_best(best_file, best, symbol, interval, rank_by)
+                out.flush()
+    finally:
+        shm.close()
+        shm.unlink()
+    if best is not None:
+        write_best(best_file, best, symbol, interval, rank_by)
+    return heapq.nlargest(top, ranked, key=rank)
+
+def parse_values(text, cast=float):
+    return [cast(value) for value in text.split(",") if value]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.sweep", description="Grid-search Bot2 DCA settings across a process pool.")
+    add_data_arguments(parser)
+    parser.add_argument("--amount-per-trade", dest="amount_per_trade", type=float, default=10)
+    parser.add_argument("--price-deviation", dest="price_deviation", default="0.5,1,2")
+    parser.add_argument("--price-deviation-multiplier", dest="price_deviation_multiplier", default="1,1.5,2")
+    parser.add_argument("--order-size-multiplier", dest="order_size_multiplier", default="1,1.5,2")
+    parser.add_argument("--max-dca-orders", dest="max_dca_orders", default="3,5")
+    parser.add_argument("--tp", default="0.5,1,2")
+    parser.add_argument("--sl", default="10,20")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--results", help="JSONL results file; rerunning with the same file resumes the sweep")
+    parser.add_argument("--restart", action="store_true", help="discard results computed over other candles or settings")
+    parser.add_argument("--rank-by", dest="rank_by", default="total_pnl", choices=["total_pnl", "win_rate", "trades"])
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    grid = {name: parse_values(getattr(args, name), int if name == "max_dca_orders" else float) for name in PARAMS}
+    results_path = args.results or os.path.join(os.getenv("SWEEP_DIR", "data/sweeps"), f"{args.symbol}_{args.interval}.jsonl")
+    candles = load_candles(args.symbol, args.interval, args.days, args.testnet, args.candle_dir, sync=not args.offline)
+    if not len(candles):
+        parser.error(f"No candles for {args.symbol} {args.interval}")
+    started = time.perf_counter()
+    try:
+        top = run_sweep(candles, grid, results_path, args.symbol, args.interval, workers=args.workers,
+                        amount_per_trade=args.amount_per_trade, fee_rate=args.fee_rate, rank_by=args.rank_by, top=args.top,
+                        restart=args.restart)
+    except ValueError as e:
+        parser.error(f"{e}; rerun with --restart to discard them")
+    print(f"Sweep over {len(candles)} bars finished in {time.perf_counter() - started:.1f} s, results in {results_path}")
+    print(" ".join(f"{name:>10}" for name in PARAMS) + f" {'pnl':>12} {'win%':>7} {'trades':>7} {'max_dd':>10}")
+    for row in top:
+        print(" ".join(f"{row['params'][name]:>10}" for name in PARAMS)
+              + f" {row['total_pnl']:>12.4f} {row['win_rate'] or 0:>7.2f} {row['trades']:>7} {row['max_drawdown']:>10.4f}")
+
+if __name__ == "__main__":
+    main()
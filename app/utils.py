@@ -1,8 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_summary_stats(bybit_api):
+# Shared bounded pool for account reads, so concurrent pages cannot open unbounded connections
+_account_pool = ThreadPoolExecutor(max_workers=int(os.getenv("ACCOUNT_FETCH_WORKERS", 6)), thread_name_prefix="account-fetch")
+
+class AccountSnapshot:
+    """Request-scoped view of the account: each endpoint is fetched at most once, all in parallel.
+
+    Exposes the same read methods as BybitAPI, so it can be passed to get_summary_stats.
+    When the API client's private-stream mirror is live, reads come from memory instead.
+    """
+
+    ENDPOINTS = ("get_open_orders", "get_positions", "get_wallet_balance")
+
+    def __init__(self, api, endpoints=ENDPOINTS):
+        mirror = getattr(api, "account", None)
+        self.local = mirror is not None and mirror.ready
+        self.api = mirror if self.local else api
+        self._futures = {}
+        self._lock = threading.Lock()
+        if not self.local:
+            for name in endpoints:
+                self._fetch(name)
+
+    def _fetch(self, name):
+        with self._lock:
+            future = self._futures.get(name)
+            if future is None:
+                future = self._futures[name] = _account_pool.submit(getattr(self.api, name))
+        return future
+
+    def _result(self, name):
+        if self.local:
+            return getattr(self.api, name)()
+        try:
+            return self._fetch(name).result()
+        except Exception as e:
+            logger.error(f"Exception in {name}: {str(e)}")
+            return None
+
+    def get_open_orders(self):
+        return self._result("get_open_orders")
+
+    def get_positions(self):
+        return self._result("get_positions")
+
+    def get_wallet_balance(self):
+        return self._result("get_wallet_balance")
+
+def get_portfolio_value(wallet_balances, prices, quote="USDT"):
+    """Value spot balances in the quote coin using a {symbol: price} snapshot."""
+    total = 0
+    for coin in wallet_balances or []:
+        balance = float(coin["walletBalance"])
+        if coin["coin"] == quote:
+            total += balance
+        elif balance > 0 and coin["coin"] + quote in prices:
+            total += balance * prices[coin["coin"] + quote]
+    return round(total, 2)
+
+def get_summary_stats(bybit_api, prices=None):
     try:
         open_orders_list = bybit_api.get_open_orders()
         open_orders = len(open_orders_list) if open_orders_list is not None else "Error fetching orders"
@@ -18,7 +79,8 @@ def get_summary_stats(bybit_api):
         return {
             "open_orders": open_orders,
             "open_positions": open_positions,
-            "unrealized_pnl": unrealized_pnl
+            "unrealized_pnl": unrealized_pnl,
+            "portfolio_value": get_portfolio_value(wallet_balances, prices) if prices else "N/A"
         }
     except Exception as e:
         logger.error(f"Exception in get_summary_stats: {str(e)}")
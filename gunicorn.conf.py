@@ -0,0 +1,18 @@
+# Production server: gunicorn -c gunicorn.conf.py "app:create_app()"
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', 5000)}")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+worker_class = "gthread"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+# Every worker builds its own API clients, sockets and threads after the fork
+preload_app = False
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")  # e.g. "-" for stdout; off by default
+
+def worker_exit(server, worker):
+    # The leader drains queued webhook signals and flushes the state journal before exiting
+    import app
+    app.shutdown()